@@ -0,0 +1,120 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """Per-process LRU of user rows keyed by id, each kept for ``ttl`` seconds.
+
+    Saving or deleting a user, or a queryset ``update()`` of users (see
+    ``UserQuerySet``), drops its entry in the process that made the
+    change; other workers pick the change up when their entry expires, so
+    ``ttl`` bounds how long a role change or deactivation takes to apply
+    everywhere.  Raw SQL and writes from other processes (e.g. a
+    management command) are only seen once ``ttl`` has passed.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        conf = settings.AUTH_USER_CACHE
+        return cls(ttl=conf['TTL'], max_entries=conf['MAX_ENTRIES'])
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # Requests get their own copy so nothing leaks between them.
+        return copy.copy(user)
+
+    def put(self, user_id, user):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, copy.copy(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache.from_settings()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def _invalidate_cached_user(sender, instance, **kwargs):
+    # Covers AdminUserDetailView updates and deletes as well as any other
+    # write (admin site, password changes, shell).
+    user_cache.invalidate(str(getattr(instance, api_settings.USER_ID_FIELD)))
+
+
+def cached_user_keys(users):
+    """``user_cache`` keys of the users in queryset ``users``."""
+    return [str(user_id) for user_id in users.values_list(api_settings.USER_ID_FIELD, flat=True)]
+
+
+def invalidate_cached_users(keys):
+    for key in keys:
+        user_cache.invalidate(key)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the token's user through ``user_cache``.
+
+    Only the row lookup is cached; the active and revoked-token checks run
+    on every request against the cached row.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        key = str(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            try:
+                user = get_user_model().objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except get_user_model().DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            user_cache.put(key, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
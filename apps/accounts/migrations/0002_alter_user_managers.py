@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:22
+
+import apps.accounts.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', apps.accounts.models.UserManager()),
+            ],
+        ),
+    ]
@@ -1,5 +1,23 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+from django.db import models, transaction
+
+
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # Bulk updates (and bulk_update, which goes through here) send no
+        # post_save, so drop the affected users from this process's JWT
+        # user cache once they commit; other workers wait out its TTL. The
+        # keys are collected first as the update may change what matches.
+        from .authentication import cached_user_keys, invalidate_cached_users
+
+        keys = cached_user_keys(self)
+        updated = super().update(**kwargs)
+        transaction.on_commit(lambda: invalidate_cached_users(keys), using=self.db)
+        return updated
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -11,6 +29,8 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='analyst')
 
+    objects = UserManager()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
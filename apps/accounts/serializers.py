@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
+from apps.history.models import UserUsage
+from apps.history.usage import summarize
+
 User = get_user_model()
 
 
@@ -31,7 +34,15 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class AdminUserSerializer(serializers.ModelSerializer):
+    usage = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ['id', 'email', 'username', 'first_name', 'last_name', 'role', 'is_active', 'date_joined']
+        fields = ['id', 'email', 'username', 'first_name', 'last_name', 'role', 'is_active', 'date_joined', 'usage']
         read_only_fields = ['id', 'date_joined']
+
+    def get_usage(self, user):
+        try:
+            return summarize(user.usage)
+        except UserUsage.DoesNotExist:
+            return None
@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.history.models import DailyUsage, UserUsage
+from .authentication import user_cache
+from .models import User
+
+
+class UserCacheInvalidationTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.user = User.objects.create_user(username='a', email='a@example.com', password='pw12345')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def me(self):
+        return self.client.get('/auth/me/')
+
+    def test_user_is_cached(self):
+        self.assertEqual(self.me().status_code, 200)
+        self.assertIsNotNone(user_cache.get(str(self.user.pk)))
+
+    def test_save_invalidates(self):
+        self.me()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_queryset_update_invalidates(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(is_active=True).update(is_active=False)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_bulk_update_invalidates(self):
+        self.me()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.bulk_update([self.user], ['is_active'])
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_update_invalidates_only_once_committed(self):
+        self.me()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            User.objects.filter(pk=self.user.pk).update(role='admin')
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNotNone(user_cache.get(str(self.user.pk)))
+
+
+class AdminUsageTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='root', email='root@example.com', password='pw', role='admin')
+        self.user = User.objects.create_user(username='a', email='a@example.com', password='pw')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        today = timezone.localdate()
+        for user, conversions, timings in ((self.admin, 1, [1]), (self.user, 3, [0, 3])):
+            DailyUsage.objects.create(user=user, day=today, conversions=conversions, files=conversions,
+                                      bytes_converted=10 * conversions, timings=timings)
+        UserUsage.objects.create(user=self.user, conversions=3, files=3, bytes_converted=30, timings=[0, 3])
+
+    def test_daily_usage_merges_users(self):
+        response = self.client.get('/auth/usage/daily/')
+        self.assertEqual(response.status_code, 200)
+        [day] = response.data
+        self.assertEqual(
+            (day['active_users'], day['conversions'], day['files'], day['bytes_converted']), (2, 4, 4, 40),
+        )
+        self.assertEqual(day['p50_ms'], 1.2)
+
+    def test_daily_usage_of_one_user(self):
+        [day] = self.client.get(f'/auth/usage/daily/?user={self.user.pk}').data
+        self.assertEqual((day['active_users'], day['conversions']), (1, 3))
+        self.assertEqual(self.client.get('/auth/usage/daily/?days=x').status_code, 400)
+
+    def test_user_listing_includes_the_rollup(self):
+        users = {row['email']: row for row in self.client.get('/auth/users/').data['results']}
+        self.assertIsNone(users['root@example.com']['usage'])
+        self.assertEqual(users['a@example.com']['usage']['conversions'], 3)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/auth/usage/daily/').status_code, 403)
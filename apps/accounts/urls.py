@@ -10,4 +10,5 @@ urlpatterns = [
     path('me/', views.MeView.as_view(), name='me'),
     path('users/', views.AdminUserListView.as_view(), name='admin-user-list'),
     path('users/<int:pk>/', views.AdminUserDetailView.as_view(), name='admin-user-detail'),
+    path('usage/daily/', views.AdminDailyUsageView.as_view(), name='admin-daily-usage'),
 ]
@@ -1,7 +1,15 @@
+from datetime import timedelta
+
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from apps.history.models import DailyUsage
+from apps.history.usage import merge_timings, summarize
 
 from .serializers import RegisterSerializer, UserSerializer, AdminUserSerializer
 
@@ -25,13 +33,61 @@ class IsAdmin(permissions.BasePermission):
         return request.user.is_authenticated and request.user.role == 'admin'
 
 
+class AdminUserPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 class AdminUserListView(generics.ListAPIView):
-    queryset = User.objects.all().order_by('-date_joined')
+    queryset = User.objects.select_related('usage').order_by('-date_joined', '-pk')
     serializer_class = AdminUserSerializer
     permission_classes = [IsAdmin]
+    pagination_class = AdminUserPagination
 
 
 class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('usage')
     serializer_class = AdminUserSerializer
     permission_classes = [IsAdmin]
+
+
+class AdminDailyUsageView(APIView):
+    """Per-day conversion totals from the DailyUsage rollup.
+
+    ``?days=`` (default 30, at most 366) limits the range and ``?user=``
+    restricts it to one user.
+    """
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        params = {}
+        for name in ('days', 'user'):
+            if name in request.query_params:
+                try:
+                    params[name] = int(request.query_params[name])
+                except ValueError:
+                    raise ValidationError({name: ['Expected an integer.']})
+        days = min(params.get('days', 30), 366)
+        rows = DailyUsage.objects.filter(day__gt=timezone.localdate() - timedelta(days=days))
+        if 'user' in params:
+            rows = rows.filter(user_id=params['user'])
+
+        by_day = {}
+        for row in rows.order_by('day'):
+            total = by_day.get(row.day)
+            if total is None:
+                total = by_day[row.day] = DailyUsage(day=row.day, timings=[])
+                total.users = 0
+            total.users += 1
+            total.conversions += row.conversions
+            total.files += row.files
+            total.bytes_converted += row.bytes_converted
+            merge_timings(total.timings, row.timings)
+            if total.last_activity is None or total.last_activity < row.last_activity:
+                total.last_activity = row.last_activity
+        return Response([
+            {'day': day, 'active_users': total.users, **summarize(total)}
+            for day, total in by_day.items()
+        ])
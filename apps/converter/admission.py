@@ -0,0 +1,209 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    lane TEXT NOT NULL,
+    user_key TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tickets_user ON tickets (user_key);
+CREATE TABLE IF NOT EXISTS buckets (
+    user_key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class Ticket:
+    """An admitted conversion; must be released when the request ends."""
+
+    def __init__(self, controller, ticket_id, user_key, lane):
+        self._controller = controller
+        self.id = ticket_id
+        self.user_key = user_key
+        self.lane = lane
+        self._released = False
+
+    def charge_files(self, count):
+        """Debit the per-file cost once the number of files is known."""
+        self._controller._charge(self.user_key, count * self._controller.file_cost)
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self)
+
+
+class AdmissionController:
+    """Cost-aware admission for conversion requests.
+
+    A request's cost is estimated from its body size before anything is
+    parsed.  Requests at or above ``large_request_bytes`` run in the large
+    lane and everything else in the interactive lane; each lane has its
+    own slot count.  Per user there is a concurrency limit and a byte-rate
+    token bucket (``user_bytes_per_second`` refill, ``user_burst_bytes``
+    capacity).  When any limit is hit the request is rejected with DRF's
+    ``Throttled`` (429 + Retry-After) instead of queueing into a timeout.
+
+    Slots, per-user counts and buckets live in a small SQLite file at
+    ``path`` shared by every worker process on the host, so the limits
+    hold for the whole deployment rather than per worker.  With sync
+    workers each request occupies a whole worker: keeping the large lane
+    below the number of workers (times threads) is what leaves workers
+    free for pasted snippets while big uploads are running.
+
+    Every admitted request holds a lease row until it is released.  Rows
+    of processes that died, or older than ``lease_seconds``, are dropped,
+    so a killed worker cannot keep its slots.
+    """
+
+    def __init__(
+        self,
+        path,
+        large_request_bytes,
+        small_lane_slots,
+        large_lane_slots,
+        user_concurrency,
+        user_bytes_per_second,
+        user_burst_bytes,
+        file_cost_bytes,
+        lease_seconds=300,
+    ):
+        self.path = os.fspath(path)
+        self.large_request_bytes = large_request_bytes
+        self.slots = {'small': small_lane_slots, 'large': large_lane_slots}
+        self.user_concurrency = user_concurrency
+        self.rate = user_bytes_per_second
+        self.burst = user_burst_bytes
+        self.file_cost = file_cost_bytes
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+
+    @classmethod
+    def from_settings(cls):
+        conf = settings.CONVERSION_ADMISSION
+        return cls(
+            path=conf['STATE_PATH'],
+            large_request_bytes=conf['LARGE_REQUEST_BYTES'],
+            small_lane_slots=conf['SMALL_LANE_SLOTS'],
+            large_lane_slots=conf['LARGE_LANE_SLOTS'],
+            user_concurrency=conf['USER_CONCURRENCY'],
+            user_bytes_per_second=conf['USER_BYTES_PER_SECOND'],
+            user_burst_bytes=conf['USER_BURST_BYTES'],
+            file_cost_bytes=conf['FILE_COST_BYTES'],
+            lease_seconds=conf['LEASE_SECONDS'],
+        )
+
+    def admit(self, user_key, cost_bytes):
+        """Return a Ticket or raise Throttled with a Retry-After estimate."""
+        lane = 'large' if cost_bytes >= self.large_request_bytes else 'small'
+        # A request larger than the bucket is admitted once the bucket is full.
+        cost = min(cost_bytes, self.burst)
+        now = time.time()
+        with self._transaction() as db:
+            db.execute('DELETE FROM tickets WHERE expires < ?', (now,))
+            tokens = self._tokens(db, user_key, now)
+            user_active, lane_active = self._counts(db, user_key, lane)
+            if user_active >= self.user_concurrency or lane_active >= self.slots[lane]:
+                self._drop_dead_processes(db)
+                user_active, lane_active = self._counts(db, user_key, lane)
+
+            if user_active >= self.user_concurrency:
+                raise Throttled(wait=1, detail='Too many concurrent conversions for this user.')
+            if tokens < cost:
+                raise Throttled(
+                    wait=math.ceil((cost - tokens) / self.rate),
+                    detail='Conversion byte rate exceeded.',
+                )
+            if lane_active >= self.slots[lane]:
+                raise Throttled(
+                    wait=5 if lane == 'large' else 1,
+                    detail=f'The {lane} conversion lane is full.',
+                )
+            self._store_tokens(db, user_key, tokens - cost, now)
+            ticket_id = db.execute(
+                'INSERT INTO tickets (lane, user_key, pid, expires) VALUES (?, ?, ?, ?)',
+                (lane, user_key, os.getpid(), now + self.lease_seconds),
+            ).lastrowid
+        return Ticket(self, ticket_id, user_key, lane)
+
+    def _charge(self, user_key, cost):
+        now = time.time()
+        with self._transaction() as db:
+            self._store_tokens(db, user_key, self._tokens(db, user_key, now) - cost, now)
+
+    def _release(self, ticket):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute('DELETE FROM tickets WHERE id = ?', (ticket.id,))
+            # Idle users with a full bucket need no state.
+            if self._tokens(db, ticket.user_key, now) >= self.burst and not self._counts(db, ticket.user_key)[0]:
+                db.execute('DELETE FROM buckets WHERE user_key = ?', (ticket.user_key,))
+
+    def _tokens(self, db, user_key, now):
+        row = db.execute('SELECT tokens, updated FROM buckets WHERE user_key = ?', (user_key,)).fetchone()
+        if row is None:
+            return self.burst
+        tokens, updated = row
+        return min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+
+    @staticmethod
+    def _store_tokens(db, user_key, tokens, now):
+        db.execute(
+            'INSERT INTO buckets (user_key, tokens, updated) VALUES (?, ?, ?) '
+            'ON CONFLICT (user_key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+            (user_key, tokens, now),
+        )
+
+    @staticmethod
+    def _counts(db, user_key, lane=None):
+        """(active tickets of the user, active tickets in ``lane``)."""
+        return db.execute(
+            'SELECT COALESCE(SUM(user_key = ?), 0), COALESCE(SUM(lane = ?), 0) FROM tickets',
+            (user_key, lane),
+        ).fetchone()
+
+    @staticmethod
+    def _drop_dead_processes(db):
+        for (pid,) in db.execute('SELECT DISTINCT pid FROM tickets').fetchall():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                db.execute('DELETE FROM tickets WHERE pid = ?', (pid,))
+            except PermissionError:
+                pass  # Alive, owned by someone else.
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        # IMMEDIATE takes the write lock up front, so the checks and the
+        # updates of one admission are never interleaved with another's.
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _connection(self):
+        # One connection per thread and process: never reuse one across a fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            # The state is only meaningful while the workers run; losing
+            # the last transactions in an OS crash is harmless.
+            db.executescript('PRAGMA journal_mode=WAL; PRAGMA synchronous=OFF;' + _SCHEMA)
+            local.db, local.pid = db, os.getpid()
+        return local.db
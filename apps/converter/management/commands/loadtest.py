@@ -0,0 +1,367 @@
+import io
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.converter.views import EXAMPLES_DIR
+
+KINDS = ('paste', 'files', 'zip', 'history')
+DEFAULT_MIX = 'paste=4,files=2,zip=1,history=3'
+THROTTLED = 'HTTP 429'
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the HTTP API end to end. Starts gunicorn on a free local '
+        'port with the current settings (or targets --url), logs in, and '
+        'sends a weighted mix of pasted-code, multi-file and zip conversions '
+        'and history reads from --concurrency client threads. Reports '
+        'throughput, latency percentiles, throttling (HTTP 429) and error '
+        'rates per request kind. Unless --email is given, every client thread '
+        'logs in as its own temporary user, so per-user admission limits do '
+        'not throttle the run; the users are deleted (with their history) '
+        'afterwards. With --url that only works when the server uses the same '
+        'database. With --email all clients share one user and its limits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server instead of starting one.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='gunicorn workers.')
+        parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker.')
+        parser.add_argument('--asgi', action='store_true', help='Serve the async view with uvicorn workers.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads.')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to measure.')
+        parser.add_argument('--warmup', type=float, default=3.0, help='Seconds to run before measuring.')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Request weights (default: {DEFAULT_MIX}).')
+        parser.add_argument(
+            '--repeat-ratio', type=float, default=0.0,
+            help='Share of conversions that resend an earlier payload and may hit the conversion cache.',
+        )
+        parser.add_argument('--email', help='Log in as this existing user instead of a temporary one.')
+        parser.add_argument('--password', default='')
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file as JSON.')
+
+    def handle(self, *args, **options):
+        mix = self._parse_mix(options['mix'])
+        examples = self._examples()
+
+        users = None
+        if options['email'] is None:
+            password = uuid.uuid4().hex
+            users = self._create_users(options['concurrency'], password)
+            logins = [(user.email, password) for user in users]
+        else:
+            logins = [(options['email'], options['password'])] * options['concurrency']
+
+        server = None
+        try:
+            if options['url']:
+                base_url = options['url'].rstrip('/')
+            else:
+                server, base_url = self._start_server(options)
+            tokens = {}
+            for login in logins:
+                if login not in tokens:
+                    tokens[login] = self._login(base_url, *login)
+            self._describe(base_url, options, mix)
+            results, elapsed = self._run(base_url, [tokens[login] for login in logins], examples, mix, options)
+        finally:
+            if server is not None:
+                self._stop_server(server)
+            if users is not None:
+                get_user_model().objects.filter(email__in=[user.email for user in users]).delete()
+
+        summary = self._summarize(results, elapsed)
+        self._report(summary, elapsed)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({
+                    'config': {key: options[key] for key in (
+                        'workers', 'threads', 'asgi', 'concurrency', 'duration', 'repeat_ratio',
+                    )} | {'mix': mix, 'url': options['url']},
+                    'results': summary,
+                }, f, indent=2)
+
+    def _create_users(self, count, password):
+        # One user per client thread: admission limits are per user, and a
+        # shared user would measure throttling instead of the server.
+        User = get_user_model()
+        stamp = int(time.time())
+        hashed = make_password(password)  # Hashed once for all of them.
+        return User.objects.bulk_create([
+            User(username=f'loadtest-{stamp}-{n}', email=f'loadtest-{stamp}-{n}@localhost', password=hashed)
+            for n in range(count)
+        ])
+
+    def _parse_mix(self, spec):
+        mix = {}
+        for part in spec.split(','):
+            kind, _, weight = part.partition('=')
+            kind = kind.strip()
+            if kind not in KINDS:
+                raise CommandError(f'Unknown request kind in --mix: {kind!r} (choose from {", ".join(KINDS)})')
+            try:
+                mix[kind] = float(weight)
+            except ValueError:
+                raise CommandError(f'Bad weight in --mix: {part!r}')
+        if not any(weight > 0 for weight in mix.values()):
+            raise CommandError('--mix needs at least one positive weight')
+        return mix
+
+    def _examples(self):
+        if not os.path.isdir(EXAMPLES_DIR):
+            raise CommandError(f'Example sources not found in {EXAMPLES_DIR}')
+        examples = []
+        for name in sorted(os.listdir(EXAMPLES_DIR)):
+            if name.endswith('.java'):
+                with open(os.path.join(EXAMPLES_DIR, name), encoding='utf-8') as f:
+                    examples.append((name, f.read()))
+        if not examples:
+            raise CommandError(f'No .java files in {EXAMPLES_DIR}')
+        return examples
+
+    # Server
+
+    def _start_server(self, options):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        env = os.environ | {
+            'GUNICORN_BIND': f'127.0.0.1:{port}',
+            'GUNICORN_WORKERS': str(options['workers']),
+            'GUNICORN_THREADS': str(options['threads']),
+        }
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'config/gunicorn.conf.py']
+        if options['asgi']:
+            env['DJANGO_ASYNC_VIEWS'] = '1'
+            command += ['-k', 'uvicorn_worker.UvicornWorker', 'config.asgi:application']
+        else:
+            command.append('config.wsgi:application')
+
+        # The access log would dominate the output; keep it for post-mortems.
+        log = tempfile.NamedTemporaryFile(prefix='loadtest-server-', suffix='.log', delete=False)
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        server.log_path = log.name
+        base_url = f'http://127.0.0.1:{port}'
+
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with code {server.returncode}; see {log.name}')
+            try:
+                urllib.request.urlopen(f'{base_url}/examples/', timeout=1).close()
+                return server, base_url
+            except urllib.error.HTTPError:
+                return server, base_url  # Up; the view just wants a token.
+            except OSError:
+                time.sleep(0.2)
+        self._stop_server(server)
+        raise CommandError(f'gunicorn did not start within 60s; see {log.name}')
+
+    def _stop_server(self, server):
+        # SIGTERM is a graceful shutdown, so pending history and usage
+        # writes are flushed before the temporary user is deleted.
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        self.stdout.write(f'Server log: {server.log_path}')
+
+    def _login(self, base_url, email, password):
+        status, body = _request(base_url, 'POST', '/auth/login/', json.dumps(
+            {'email': email, 'password': password},
+        ).encode(), 'application/json')
+        if status != 200:
+            raise CommandError(f'Login as {email} failed with HTTP {status}: {body[:200]!r}')
+        return json.loads(body)['access']
+
+    def _describe(self, base_url, options, mix):
+        server = 'external' if options['url'] else (
+            f'{options["workers"]} workers x {options["threads"]} threads'
+            + (', asgi' if options['asgi'] else '')
+        )
+        weights = ', '.join(f'{kind}={weight:g}' for kind, weight in mix.items())
+        self.stdout.write(
+            f'{base_url} ({server}), {options["concurrency"]} clients, '
+            f'{options["duration"]:g}s after {options["warmup"]:g}s warm-up, mix {weights}'
+        )
+
+    # Load
+
+    def _run(self, base_url, tokens, examples, mix, options):
+        """Run one client thread per token."""
+        started = time.perf_counter()
+        measure_from = started + options['warmup']
+        deadline = measure_from + options['duration']
+        counter = iter(range(sys.maxsize))
+        results = []
+        threads = [
+            threading.Thread(
+                target=self._client,
+                args=(base_url, token, examples, mix, options, counter, measure_from, deadline, results),
+            )
+            for token in tokens
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - max(measure_from, started)
+
+    def _client(self, base_url, token, examples, mix, options, counter, measure_from, deadline, results):
+        rng = random.Random()
+        kinds, weights = zip(*mix.items())
+        local = []
+        refs = []  # History entries are only visible to their own user.
+        while (now := time.perf_counter()) < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            if kind == 'history':
+                method, path, body, content_type = self._history_request(rng, refs)
+            else:
+                # A marker class makes each payload unique, so conversions
+                # are parsed instead of answered from the conversion cache.
+                if rng.random() < options['repeat_ratio']:
+                    marker = ''
+                else:
+                    marker = f'\nclass LoadTest{next(counter)} {{}}\n'
+                method, path, body, content_type = self._convert_request(kind, examples, marker)
+
+            began = time.perf_counter()
+            try:
+                status, response = _request(base_url, method, path, body, content_type, token)
+                error = None if status < 400 else f'HTTP {status}'
+            except OSError as exc:
+                status, response, error = None, b'', f'{type(exc).__name__}: {exc}'
+            latency = time.perf_counter() - began
+
+            if kind != 'history' and error is None:
+                ref = json.loads(response).get('history_ref')
+                if ref:
+                    refs.append(ref)
+            if now >= measure_from:
+                local.append((kind, latency, len(body or b''), error))
+        results.extend(local)
+
+    def _convert_request(self, kind, examples, marker):
+        if kind == 'paste':
+            name, code = examples[0]
+            return 'POST', '/convert/', json.dumps({'code': code + marker}).encode(), 'application/json'
+        files = [(name, code.encode()) for name, code in examples]
+        files[0] = (files[0][0], files[0][1] + marker.encode())
+        if kind == 'zip':
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for name, data in files:
+                    archive.writestr(name, data)
+            files = [('sources.zip', buffer.getvalue())]
+        body, content_type = _multipart(files)
+        return 'POST', '/convert/', body, content_type
+
+    def _history_request(self, rng, refs):
+        if refs and rng.random() < 0.5:
+            return 'GET', f'/history/ref/{rng.choice(refs)}/', None, None
+        return 'GET', '/history/', None, None
+
+    # Report
+
+    def _summarize(self, results, elapsed):
+        summary = {}
+        for kind in (*KINDS, 'total'):
+            ops = results if kind == 'total' else [r for r in results if r[0] == kind]
+            if not ops:
+                continue
+            ok = sorted(latency for _, latency, _, error in ops if error is None)
+            # Admission rejections are the server working as configured;
+            # they are counted apart from failures.
+            throttled = sum(1 for _, _, _, error in ops if error == THROTTLED)
+            errors = {}
+            for _, _, _, error in ops:
+                if error is not None and error != THROTTLED:
+                    errors[error] = errors.get(error, 0) + 1
+            entry = {
+                'requests': len(ops),
+                'ok_per_second': round(len(ok) / elapsed, 2),
+                'throttled': throttled,
+                'throttle_rate': round(throttled / len(ops), 4),
+                'error_rate': round(sum(errors.values()) / len(ops), 4),
+                'errors': errors,
+                'upload_bytes': sum(size for _, _, size, _ in ops),
+            }
+            if len(ok) > 1:
+                cuts = statistics.quantiles(ok, n=100, method='inclusive')
+                entry |= {
+                    'p50_ms': round(cuts[49] * 1000, 1),
+                    'p95_ms': round(cuts[94] * 1000, 1),
+                    'p99_ms': round(cuts[98] * 1000, 1),
+                    'max_ms': round(ok[-1] * 1000, 1),
+                }
+            summary[kind] = entry
+        return summary
+
+    def _report(self, summary, elapsed):
+        if not summary:
+            self.stdout.write('No requests completed in the measured window.')
+            return
+        for kind, entry in summary.items():
+            line = f'{kind:7}: {entry["ok_per_second"]:8.1f} req/s'
+            if 'p50_ms' in entry:
+                line += (
+                    f', p50 {entry["p50_ms"]:.1f} ms, p95 {entry["p95_ms"]:.1f} ms,'
+                    f' p99 {entry["p99_ms"]:.1f} ms, max {entry["max_ms"]:.1f} ms'
+                )
+            line += f', {entry["throttle_rate"]:.2%} throttled (429), {entry["error_rate"]:.2%} errors of {entry["requests"]}'
+            if kind == 'total':
+                self.stdout.write(self.style.SUCCESS(line))
+                continue
+            self.stdout.write(line)
+            for error, count in sorted(entry['errors'].items(), key=lambda item: -item[1])[:3]:
+                self.stdout.write(f'         {count} x {error}')
+        self.stdout.write(f'Measured over {elapsed:.1f}s')
+
+
+def _request(base_url, method, path, body=None, content_type=None, token=None):
+    """Send one request on a fresh connection; returns (status, body)."""
+    request = urllib.request.Request(base_url + path, data=body, method=method)
+    if content_type:
+        request.add_header('Content-Type', content_type)
+    if token:
+        request.add_header('Authorization', f'Bearer {token}')
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read()
+
+
+def _multipart(files):
+    """multipart/form-data body uploading ``files`` as the ``files`` field."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, data in files:
+        parts.append(
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="files"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode()
+            + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
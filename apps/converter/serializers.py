@@ -0,0 +1,69 @@
+from rest_framework import serializers
+
+from parsers.class_diagram import PARTITIONS
+
+
+class GeneratorOptionsSerializer(serializers.Serializer):
+    """Query parameters configuring the class, flow and sequence diagram generators.
+
+    The sequence diagram is only drawn when one of its parameters is given.
+    """
+
+    class_page_size = serializers.IntegerField(
+        min_value=0, required=False, help_text='Split the class diagram into pages of this many classes; 0 or unset renders it whole',
+    )
+    class_partition = serializers.ChoiceField(choices=PARTITIONS, required=False)
+
+    flow_classes = serializers.CharField(required=False, help_text='Comma-separated class names')
+    flow_methods = serializers.CharField(required=False, help_text='Method name pattern, e.g. get*')
+    flow_rank = serializers.ChoiceField(choices=['complexity'], required=False)
+    flow_max_methods = serializers.IntegerField(min_value=1, required=False)
+    flow_max_statements = serializers.IntegerField(min_value=1, required=False)
+    flow_max_lines = serializers.IntegerField(min_value=1, required=False)
+
+    sequence_entry = serializers.RegexField(
+        r'^[\w$]+\.[\w$]+$', required=False, help_text='Entry method as Class.method',
+    )
+    sequence_depth = serializers.IntegerField(min_value=1, max_value=16, required=False)
+
+    def to_generator_options(self):
+        """Validated data as ConversionService ``generator_options``."""
+        data = self.validated_data
+        generator_options = {}
+
+        class_options = {}
+        if 'class_page_size' in data:
+            class_options['page_size'] = data['class_page_size']
+        if 'class_partition' in data:
+            class_options['partition'] = data['class_partition']
+        if class_options:
+            generator_options['class'] = class_options
+
+        options = {}
+        if 'flow_classes' in data:
+            options['class_names'] = sorted(
+                name.strip() for name in data['flow_classes'].split(',') if name.strip()
+            )
+        if 'flow_methods' in data:
+            options['method_pattern'] = data['flow_methods']
+        if 'flow_rank' in data:
+            options['rank_by_complexity'] = True
+        for param, option in (
+            ('flow_max_methods', 'max_methods'),
+            ('flow_max_statements', 'max_statements'),
+            ('flow_max_lines', 'max_lines'),
+        ):
+            if param in data:
+                options[option] = data[param]
+        if options:
+            generator_options['flow'] = options
+
+        options = {}
+        if 'sequence_entry' in data:
+            options['entry'] = data['sequence_entry']
+        if 'sequence_depth' in data:
+            options['max_depth'] = data['sequence_depth']
+        if options:
+            generator_options['sequence'] = options
+
+        return generator_options or None
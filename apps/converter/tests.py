@@ -0,0 +1,454 @@
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import zipfile
+from unittest import mock
+
+import zstandard
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from apps.accounts.models import User
+from apps.history.models import DiagramHistory
+from apps.history.usage import UsageRecorder
+from services import tracing
+from . import views
+from .admission import AdmissionController, Ticket
+
+SOURCE = 'public class Sample { private int count; public int next() { return count + 1; } }'
+
+
+def _controller(path, **overrides):
+    options = {
+        'large_request_bytes': 1000,
+        'small_lane_slots': 2,
+        'large_lane_slots': 1,
+        'user_concurrency': 10,
+        'user_bytes_per_second': 100,
+        'user_burst_bytes': 10_000,
+        'file_cost_bytes': 10,
+    }
+    options.update(overrides)
+    return AdmissionController(path, **options)
+
+
+class AdmissionControllerTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'admission.sqlite3')
+        self.admission = _controller(self.path)
+
+    def assertThrottled(self, wait, *args):
+        with self.assertRaises(Throttled) as caught:
+            self.admission.admit(*args)
+        self.assertEqual(caught.exception.wait, wait)
+
+    def test_small_lane_fills(self):
+        self.admission.admit('user:1', 10)
+        self.admission.admit('user:2', 10)
+        self.assertThrottled(1, 'user:3', 10)
+
+    def test_large_lane_fills_without_blocking_the_small_lane(self):
+        self.admission.admit('user:1', 5000)
+        self.assertThrottled(5, 'user:2', 5000)
+        self.admission.admit('user:2', 10)
+
+    def test_release_frees_the_slot(self):
+        ticket = self.admission.admit('user:1', 5000)
+        ticket.release()
+        ticket.release()
+        self.admission.admit('user:2', 5000)
+
+    def test_user_concurrency(self):
+        admission = _controller(self.path, small_lane_slots=10, user_concurrency=2)
+        admission.admit('user:1', 10)
+        admission.admit('user:1', 10)
+        with self.assertRaises(Throttled):
+            admission.admit('user:1', 10)
+        admission.admit('user:2', 10)
+
+    def test_byte_bucket(self):
+        admission = _controller(
+            self.path, user_burst_bytes=100, user_bytes_per_second=10, large_request_bytes=10_000,
+        )
+        admission.admit('user:1', 80).release()
+        with self.assertRaises(Throttled) as caught:
+            admission.admit('user:1', 50)
+        self.assertEqual(caught.exception.wait, 3)
+
+    def test_file_cost_is_charged_to_the_bucket(self):
+        admission = _controller(self.path, user_burst_bytes=100, large_request_bytes=10_000)
+        admission.admit('user:1', 10).charge_files(8)
+        with self.assertRaises(Throttled):
+            admission.admit('user:1', 20)
+
+    def test_state_is_shared_between_processes(self):
+        # Two controllers on one file stand in for two gunicorn workers.
+        self.admission.admit('user:1', 5000)
+        other_worker = _controller(self.path)
+        with self.assertRaises(Throttled):
+            other_worker.admit('user:2', 5000)
+
+    def test_leases_of_dead_processes_are_dropped(self):
+        child = subprocess.run(
+            [sys.executable, '-c', 'import os; print(os.getpid())'],
+            capture_output=True, text=True, check=True,
+        )
+        with mock.patch('os.getpid', return_value=int(child.stdout)):
+            _controller(self.path).admit('user:1', 5000)
+        self.admission.admit('user:2', 5000)
+
+    def test_expired_leases_are_dropped(self):
+        _controller(self.path, lease_seconds=-1).admit('user:1', 5000)
+        self.admission.admit('user:2', 5000)
+
+
+class ConvertViewTestCase(TestCase):
+    """Runs against a private admission state file and writes usage rollups synchronously."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.admission = _controller(os.path.join(directory.name, 'admission.sqlite3'))
+        for name, value in (('admission', self.admission), ('usage', UsageRecorder(flush_interval=0))):
+            patcher = mock.patch.object(views, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='a', email='a@example.com', password='pw12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def convert(self, code=SOURCE, **headers):
+        return self.client.post('/convert/', {'code': code}, format='json', **headers)
+
+
+class ConvertAdmissionTest(ConvertViewTestCase):
+    def test_full_large_lane_answers_429_with_retry_after(self):
+        self.admission.admit('user:other', 5000)
+        response = self.convert(SOURCE + ' ' * 2000)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_full_small_lane_answers_429_with_retry_after(self):
+        self.admission.admit('user:x', 10)
+        self.admission.admit('user:y', 10)
+        response = self.convert()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_ticket_is_released_after_the_response(self):
+        for _ in range(3):
+            response = self.convert()
+            self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CONVERSION_EXECUTOR_WORKERS=0)
+class AsyncConvertViewTest(ConvertViewTestCase):
+    def convert(self, code=SOURCE, **headers):
+        request = APIRequestFactory().post('/convert/', {'code': code}, format='json', **headers)
+        force_authenticate(request, self.user)
+        return async_to_sync(views.AsyncConvertView.as_view())(request)
+
+    def test_miss_hit_and_not_modified(self):
+        first = self.convert()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['diagrams'], self.convert().data['diagrams'])
+        response = self.convert(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(DiagramHistory.objects.filter(user=self.user).count(), 2)
+
+    def test_admission_runs_off_the_event_loop(self):
+        on_loop = []
+
+        def record(method):
+            def wrapper(ticket, *args):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop.append(method.__name__)
+                except RuntimeError:
+                    pass
+                return method(ticket, *args)
+            return wrapper
+
+        with mock.patch.object(Ticket, 'release', record(Ticket.release)), \
+                mock.patch.object(Ticket, 'charge_files', record(Ticket.charge_files)):
+            for _ in range(3):
+                self.assertEqual(self.convert().status_code, 200)
+        self.assertEqual(on_loop, [])
+
+
+class ConvertETagTest(ConvertViewTestCase):
+    def test_etag_is_weak_and_answers_304(self):
+        etag = self.convert()['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.convert(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.convert(HTTP_IF_NONE_MATCH=etag.removeprefix('W/')).status_code, 304)
+
+    def test_etag_depends_on_encoding_and_options(self):
+        etag = self.convert()['ETag']
+        deflate = self.client.post('/convert/?encoding=deflate', {'code': SOURCE}, format='json')
+        paged = self.client.post('/convert/?class_page_size=1', {'code': SOURCE}, format='json')
+        self.assertEqual(len({etag, deflate['ETag'], paged['ETag']}), 3)
+
+    def test_generator_change_invalidates_the_etag(self):
+        etag = self.convert()['ETag']
+        with mock.patch('services.conversion_service.GENERATOR_VERSION', 'next-build'):
+            response = self.convert(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_star_only_matches_an_existing_conversion(self):
+        code = SOURCE.replace('Sample', 'Starred')
+        self.assertEqual(self.convert(code, HTTP_IF_NONE_MATCH='*').status_code, 200)
+        self.assertEqual(self.convert(code, HTTP_IF_NONE_MATCH='*').status_code, 304)
+
+    def test_star_does_not_reveal_other_users_conversions(self):
+        code = SOURCE.replace('Sample', 'Private')
+        self.convert(code)
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='b', email='b@example.com', password='pw12345'))
+        response = other.post('/convert/', {'code': code}, format='json', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 200)
+
+    def test_sources_are_hashed_once(self):
+        with mock.patch.object(views.service, '_hash', wraps=views.service._hash) as hashed:
+            self.convert(SOURCE.replace('Sample', 'HashedOnce'))
+        self.assertEqual(hashed.call_count, 1)
+
+
+class ConvertLookupTest(ConvertViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.code = SOURCE.replace('Sample', 'Lookup')
+        self.key = self.convert(self.code)['ETag'].removeprefix('W/').strip('"')
+
+    def test_own_conversion_is_found(self):
+        self.assertEqual(self.client.head(f'/convert/{self.key}/').status_code, 200)
+        response = self.client.get(f'/convert/{self.key}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sources'][0]['code'], self.code)
+        self.assertEqual(
+            self.client.get(f'/convert/{self.key}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304,
+        )
+
+    def test_other_users_conversion_is_not_found(self):
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(username='b', email='b@example.com', password='pw12345'))
+        self.assertEqual(other.head(f'/convert/{self.key}/').status_code, 404)
+        self.assertEqual(other.get(f'/convert/{self.key}/').status_code, 404)
+
+    def test_unknown_key_is_not_found(self):
+        self.assertEqual(self.client.get(f'/convert/{"0" * 64}/').status_code, 404)
+
+
+class ExamplesViewTest(ConvertViewTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.examples = directory.name
+        self.write('Sample.java', SOURCE)
+        for patcher in (
+            mock.patch.object(views, 'EXAMPLES_DIR', self.examples),
+            mock.patch.object(views.ExamplesView, '_entry', None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write(self, name, code, mtime_ns=1_700_000_000_000_000_000):
+        path = os.path.join(self.examples, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(code)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_answers_304(self):
+        response = self.client.get('/examples/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/examples/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(
+            self.client.get('/examples/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+        )
+
+    def test_deploy_of_new_generators_is_not_answered_with_304(self):
+        response = self.client.get('/examples/')
+        views.ExamplesView._entry = None  # As in a freshly started worker.
+        with mock.patch('services.conversion_service.GENERATOR_VERSION', 'next-build'), \
+                mock.patch.object(views, 'STARTED_AT', views.STARTED_AT + 3600):
+            by_etag = self.client.get('/examples/', HTTP_IF_NONE_MATCH=response['ETag'])
+            by_date = self.client.get('/examples/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(by_etag.status_code, 200)
+        self.assertNotEqual(by_etag['ETag'], response['ETag'])
+        self.assertEqual(by_date.status_code, 200)
+
+    def test_edit_within_the_same_second_is_picked_up(self):
+        etag = self.client.get('/examples/')['ETag']
+        self.write('Sample.java', SOURCE.replace('count', 'total'), mtime_ns=1_700_000_000_000_000_001)
+        response = self.client.get('/examples/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_edit_keeping_the_mtime_is_picked_up_by_size(self):
+        etag = self.client.get('/examples/')['ETag']
+        self.write('Sample.java', SOURCE.replace('count', 'counter'))
+        self.assertNotEqual(self.client.get('/examples/')['ETag'], etag)
+
+
+class ConvertSequenceTest(ConvertViewTestCase):
+    def test_sequence_diagram_only_when_asked_for(self):
+        self.assertNotIn('sequence', self.convert().data['diagrams'])
+        response = self.client.post('/convert/?sequence_entry=Sample.next', {'code': SOURCE}, format='json')
+        self.assertTrue(response.data['diagrams']['sequence'].startswith('@startuml'))
+
+
+class ConvertPagingTest(ConvertViewTestCase):
+    def test_large_paste_returns_the_whole_class_diagram_by_default(self):
+        code = '\n'.join(f'class C{number} {{ private int value; }}' for number in range(200))
+        response = self.convert(code)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('pages', response.data)
+        self.assertEqual(response.data['diagrams']['class'].count('@startuml'), 1)
+        self.assertIn('class C199', response.data['diagrams']['class'])
+
+    def test_pages_only_when_asked_for(self):
+        code = '\n'.join(f'class C{number} {{}}' for number in range(5))
+        response = self.client.post('/convert/?class_page_size=2', {'code': code}, format='json')
+        self.assertNotIn('class', response.data['diagrams'])
+        self.assertEqual(len(response.data['pages']['class']), 3)
+
+
+
+def _tar(members, mode='w:gz'):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as tf:
+        for name, code in members:
+            data = code.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class ConvertUploadTest(ConvertViewTestCase):
+    MEMBERS = [('src/Order.java', 'public class Order {}'), ('vendor/Util.java', 'public class Util {}')]
+
+    def setUp(self):
+        super().setUp()
+        # Uploads are charged per file and by body size; keep them all admitted.
+        self.admission.burst = self.admission.large_request_bytes = 10 ** 9
+
+    def upload(self, name, data):
+        return self.client.post('/convert/', {'files': [SimpleUploadedFile(name, data)]}, format='multipart')
+
+    def test_tar_uploads(self):
+        zstd = zstandard.ZstdCompressor().compress(_tar(self.MEMBERS, mode='w'))
+        for name, data in (
+            ('code.tar', _tar(self.MEMBERS, mode='w')),
+            ('code.tar.gz', _tar(self.MEMBERS)),
+            ('code.tar.xz', _tar(self.MEMBERS, mode='w:xz')),
+            ('code.tar.zst', zstd),
+        ):
+            with self.subTest(name=name):
+                response = self.upload(name, data)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([s['filename'] for s in response.data['sources']], ['Order.java', 'Util.java'])
+
+    def test_zip_upload(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            for name, code in self.MEMBERS:
+                zf.writestr(name, code)
+        response = self.upload('code.zip', buffer.getvalue())
+        self.assertEqual([s['filename'] for s in response.data['sources']], ['Order.java', 'Util.java'])
+
+    def test_unreadable_archive_is_a_bad_request(self):
+        response = self.upload('code.tar.gz', b'not a tar')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('code.tar.gz', response.data['files'][0])
+
+    def test_identical_files_are_all_kept(self):
+        members = [('src/Order.java', 'public class Order {}'), ('vendor/Copy.java', 'public class Order {}')]
+        response = self.upload('code.tar.gz', _tar(members))
+        self.assertEqual([s['filename'] for s in response.data['sources']], ['Order.java', 'Copy.java'])
+        self.assertNotIn('duplicates_skipped', response.data)
+        entry = DiagramHistory.objects.get(pk=response.data['history_id'])
+        self.assertEqual(entry.filename, 'Order.java, Copy.java')
+        self.assertIn('// Copy.java\npublic class Order {}', entry.source_code)
+
+
+class _Exporter:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def export(self, spans):
+        if self.fail:
+            raise OSError('collector down')
+        self.batches.append(spans)
+
+
+class TracingMiddlewareTest(ConvertViewTestCase):
+    def traced_client(self, sample_rate=1.0, exporter=None):
+        # The middleware configures the tracer when the client first loads it.
+        self.addCleanup(tracing.tracer.configure, 0)
+        self.enterContext(override_settings(TRACING={'SAMPLE_RATE': sample_rate, 'EXPORTER': exporter, 'PATH': None}))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client
+
+    def test_request_is_the_root_of_its_trace(self):
+        exporter = _Exporter()
+        self.client = self.traced_client(exporter=exporter)
+        # Not in the view's conversion cache, so it is parsed in this trace.
+        self.assertEqual(self.convert('public class Traced { }').status_code, 200)
+
+        (spans,) = exporter.batches
+        root = spans[-1]
+        self.assertEqual(root['name'], 'HTTP POST')
+        self.assertIsNone(root['parent_span_id'])
+        self.assertEqual(root['attributes']['http.route'], 'convert/')
+        self.assertEqual(root['attributes']['http.status_code'], 200)
+        self.assertEqual({span['trace_id'] for span in spans}, {root['trace_id']})
+        names = {span['name'] for span in spans}
+        self.assertTrue({'conversion.convert', 'java_parser.parse', 'db.query'} <= names)
+
+    def test_unsampled_requests_are_not_exported(self):
+        exporter = _Exporter()
+        self.client = self.traced_client(0.5, exporter)
+        with mock.patch('services.tracing.random.random', return_value=0.9):
+            self.assertEqual(self.convert().status_code, 200)
+        self.assertEqual(exporter.batches, [])
+
+    def test_export_failure_does_not_fail_the_request(self):
+        self.client = self.traced_client(exporter=_Exporter(fail=True))
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            self.assertEqual(self.convert().status_code, 200)
+        self.assertIn('Trace export failed: collector down', stderr.getvalue())
+
+
+class LoadtestCommandTest(TestCase):
+    def setUp(self):
+        from .management.commands.loadtest import Command
+        self.command = Command()
+
+    def test_each_client_gets_its_own_user(self):
+        users = self.command._create_users(3, 'secret')
+        self.assertEqual(len({user.email for user in users}), 3)
+        stored = User.objects.filter(email__in=[user.email for user in users])
+        self.assertEqual(stored.count(), 3)
+        self.assertTrue(all(user.check_password('secret') for user in stored))
+
+    def test_throttled_requests_are_not_counted_as_errors(self):
+        results = [('paste', 0.1, 10, None), ('paste', 0.1, 10, 'HTTP 429'), ('paste', 0.1, 10, 'HTTP 500')]
+        entry = self.command._summarize(results, 1.0)['paste']
+        self.assertEqual((entry['throttled'], entry['errors']), (1, {'HTTP 500': 1}))
+        self.assertEqual(entry['error_rate'], round(1 / 3, 4))
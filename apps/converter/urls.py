@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+convert_view = views.AsyncConvertView if settings.ASYNC_VIEWS else views.ConvertView
+
 urlpatterns = [
-    path('convert/', views.ConvertView.as_view(), name='convert'),
+    path('convert/', convert_view.as_view(), name='convert'),
+    path('convert/<str:key>/', views.ConvertLookupView.as_view(), name='convert-lookup'),
     path('examples/', views.ExamplesView.as_view(), name='examples'),
 ]
@@ -1,22 +1,111 @@
+import asyncio
+import multiprocessing
 import os
+import threading
+import time
+import tarfile
 import zipfile
-import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
+import zstandard
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
-from services.conversion_service import ConversionService
+from services import plantuml
+from services.conversion_service import ConversionService, diagram_documents
+from services.sources import is_tar_name, iter_tar, iter_zip
+from services.tracing import configure as configure_tracing, tracer
 from apps.history.models import DiagramHistory
+from apps.history.usage import UsageRecorder
+from apps.history.writer import HistoryWriter
+from .admission import AdmissionController
+from .serializers import GeneratorOptionsSerializer
 
-service = ConversionService()
+service = ConversionService(semantic_keys=settings.CONVERSION_SEMANTIC_CACHE_KEYS)
+admission = AdmissionController.from_settings()
+history_writer = HistoryWriter.from_settings()
+usage = UsageRecorder.from_settings()
+
+EXAMPLES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'examples'
+)
+# When this code was loaded; the examples' Last-Modified is never older,
+# as a deploy may have changed how they are converted.
+STARTED_AT = int(time.time())
 
 
 class ConvertView(APIView):
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    ticket = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method == 'POST':
+            self.ticket = admission.admit(_client_key(request), _request_bytes(request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.ticket is not None:
+            self.ticket.release()
+        response = super().finalize_response(request, response, *args, **kwargs)
+        with tracer.span('convert_view.render') as span:
+            if span.recording:
+                # Render here rather than in the handler so the span covers it.
+                response.render()
+                span.set_attribute('response.size', len(response.content))
+        return response
 
     def post(self, request):
+        sources = self._collect_sources(request)
+        if not sources:
+            return self._no_sources()
+        self.ticket.charge_files(len(sources))
+
+        encoding = plantuml.requested_encoding(request)
+        generator_options = _generator_options(request)
+        key = service.key_for(sources, generator_options)
+        etag = self._etag(key, encoding)
+        if self._etag_matches(request, key, etag):
+            return self._not_modified(etag)
+
+        started = time.perf_counter()
+        result = dict(service.convert(sources, generator_options, key))
+
+        # Save to history
+        if request.user.is_authenticated:
+            with tracer.span('convert_view.save_history'):
+                _record_usage(request.user, sources, time.perf_counter() - started)
+                history_entry = DiagramHistory(**self._history_fields(request.user, sources, result, key))
+                if settings.HISTORY_WRITE_BEHIND['ENABLED']:
+                    history_writer.submit(history_entry)
+                else:
+                    history_entry.save()
+                    result['history_id'] = history_entry.id
+                result['history_ref'] = str(history_entry.ref)
+
+        with tracer.span('convert_view.encode', {'encoding': encoding}):
+            response = Response(_encode_result(result, encoding))
+        response['ETag'] = etag
+        return response
+
+    def _collect_sources(self, request):
+        with tracer.span('convert_view.collect_sources') as span:
+            sources = self._read_sources(request)
+            if span.recording:
+                span.set_attributes({
+                    'file.count': len(sources),
+                    'file.size': sum(len(code.encode()) for _, code in sources),
+                })
+            return sources
+
+    def _read_sources(self, request):
         sources = []
 
         # Handle file uploads
@@ -26,68 +115,328 @@ class ConvertView(APIView):
                 content = f.read().decode('utf-8', errors='replace')
                 sources.append((f.name, content))
             elif f.name.endswith('.zip'):
-                sources.extend(self._extract_zip(f))
+                sources.extend(self._read_archive(f, iter_zip(f)))
+            elif is_tar_name(f.name):
+                sources.extend(self._read_archive(f, iter_tar(f, f.name)))
 
         # Handle pasted code
         code = request.data.get('code', '').strip()
         if code:
             sources.append(('PastedCode.java', code))
+        return sources
+
+    def _no_sources(self):
+        return Response(
+            {'error': 'No Java source code provided'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    @staticmethod
+    def _etag(key, encoding):
+        # Weak: the body also carries this request's history_id and
+        # history_ref, so equal tags mean equivalent, not identical, bodies.
+        return 'W/' + _representation_etag(key, encoding).removeprefix('W/')
+
+    def _etag_matches(self, request, key, etag):
+        # ``*`` asks whether the conversion exists: only if it is cached and
+        # the user made it, so the header cannot probe other users' uploads.
+        return _etag_matches(request, etag, exists=lambda: (
+            service.lookup(key) is not None
+            and DiagramHistory.objects.filter(user=request.user, conversion_key=key).exists()
+        ))
+
+    def _not_modified(self, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = etag
+        return response
 
+    def _history_fields(self, user, sources, result, key):
+        filenames = ', '.join(fn for fn, _ in sources)
+        diagrams = diagram_documents(result)
+        return {
+            'user': user,
+            'conversion_key': key,
+            'filename': filenames[:255],
+            'source_code': '\n\n'.join(f'// {fn}\n{code}' for fn, code in sources),
+            'class_diagram': diagrams.get('class', ''),
+            'usecase_diagram': diagrams.get('usecase', ''),
+            'flow_diagram': diagrams.get('flow', ''),
+            'parsed_model': result.get('model', ''),
+        }
+
+    def _read_archive(self, upload, members):
+        """Read (basename, code) pairs from an archive without extracting it."""
+        try:
+            return [(os.path.basename(name), code) for name, code in members]
+        except (zipfile.BadZipFile, tarfile.TarError, zstandard.ZstdError, EOFError, OSError):
+            raise ValidationError({'files': [f'{upload.name}: not a readable archive.']})
+
+
+class AsyncConvertView(ConvertView):
+    """ConvertView for ASGI deployments (see config/asgi.py).
+
+    Authentication, body parsing, admission (each a SQLite transaction)
+    and the history write (unless it is write-behind) run in threads via
+    ``sync_to_async`` and parsing/rendering runs in a bounded process pool,
+    so the event loop stays free to serve other (slow) clients.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Mirrors APIView.dispatch, awaiting the handler instead of calling it.
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        if self.ticket is not None:
+            # Released here, off the event loop, instead of in finalize_response.
+            await sync_to_async(self.ticket.release)()
+            self.ticket = None
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def post(self, request):
+        sources = await sync_to_async(self._collect_sources)(request)
         if not sources:
-            return Response(
-                {'error': 'No Java source code provided'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return self._no_sources()
+        await sync_to_async(self.ticket.charge_files)(len(sources))
 
-        result = service.convert(sources)
+        encoding = plantuml.requested_encoding(request)
+        generator_options = _generator_options(request)
+        key = service.key_for(sources, generator_options)
+        etag = self._etag(key, encoding)
+        if request.META.get('HTTP_IF_NONE_MATCH') and await sync_to_async(self._etag_matches)(request, key, etag):
+            return self._not_modified(etag)
+
+        started = time.perf_counter()
+        result = dict(await service.aconvert(sources, _get_executor(), generator_options, key))
 
-        # Save to history
         if request.user.is_authenticated:
-            filenames = ', '.join(fn for fn, _ in sources)
-            history_entry = DiagramHistory.objects.create(
-                user=request.user,
-                filename=filenames[:255],
-                source_code='\n\n'.join(f'// {fn}\n{code}' for fn, code in sources),
-                class_diagram=result['diagrams'].get('class', ''),
-                usecase_diagram=result['diagrams'].get('usecase', ''),
-                flow_diagram=result['diagrams'].get('flow', ''),
-            )
-            result['history_id'] = history_entry.id
-
-        return Response(result)
-
-    def _extract_zip(self, zip_file):
-        sources = []
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            with zipfile.ZipFile(zip_file, 'r') as zf:
-                zf.extractall(tmp_dir)
-                for root, _, files in os.walk(tmp_dir):
-                    for fname in files:
-                        if fname.endswith('.java'):
-                            fpath = os.path.join(root, fname)
-                            with open(fpath, encoding='utf-8', errors='replace') as f:
-                                sources.append((fname, f.read()))
-        return sources
+            with tracer.span('convert_view.save_history'):
+                if usage.flush_interval > 0:
+                    _record_usage(request.user, sources, time.perf_counter() - started)
+                else:
+                    # Written per conversion; keep the database off the event loop.
+                    await sync_to_async(_record_usage)(request.user, sources, time.perf_counter() - started)
+                history_entry = DiagramHistory(**self._history_fields(request.user, sources, result, key))
+                if settings.HISTORY_WRITE_BEHIND['ENABLED']:
+                    history_writer.submit(history_entry)
+                else:
+                    await history_entry.asave()
+                    result['history_id'] = history_entry.id
+                result['history_ref'] = str(history_entry.ref)
+
+        with tracer.span('convert_view.encode', {'encoding': encoding}):
+            response = Response(_encode_result(result, encoding))
+        response['ETag'] = etag
+        return response
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Process pool for CPU-bound conversions, created lazily per worker.
+
+    Sized by ``CONVERSION_EXECUTOR_WORKERS``; 0 falls back to the event
+    loop's default thread pool.
+    """
+    global _executor
+    if _executor is None and settings.CONVERSION_EXECUTOR_WORKERS > 0:
+        with _executor_lock:
+            if _executor is None:
+                tracing = settings.TRACING
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.CONVERSION_EXECUTOR_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    # Pool processes export their spans of traced requests.
+                    initializer=configure_tracing,
+                    initargs=(tracing['SAMPLE_RATE'], tracing['EXPORTER'], tracing['PATH']),
+                )
+    return _executor
+
+
+class ConvertLookupView(APIView):
+    """Hash-only lookup of a cached conversion.
+
+    ``HEAD /convert/<key>/`` answers 200 with the ETag when the conversion
+    is in the service cache and 404 otherwise; ``GET`` also returns the
+    cached result.  Keys are the ETags handed out by ``ConvertView``.
+    The cache is shared by all users, so only keys of conversions in the
+    caller's own history are answered; others get 404 whether cached or
+    not.  With write-behind history that starts once the entry is written.
+    """
+
+    def get(self, request, key):
+        owned = DiagramHistory.objects.filter(user=request.user, conversion_key=key).exists()
+        result = service.lookup(key) if owned else None
+        if result is None:
+            return Response({'error': 'Conversion not cached'}, status=status.HTTP_404_NOT_FOUND)
+
+        encoding = plantuml.requested_encoding(request)
+        etag = _representation_etag(key, encoding)
+        if _etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(_encode_result(result, encoding))
+        response['ETag'] = etag
+        return response
+
+
+def _record_usage(user, sources, seconds):
+    usage.record(user, len(sources), sum(len(code.encode()) for _, code in sources), seconds)
+
+
+def _client_key(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _request_bytes(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+def _generator_options(request):
+    """Per-request generator options from the ``class_*``/``flow_*`` query parameters."""
+    serializer = GeneratorOptionsSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.to_generator_options()
+
+
+def _encode_result(result, encoding):
+    """Response body for a conversion result, minus the internal model."""
+    data = {k: v for k, v in result.items() if k != 'model'}
+    if encoding == 'plain':
+        return data
+    data['diagrams'] = plantuml.encode_diagrams(result['diagrams'], encoding)
+    if 'pages' in result:
+        data['pages'] = {
+            name: [plantuml.encode(page) for page in pages]
+            for name, pages in result['pages'].items()
+        }
+    data['diagram_encoding'] = encoding
+    return data
+
+
+def _representation_etag(key, encoding):
+    etag = quote_etag(key if encoding == 'plain' else f'{key}-{encoding}')
+    # Semantic keys are shared by sources that differ in formatting, whose
+    # responses echo different source text: equivalent, not identical.
+    return f'W/{etag}' if service.semantic_keys else etag
+
+
+def _etag_matches(request, etag, exists=None):
+    """True if the request's If-None-Match covers ``etag`` (weak comparison).
+
+    ``*`` matches any representation that exists; ``exists`` is called to
+    tell when that is not a given.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return exists is None or exists()
+    etag = etag.removeprefix('W/')
+    return any(e.removeprefix('W/') == etag for e in etags)
 
 
 class ExamplesView(APIView):
+    """Serves the bundled examples, converted once per change of examples/.
+
+    The converted result is kept in-process together with a strong ETag and
+    the mtime and size of every file, so repeat page loads are
+    answered with 304 Not Modified and never touch the parser.  The output
+    also changes when a deploy changes the generators: the ETag is derived
+    from the conversion key, which covers ``GENERATOR_VERSION``, and
+    Last-Modified is the newest of the files' mtimes and the time this
+    process loaded the code (``STARTED_AT``).
+    """
+
+    _entry: dict | None = None
+    _lock = threading.Lock()
+
     def get(self, request):
-        example_dir = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
-            'examples'
-        )
-        if not os.path.isdir(example_dir):
+        if not os.path.isdir(EXAMPLES_DIR):
             return Response({'error': 'Examples not found'}, status=404)
 
-        sources = []
-        for fname in sorted(os.listdir(example_dir)):
-            if fname.endswith('.java'):
-                fpath = os.path.join(example_dir, fname)
-                with open(fpath, encoding='utf-8') as f:
+        entry = self._get_entry()
+        if entry is None:
+            return Response({'error': 'No example files found'}, status=404)
+
+        response = Response(entry['result'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['mtime'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return get_conditional_response(
+            request,
+            etag=entry['etag'],
+            last_modified=entry['mtime'],
+            response=response,
+        )
+
+    @classmethod
+    def _get_entry(cls):
+        mtime, files = cls._scan()
+        entry = cls._entry
+        if entry is not None and entry['files'] == files:
+            return entry
+
+        with cls._lock:
+            entry = cls._entry
+            if entry is not None and entry['files'] == files:
+                return entry
+            if not files:
+                cls._entry = None
+                return None
+
+            sources = []
+            for fname, _, _ in files:
+                with open(os.path.join(EXAMPLES_DIR, fname), encoding='utf-8') as f:
                     sources.append((fname, f.read()))
 
-        if not sources:
-            return Response({'error': 'No example files found'}, status=404)
+            key = service.key_for(sources)
+            cls._entry = {
+                'mtime': max(mtime, STARTED_AT),
+                'files': files,
+                'etag': _representation_etag(key, 'plain'),
+                'result': _encode_result(service.convert(sources, cache_key=key), 'plain'),
+            }
+            return cls._entry
+
+    @staticmethod
+    def _scan():
+        """Return (newest mtime in seconds, sorted (name, mtime_ns, size) of
+        the .java files) without reading files.
 
-        result = service.convert(sources)
-        return Response(result)
+        Files are compared by nanosecond mtime and size, so an edit within
+        the same second as the previous scan is still picked up.
+        """
+        mtime = int(os.stat(EXAMPLES_DIR).st_mtime)
+        files = []
+        with os.scandir(EXAMPLES_DIR) as it:
+            for dir_entry in it:
+                if dir_entry.name.endswith('.java'):
+                    stat = dir_entry.stat()
+                    files.append((dir_entry.name, stat.st_mtime_ns, stat.st_size))
+                    mtime = max(mtime, int(stat.st_mtime))
+        return mtime, tuple(sorted(files))
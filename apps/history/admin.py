@@ -1,8 +1,19 @@
 from django.contrib import admin
-from .models import DiagramHistory
+from .models import DailyUsage, DiagramHistory, UserUsage
 
 @admin.register(DiagramHistory)
 class DiagramHistoryAdmin(admin.ModelAdmin):
     list_display = ['filename', 'user', 'version', 'created_at']
     list_filter = ['user', 'created_at']
     search_fields = ['filename']
+
+
+@admin.register(DailyUsage)
+class DailyUsageAdmin(admin.ModelAdmin):
+    list_display = ['day', 'user', 'conversions', 'files', 'bytes_converted', 'last_activity']
+    list_filter = ['day']
+
+
+@admin.register(UserUsage)
+class UserUsageAdmin(admin.ModelAdmin):
+    list_display = ['user', 'conversions', 'files', 'bytes_converted', 'last_activity']
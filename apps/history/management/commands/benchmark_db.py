@@ -0,0 +1,120 @@
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from apps.history.models import DiagramHistory
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the configured database with concurrent history writes '
+        'and reads shaped like API requests (connections are recycled after '
+        'every operation as at the end of a request). Run it once per '
+        'configuration, e.g. with SQLITE_TUNING=0 DB_CONN_MAX_AGE=0 and with '
+        'the defaults, and compare. Rows are written for a temporary user '
+        'that is deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run.')
+        parser.add_argument('--write-ratio', type=float, default=0.3, help='Share of operations that write.')
+        parser.add_argument('--payload-bytes', type=int, default=8 * 1024, help='Source size per written entry.')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.create_user(
+            username=f'benchmark-{int(time.time())}',
+            email=f'benchmark-{int(time.time())}@localhost',
+            password=None,
+        )
+        ids = []
+        self._describe()
+
+        deadline = time.perf_counter() + options['duration']
+        results = []
+        threads = [
+            threading.Thread(target=self._worker, args=(user, ids, deadline, options, results))
+            for _ in range(options['threads'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        user.delete()
+        self._report(results, elapsed)
+
+    def _describe(self):
+        db = settings.DATABASES['default']
+        line = f'{connection.vendor}, CONN_MAX_AGE={db.get("CONN_MAX_AGE", 0)}'
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                pragmas = []
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    row = cursor.fetchone()
+                    # mmap_size returns no row where mmap is unavailable (in-memory databases).
+                    if row is not None:
+                        pragmas.append(f'{pragma}={row[0]}')
+            line += ', ' + ', '.join(pragmas)
+        self.stdout.write(line)
+
+    def _worker(self, user, ids, deadline, options, results):
+        rng = random.Random()
+        source = 'x' * options['payload_bytes']
+        local = []
+        try:
+            while time.perf_counter() < deadline:
+                write = not ids or rng.random() < options['write_ratio']
+                began = time.perf_counter()
+                try:
+                    if write:
+                        entry = DiagramHistory.objects.create(
+                            user=user,
+                            filename=f'Bench{rng.randrange(20)}.java',
+                            source_code=source,
+                            class_diagram='@startuml\n@enduml',
+                        )
+                        ids.append(entry.pk)
+                    else:
+                        list(DiagramHistory.objects.filter(user=user).values('id', 'filename', 'version')[:20])
+                        DiagramHistory.objects.filter(pk=rng.choice(ids)).first()
+                    error = None
+                except DatabaseError as exc:
+                    error = str(exc)
+                local.append(('write' if write else 'read', time.perf_counter() - began, error))
+                # What Django does when a request finishes.
+                close_old_connections()
+        finally:
+            connection.close()
+            results.extend(local)
+
+    def _report(self, results, elapsed):
+        if not results:
+            self.stdout.write('No operations completed.')
+            return
+        for kind in ('write', 'read'):
+            ops = [r for r in results if r[0] == kind]
+            if not ops:
+                continue
+            ok = sorted(latency for _, latency, error in ops if error is None)
+            errors = len(ops) - len(ok)
+            line = f'{kind:5}: {len(ok) / elapsed:8.1f} ops/s'
+            if len(ok) > 1:
+                cuts = statistics.quantiles(ok, n=100)
+                line += f', p50 {cuts[49] * 1000:.1f} ms, p95 {cuts[94] * 1000:.1f} ms, p99 {cuts[98] * 1000:.1f} ms'
+            line += f', {errors} errors'
+            self.stdout.write(line)
+            messages = {error for _, _, error in ops if error}
+            for message in sorted(messages)[:3]:
+                self.stdout.write(f'       {message}')
+        ok_total = sum(1 for r in results if r[2] is None)
+        self.stdout.write(self.style.SUCCESS(f'Total: {ok_total / elapsed:.1f} successful ops/s over {elapsed:.1f}s'))
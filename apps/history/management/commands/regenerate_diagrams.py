@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.dateparse import parse_date
+
+from apps.history.models import DiagramHistory
+from services.regeneration import regenerate_entry
+
+DIAGRAM_FIELDS = {
+    'class': 'class_diagram',
+    'usecase': 'usecase_diagram',
+    'flow': 'flow_diagram',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Regenerate stored diagrams with the current generators. Rows are '
+        'read in primary-key order in batches and converted in a process '
+        'pool; rows saved before models were persisted are parsed once and '
+        'get their model backfilled.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only entries of this user (id or email).')
+        parser.add_argument('--since', help='Only entries created on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--until', help='Only entries created on or before this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--type', action='append', choices=sorted(DIAGRAM_FIELDS), dest='types',
+            help='Diagram type to rewrite; repeat for several (default: all).',
+        )
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--after-id', type=int, default=0, help='Start after this primary key.')
+        parser.add_argument(
+            '--state-file',
+            help='Record the last committed primary key here and resume from it on the next run.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = self._filtered_queryset(options)
+        types = options['types'] or list(DIAGRAM_FIELDS)
+        update_fields = [DIAGRAM_FIELDS[t] for t in types] + ['parsed_model', 'content_hash']
+        batch_size = options['batch_size']
+        state_file = options['state_file']
+
+        last_id = options['after_id']
+        if state_file and os.path.exists(state_file):
+            with open(state_file) as f:
+                last_id = max(last_id, int(f.read().strip() or 0))
+            self.stdout.write(f'Resuming after id {last_id}')
+
+        # Workers never use the database; do not let them inherit sockets.
+        connections.close_all()
+
+        processed = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            batch = self._fetch(queryset, last_id, batch_size)
+            while batch:
+                rows = [(e.pk, e.parsed_model, e.source_code) for e in batch]
+                chunksize = max(1, len(rows) // (options['workers'] * 4))
+                pending = pool.map(regenerate_entry, rows, chunksize=chunksize)
+                # Read the next page while the pool works on this one.
+                next_batch = self._fetch(queryset, batch[-1].pk, batch_size)
+
+                by_pk = {entry.pk: entry for entry in batch}
+                for pk, diagrams, model in pending:
+                    entry = by_pk[pk]
+                    for diagram_type in types:
+                        setattr(entry, DIAGRAM_FIELDS[diagram_type], diagrams.get(diagram_type, ''))
+                    entry.parsed_model = model
+                    entry.content_hash = entry.compute_content_hash()
+                DiagramHistory.objects.bulk_update(batch, update_fields)
+
+                last_id = batch[-1].pk
+                processed += len(batch)
+                if state_file:
+                    with open(state_file, 'w') as f:
+                        f.write(str(last_id))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{processed} entries regenerated (last id {last_id}), '
+                    f'{processed / elapsed:.1f} entries/s'
+                )
+                batch = next_batch
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {processed} entries in {elapsed:.1f}s'
+            + (f' ({processed / elapsed:.1f} entries/s)' if processed else '')
+        ))
+
+    def _filtered_queryset(self, options):
+        queryset = DiagramHistory.objects.all()
+        if options['user']:
+            user_model = get_user_model()
+            lookup = {'pk': options['user']} if options['user'].isdigit() else {'email': options['user']}
+            try:
+                queryset = queryset.filter(user=user_model.objects.get(**lookup))
+            except user_model.DoesNotExist:
+                raise CommandError(f'User not found: {options["user"]}')
+        for option, lookup in (('since', 'created_at__date__gte'), ('until', 'created_at__date__lte')):
+            if options[option]:
+                try:
+                    # None when malformed, ValueError for impossible dates like 2024-13-45.
+                    day = parse_date(options[option])
+                except ValueError:
+                    day = None
+                if day is None:
+                    raise CommandError(f'Invalid --{option} date: {options[option]}')
+                queryset = queryset.filter(**{lookup: day})
+        return queryset
+
+    def _fetch(self, queryset, after_id, batch_size):
+        return list(
+            queryset.filter(pk__gt=after_id).order_by('pk').only(
+                'pk', 'source_code', 'parsed_model', *DIAGRAM_FIELDS.values(),
+            )[:batch_size]
+        )
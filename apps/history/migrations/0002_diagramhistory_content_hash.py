@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:07
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    DiagramHistory = apps.get_model('history', 'DiagramHistory')
+    for entry in DiagramHistory.objects.iterator():
+        digest = hashlib.sha256()
+        for value in (entry.source_code, entry.class_diagram, entry.usecase_diagram, entry.flow_diagram):
+            digest.update(value.encode())
+            digest.update(b'\0')
+        entry.content_hash = digest.hexdigest()
+        entry.save(update_fields=['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diagramhistory',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
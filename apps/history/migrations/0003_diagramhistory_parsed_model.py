@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0002_diagramhistory_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diagramhistory',
+            name='parsed_model',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
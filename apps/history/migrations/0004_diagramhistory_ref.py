@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0003_diagramhistory_parsed_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diagramhistory',
+            name='ref',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+    ]
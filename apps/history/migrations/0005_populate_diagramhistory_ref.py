@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:21
+
+import uuid
+
+from django.db import migrations
+
+
+def populate_ref(apps, schema_editor):
+    DiagramHistory = apps.get_model('history', 'DiagramHistory')
+    for entry in DiagramHistory.objects.filter(ref__isnull=True).only('pk').iterator():
+        entry.ref = uuid.uuid4()
+        entry.save(update_fields=['ref'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0004_diagramhistory_ref'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_ref, migrations.RunPython.noop),
+    ]
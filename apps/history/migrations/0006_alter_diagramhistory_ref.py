@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:21
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0005_populate_diagramhistory_ref'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='diagramhistory',
+            name='ref',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('history', '0006_alter_diagramhistory_ref'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserUsage',
+            fields=[
+                ('conversions', models.PositiveIntegerField(default=0)),
+                ('files', models.PositiveIntegerField(default=0)),
+                ('bytes_converted', models.PositiveBigIntegerField(default=0)),
+                ('timings', models.JSONField(default=list)),
+                ('last_activity', models.DateTimeField(null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'User usage',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('conversions', models.PositiveIntegerField(default=0)),
+                ('files', models.PositiveIntegerField(default=0)),
+                ('bytes_converted', models.PositiveBigIntegerField(default=0)),
+                ('timings', models.JSONField(default=list)),
+                ('last_activity', models.DateTimeField(null=True)),
+                ('day', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily usage',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_daily_usage')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('history', '0007_usage_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diagramhistory',
+            name='conversion_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+    ]
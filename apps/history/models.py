@@ -1,3 +1,6 @@
+import hashlib
+import uuid
+
 from django.db import models
 from django.conf import settings
 
@@ -14,6 +17,16 @@ class DiagramHistory(models.Model):
     usecase_diagram = models.TextField(blank=True)
     flow_diagram = models.TextField(blank=True)
     version = models.PositiveIntegerField(default=1)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # ConversionService.key_for of the conversion (the /convert/ ETag), so
+    # /convert/<key>/ only answers users for their own conversions.
+    conversion_key = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    # Parsed class model (parsers.model_codec JSON); lets diagrams be
+    # regenerated without re-parsing source_code. Blank on older entries.
+    parsed_model = models.TextField(blank=True, editable=False)
+    # Assigned before the row is written, so a client can be told where an
+    # entry will appear even when it is saved off the request path.
+    ref = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -27,7 +40,88 @@ class DiagramHistory(models.Model):
                 filename=self.filename,
             ).order_by('-version').first()
             self.version = (last.version + 1) if last else 1
+        self.content_hash = self.compute_content_hash()
         super().save(*args, **kwargs)
 
+    @classmethod
+    def bulk_insert(cls, entries):
+        """Insert new entries in one query, doing what save() would.
+
+        ``bulk_create`` skips save(), so versions are numbered here from one
+        query for the latest version of every (user, filename) in the batch
+        and content hashes are computed per entry.
+        """
+        keys = {(entry.user_id, entry.filename) for entry in entries}
+        match = models.Q()
+        for user_id, filename in keys:
+            match |= models.Q(user_id=user_id, filename=filename)
+        latest = {
+            (row['user_id'], row['filename']): row['latest']
+            for row in cls.objects.filter(match).values('user_id', 'filename').annotate(
+                latest=models.Max('version'),
+            )
+        }
+        for entry in entries:
+            key = (entry.user_id, entry.filename)
+            entry.version = latest[key] = latest.get(key, 0) + 1
+            entry.content_hash = entry.compute_content_hash()
+        return cls.objects.bulk_create(entries)
+
+    def compute_content_hash(self):
+        """SHA-256 over the stored source and diagrams; used as the detail ETag."""
+        digest = hashlib.sha256()
+        for value in (self.source_code, self.class_diagram, self.usecase_diagram, self.flow_diagram):
+            digest.update(value.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
     def __str__(self):
         return f'{self.filename} v{self.version} ({self.created_at:%Y-%m-%d})'
+
+
+class UsageCounters(models.Model):
+    """Conversion counters shared by the usage rollups (apps.history.usage)."""
+
+    conversions = models.PositiveIntegerField(default=0)
+    files = models.PositiveIntegerField(default=0)
+    bytes_converted = models.PositiveBigIntegerField(default=0)
+    # Conversion time histogram; see apps.history.usage.TIMING_BUCKET_RATIO.
+    timings = models.JSONField(default=list)
+    last_activity = models.DateTimeField(null=True)
+
+    class Meta:
+        abstract = True
+
+
+class DailyUsage(UsageCounters):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_usage',
+    )
+    day = models.DateField()
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_daily_usage'),
+        ]
+        verbose_name_plural = 'Daily usage'
+
+    def __str__(self):
+        return f'{self.user} {self.day}: {self.conversions} conversions'
+
+
+class UserUsage(UsageCounters):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='usage',
+    )
+
+    class Meta:
+        verbose_name_plural = 'User usage'
+
+    def __str__(self):
+        return f'{self.user}: {self.conversions} conversions'
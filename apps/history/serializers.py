@@ -1,18 +1,29 @@
 from rest_framework import serializers
+
+from services import plantuml
 from .models import DiagramHistory
 
 
 class DiagramHistoryListSerializer(serializers.ModelSerializer):
     class Meta:
         model = DiagramHistory
-        fields = ['id', 'filename', 'version', 'created_at']
+        fields = ['id', 'ref', 'filename', 'version', 'created_at']
 
 
 class DiagramHistoryDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = DiagramHistory
         fields = [
-            'id', 'filename', 'source_code',
+            'id', 'ref', 'filename', 'source_code',
             'class_diagram', 'usecase_diagram', 'flow_diagram',
             'version', 'created_at',
         ]
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        encoding = self.context.get('diagram_encoding', 'plain')
+        if encoding != 'plain':
+            for name in ('class_diagram', 'usecase_diagram', 'flow_diagram'):
+                data[name] = plantuml.encode(data[name])
+            data['diagram_encoding'] = encoding
+        return data
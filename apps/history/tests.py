@@ -0,0 +1,253 @@
+import io
+import uuid
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from services import plantuml
+from . import usage
+from .models import DailyUsage, DiagramHistory, UserUsage
+from .usage import UsageRecorder
+from .writer import HistoryWriter
+
+CLASS_DIAGRAM = '@startuml\nclass Sample\n@enduml'
+
+
+class HistoryViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.entry = DiagramHistory.objects.create(
+            user=self.user,
+            filename='Sample.java',
+            source_code='public class Sample {}',
+            class_diagram=CLASS_DIAGRAM,
+        )
+
+
+class HistoryEncodingTest(HistoryViewTestCase):
+    def test_detail_is_plain_by_default(self):
+        response = self.client.get(f'/history/{self.entry.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['class_diagram'], CLASS_DIAGRAM)
+        self.assertNotIn('diagram_encoding', response.data)
+
+    def test_detail_honours_encoding(self):
+        response = self.client.get(f'/history/{self.entry.pk}/?encoding=deflate')
+        self.assertEqual(response.data['diagram_encoding'], 'deflate')
+        self.assertEqual(plantuml.decode(response.data['class_diagram']), CLASS_DIAGRAM)
+
+    def test_ref_honours_encoding(self):
+        response = self.client.get(f'/history/ref/{self.entry.ref}/?encoding=deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['diagram_encoding'], 'deflate')
+        self.assertEqual(plantuml.decode(response.data['class_diagram']), CLASS_DIAGRAM)
+
+    def test_unknown_encoding_is_rejected(self):
+        for url in (f'/history/{self.entry.pk}/', f'/history/ref/{self.entry.ref}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url + '?encoding=zip')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('encoding', response.data)
+
+
+class HistoryETagTest(HistoryViewTestCase):
+    def test_detail_answers_304(self):
+        url = f'/history/{self.entry.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(etag, f'"{self.entry.content_hash}"')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_encoding(self):
+        url = f'/history/{self.entry.pk}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url + '?encoding=deflate', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_users_entry_is_not_found(self):
+        other = User.objects.create_user(username='bob', email='bob@example.com', password='secret')
+        self.client.force_authenticate(other)
+        for url in (f'/history/{self.entry.pk}/', f'/history/ref/{self.entry.ref}/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+
+class HistoryDiffTest(HistoryViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.newer = DiagramHistory.objects.create(
+            user=self.user,
+            filename='Sample.java',
+            source_code='public class Sample { private int count; }\nclass Extra {}',
+        )
+        self.url = f'/history/{self.entry.pk}/diff/{self.newer.pk}/'
+
+    def test_diff_stores_the_model_of_entries_saved_without_one(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['classes']['added'], ['Extra'])
+        self.assertEqual(response.data['classes']['changed'], [
+            {'name': 'Sample', 'fields': {'added': ['private int count']}},
+        ])
+        self.newer.refresh_from_db()
+        self.assertTrue(self.newer.parsed_model)
+
+    def test_diagram_and_304(self):
+        response = self.client.get(self.url + '?diagram=1&encoding=deflate')
+        self.assertEqual(response.data['diagram_encoding'], 'deflate')
+        self.assertIn('class Extra #palegreen', plantuml.decode(response.data['class_diagram']))
+        again = self.client.get(self.url + '?diagram=1&encoding=deflate', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_other_users_entries_are_not_found(self):
+        other = User.objects.create_user(username='bob', email='bob@example.com', password='secret')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class HistoryWriterTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        self.writer = HistoryWriter(batch_size=3, max_delay=0.05)
+        self.addCleanup(self.writer.stop)
+
+    def entry(self, filename='Sample.java', **fields):
+        return DiagramHistory(user=self.user, filename=filename, source_code='class Sample {}', **fields)
+
+    def test_entries_are_written_in_order_with_their_refs(self):
+        entries = [self.entry() for _ in range(7)]
+        for entry in entries:
+            self.writer.submit(entry)
+        self.writer.flush()
+        rows = DiagramHistory.objects.order_by('version')
+        self.assertEqual([row.ref for row in rows], [entry.ref for entry in entries])
+        self.assertEqual([row.version for row in rows], list(range(1, 8)))
+        self.assertEqual(rows[0].content_hash, rows[0].compute_content_hash())
+
+    def test_versions_continue_from_saved_entries(self):
+        self.entry().save()
+        self.entry(filename='Other.java').save()
+        self.writer.submit(self.entry())
+        self.writer.submit(self.entry(filename='Other.java'))
+        self.writer.flush()
+        self.assertEqual(
+            sorted(DiagramHistory.objects.values_list('filename', 'version')),
+            [('Other.java', 1), ('Other.java', 2), ('Sample.java', 1), ('Sample.java', 2)],
+        )
+
+    def test_stop_writes_what_is_queued(self):
+        writer = HistoryWriter(batch_size=100, max_delay=60)
+        writer.submit(self.entry())
+        writer.stop()
+        self.assertEqual(DiagramHistory.objects.count(), 1)
+
+    def test_failed_batch_is_saved_entry_by_entry(self):
+        taken = self.entry()
+        taken.save()
+        with self.assertLogs('apps.history.writer', 'ERROR'):
+            self.writer.submit(self.entry(ref=taken.ref))
+            self.writer.submit(self.entry(ref=uuid.uuid4()))
+            self.writer.flush()
+        self.assertEqual(DiagramHistory.objects.count(), 2)
+
+
+class BenchmarkDbCommandTest(TransactionTestCase):
+    def benchmark(self, **options):
+        out = io.StringIO()
+        call_command('benchmark_db', threads=2, duration=0.3, payload_bytes=64, stdout=out, **options)
+        return out.getvalue()
+
+    def test_reports_reads_and_writes_and_cleans_up(self):
+        output = self.benchmark()
+        self.assertIn('journal_mode=', output)
+        self.assertRegex(output, r'write: +[\d.]+ ops/s')
+        self.assertRegex(output, r'read : +[\d.]+ ops/s')
+        self.assertIn('successful ops/s', output)
+        self.assertFalse(User.objects.filter(username__startswith='benchmark-').exists())
+        self.assertFalse(DiagramHistory.objects.exists())
+
+    def test_only_writes(self):
+        output = self.benchmark(write_ratio=1)
+        self.assertIn('write:', output)
+        self.assertNotIn('read :', output)
+
+    def test_errors_are_counted_and_shown(self):
+        from .management.commands.benchmark_db import Command
+        out = io.StringIO()
+        command = Command(stdout=out)
+        command._report([('write', 0.01, None), ('write', 0.02, 'database is locked')], 1.0)
+        self.assertIn('1 errors', out.getvalue())
+        self.assertIn('database is locked', out.getvalue())
+        command._report([], 1.0)
+        self.assertIn('No operations completed.', out.getvalue())
+
+
+class RegenerateDiagramsCommandTest(TestCase):
+    def test_invalid_dates_are_command_errors(self):
+        for option, value in (('since', 'yesterday'), ('until', '2024-13-45'), ('since', '2024-02-30')):
+            with self.subTest(value=value), self.assertRaisesMessage(CommandError, f'Invalid --{option} date'):
+                call_command('regenerate_diagrams', **{option: value})
+
+
+class TimingHistogramTest(SimpleTestCase):
+    def test_buckets(self):
+        self.assertEqual(usage.timing_bucket(0.2), 0)
+        self.assertEqual(usage.timing_bucket(1.25), 1)
+        self.assertEqual(usage.timing_bucket(1.3), 2)
+        self.assertEqual(usage.timing_bucket(10 ** 9), usage.TIMING_BUCKETS - 1)
+
+    def test_percentiles_are_bucket_upper_bounds(self):
+        timings = [0] * usage.TIMING_BUCKETS
+        for milliseconds in [5] * 90 + [300] * 10:
+            timings[usage.timing_bucket(milliseconds)] += 1
+        self.assertEqual(usage.timing_percentile(timings, 0.5), round(1.25 ** usage.timing_bucket(5), 1))
+        self.assertGreaterEqual(usage.timing_percentile(timings, 0.99), 300)
+        self.assertLess(usage.timing_percentile(timings, 0.99), 300 * usage.TIMING_BUCKET_RATIO)
+        self.assertIsNone(usage.timing_percentile([0, 0], 0.5))
+
+    def test_merge_grows_the_shorter_histogram(self):
+        self.assertEqual(usage.merge_timings([1], [0, 2, 3]), [1, 2, 3])
+        self.assertEqual(usage.merge_timings([1, 1, 1], [1]), [2, 1, 1])
+
+
+class UsageRecorderTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        self.other = User.objects.create_user(username='bob', email='bob@example.com', password='secret')
+
+    def test_deltas_are_folded_in_on_flush(self):
+        recorder = UsageRecorder(flush_interval=60)
+        recorder.record(self.user, files=2, size=100, seconds=0.005)
+        recorder.record(self.user, files=1, size=50, seconds=0.3)
+        recorder.record(self.other, files=1, size=10, seconds=0.001)
+        self.assertFalse(UserUsage.objects.exists())
+        recorder.flush()
+        recorder.record(self.user, files=1, size=1, seconds=0.001)
+        recorder.stop()
+
+        total = UserUsage.objects.get(user=self.user)
+        self.assertEqual((total.conversions, total.files, total.bytes_converted), (3, 4, 151))
+        self.assertEqual(sum(total.timings), 3)
+        day = DailyUsage.objects.get(user=self.user)
+        self.assertEqual((day.conversions, day.files, day.bytes_converted), (3, 4, 151))
+        self.assertEqual(usage.summarize(total)['p99_ms'], round(1.25 ** usage.timing_bucket(300), 1))
+        self.assertEqual(UserUsage.objects.get(user=self.other).conversions, 1)
+
+    def test_zero_interval_writes_every_conversion(self):
+        UsageRecorder(flush_interval=0).record(self.user, files=1, size=10, seconds=0.01)
+        self.assertEqual(UserUsage.objects.get(user=self.user).conversions, 1)
+
+    def test_deleted_users_get_no_rows(self):
+        recorder = UsageRecorder(flush_interval=60)
+        recorder.record(self.user, files=1, size=10, seconds=0.01)
+        recorder.record(self.other, files=1, size=10, seconds=0.01)
+        self.other.delete()
+        recorder.flush()
+        self.assertEqual(list(UserUsage.objects.values_list('user', flat=True)), [self.user.pk])
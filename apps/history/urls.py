@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path('history/', views.HistoryListView.as_view(), name='history-list'),
     path('history/<int:pk>/', views.HistoryDetailView.as_view(), name='history-detail'),
+    path('history/ref/<uuid:ref>/', views.HistoryRefView.as_view(), name='history-ref'),
+    path('history/<int:pk>/diff/<int:other_pk>/', views.HistoryDiffView.as_view(), name='history-diff'),
 ]
@@ -0,0 +1,174 @@
+import atexit
+import logging
+import math
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import DailyUsage, UserUsage
+
+logger = logging.getLogger(__name__)
+
+# Timings are counted in geometric buckets: bucket i holds durations up to
+# TIMING_BUCKET_RATIO ** i milliseconds, so a percentile read back from a
+# histogram is within 25% of the true value.  Histograms from different
+# rows and processes merge by adding counts.
+TIMING_BUCKET_RATIO = 1.25
+TIMING_BUCKETS = 64
+
+
+def timing_bucket(milliseconds):
+    if milliseconds <= 1:
+        return 0
+    return min(TIMING_BUCKETS - 1, math.ceil(math.log(milliseconds, TIMING_BUCKET_RATIO)))
+
+
+def merge_timings(into, other):
+    """Add histogram ``other`` to ``into`` in place and return it."""
+    if len(into) < len(other):
+        into.extend([0] * (len(other) - len(into)))
+    for i, count in enumerate(other):
+        into[i] += count
+    return into
+
+
+def timing_percentile(timings, q):
+    """Upper bound in ms of the bucket holding quantile ``q`` (0-1), or None."""
+    total = sum(timings)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(timings):
+        seen += count
+        if count and seen >= rank:
+            return round(TIMING_BUCKET_RATIO ** i, 1)
+    return None
+
+
+def summarize(counters):
+    """API representation of a rollup row (or of several merged ones)."""
+    return {
+        'conversions': counters.conversions,
+        'files': counters.files,
+        'bytes_converted': counters.bytes_converted,
+        'last_activity': counters.last_activity,
+        'p50_ms': timing_percentile(counters.timings, 0.5),
+        'p95_ms': timing_percentile(counters.timings, 0.95),
+        'p99_ms': timing_percentile(counters.timings, 0.99),
+    }
+
+
+@dataclass
+class _Delta:
+    conversions: int = 0
+    files: int = 0
+    bytes_converted: int = 0
+    timings: list = field(default_factory=list)
+    last_activity: object = None
+
+    def add(self, files, size, milliseconds, now):
+        self.conversions += 1
+        self.files += files
+        self.bytes_converted += size
+        bucket = timing_bucket(milliseconds)
+        if len(self.timings) <= bucket:
+            self.timings.extend([0] * (bucket + 1 - len(self.timings)))
+        self.timings[bucket] += 1
+        self.last_activity = now
+
+    def apply(self, row):
+        row.conversions += self.conversions
+        row.files += self.files
+        row.bytes_converted += self.bytes_converted
+        row.timings = merge_timings(list(row.timings), self.timings)
+        if row.last_activity is None or row.last_activity < self.last_activity:
+            row.last_activity = self.last_activity
+
+
+class UsageRecorder:
+    """Maintains the DailyUsage and UserUsage rollups.
+
+    :meth:`record` only adds to per-process deltas; they are folded into
+    the rollup rows every ``flush_interval`` seconds by a background
+    thread, one transaction per flush, so the tables cost a few row
+    updates per interval instead of a write per conversion.  With an
+    interval of 0 every conversion is written immediately.  Pending deltas
+    are flushed on graceful shutdown (``atexit`` and gunicorn's
+    ``worker_exit``).
+    """
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._daily = defaultdict(_Delta)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(flush_interval=settings.USAGE_ROLLUP_FLUSH_INTERVAL)
+
+    def record(self, user, files, size, seconds):
+        now = timezone.now()
+        with self._lock:
+            self._daily[(user.pk, timezone.localdate(now))].add(files, size, seconds * 1000, now)
+            if self.flush_interval > 0 and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='usage-rollup', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            daily, self._daily = self._daily, defaultdict(_Delta)
+        if not daily:
+            return
+        per_user = defaultdict(_Delta)
+        for (user_id, day), delta in daily.items():
+            total = per_user[user_id]
+            total.conversions += delta.conversions
+            total.files += delta.files
+            total.bytes_converted += delta.bytes_converted
+            merge_timings(total.timings, delta.timings)
+            total.last_activity = max(filter(None, (total.last_activity, delta.last_activity)))
+        try:
+            # Users deleted since their conversions were recorded get no rows.
+            live = set(get_user_model().objects.filter(pk__in=per_user).values_list('pk', flat=True))
+            with transaction.atomic():
+                for (user_id, day), delta in daily.items():
+                    if user_id not in live:
+                        continue
+                    row, _ = DailyUsage.objects.select_for_update().get_or_create(user_id=user_id, day=day)
+                    delta.apply(row)
+                    row.save()
+                for user_id, delta in per_user.items():
+                    if user_id not in live:
+                        continue
+                    row, _ = UserUsage.objects.select_for_update().get_or_create(user_id=user_id)
+                    delta.apply(row)
+                    row.save()
+        except Exception:
+            # Rollups are statistics; losing one interval beats failing requests.
+            logger.exception('Usage rollup flush of %d rows failed', len(daily))
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+            self._stopping.clear()
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            close_old_connections()
+            self.flush()
+        connection.close()
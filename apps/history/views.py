@@ -1,4 +1,18 @@
+import hashlib
+
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.converter.views import service
+from parsers import model_codec
+from parsers.model_diff import DiffClassDiagramGenerator, diff_models
+from services import plantuml
+from services.conversion_service import GENERATOR_VERSION
+from services.regeneration import split_history_source
 from .models import DiagramHistory
 from .serializers import DiagramHistoryListSerializer, DiagramHistoryDetailSerializer
 
@@ -10,8 +24,128 @@ class HistoryListView(generics.ListAPIView):
         return DiagramHistory.objects.filter(user=self.request.user)
 
 
-class HistoryDetailView(generics.RetrieveDestroyAPIView):
+class DiagramEncodingMixin:
+    """Serializes diagrams in the encoding asked for with ``?encoding=``."""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['diagram_encoding'] = plantuml.requested_encoding(self.request)
+        return context
+
+
+class HistoryDetailView(DiagramEncodingMixin, generics.RetrieveDestroyAPIView):
+    serializer_class = DiagramHistoryDetailSerializer
+
+    def get_queryset(self):
+        return DiagramHistory.objects.filter(user=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Answer conditional requests from the stored hash alone, before the
+        # large text columns are loaded or serialized.
+        content_hash = self.get_queryset().filter(
+            pk=kwargs['pk'],
+        ).values_list('content_hash', flat=True).first()
+        if content_hash is None:
+            raise Http404
+
+        encoding = plantuml.requested_encoding(request)
+        if content_hash and encoding != 'plain':
+            content_hash = f'{content_hash}-{encoding}'
+        etag = quote_etag(content_hash) if content_hash else None
+        if etag:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        if etag:
+            response['ETag'] = etag
+        return response
+
+
+class HistoryRefView(DiagramEncodingMixin, generics.RetrieveAPIView):
+    """An entry by the ref returned from /convert/; 404 until it is written."""
+
     serializer_class = DiagramHistoryDetailSerializer
+    lookup_field = 'ref'
 
     def get_queryset(self):
         return DiagramHistory.objects.filter(user=self.request.user)
+
+
+class HistoryDiffView(APIView):
+    """Structural diff from entry ``pk`` to entry ``other_pk``.
+
+    Compares the entries' parsed class models (see ``parsers.model_diff``)
+    instead of their sources or diagram text.  ``?diagram=1`` adds the
+    newer class diagram with the changes highlighted.  Models come from
+    the stored ``parsed_model`` or, for entries saved without one, from
+    the conversion cache; only when neither has it is the source parsed,
+    and the model is then stored for next time.
+    """
+
+    def get(self, request, pk, other_pk):
+        with_diagram = request.query_params.get('diagram', '') in ('1', 'true')
+        encoding = plantuml.requested_encoding(request)
+
+        # Like HistoryDetailView, answer conditional requests from the
+        # stored hashes before loading anything large.
+        hashes = dict(
+            DiagramHistory.objects.filter(user=request.user, pk__in=(pk, other_pk))
+            .values_list('pk', 'content_hash')
+        )
+        if pk not in hashes or other_pk not in hashes:
+            raise Http404
+        # The diff is computed by the current code, so its version is part
+        # of the tag.
+        etag = quote_etag(hashlib.sha256(
+            f'{GENERATOR_VERSION}:{hashes[pk]}:{hashes[other_pk]}:{with_diagram}:{encoding}'.encode()
+        ).hexdigest())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        entries = DiagramHistory.objects.filter(pk__in=(pk, other_pk)).only(
+            'id', 'filename', 'version', 'created_at', 'parsed_model', 'source_code',
+        ).in_bulk()
+        old, new = _class_model(entries[pk]), _class_model(entries[other_pk])
+
+        data = {
+            'from': _entry_summary(entries[pk]),
+            'to': _entry_summary(entries[other_pk]),
+            **diff_models(old, new),
+        }
+        if with_diagram:
+            diagram = DiffClassDiagramGenerator(old).generate(new)
+            if encoding != 'plain':
+                diagram = plantuml.encode(diagram)
+                data['diagram_encoding'] = encoding
+            data['class_diagram'] = diagram
+        response = Response(data)
+        response['ETag'] = etag
+        return response
+
+
+def _class_model(entry):
+    if entry.parsed_model:
+        try:
+            return model_codec.loads(entry.parsed_model)
+        except model_codec.ModelVersionError:
+            pass  # Written by another model version.
+    sources = split_history_source(entry.source_code)
+    result = service.lookup(service.key_for(sources))
+    if result is None:
+        result = service.build(sources)
+        DiagramHistory.objects.filter(pk=entry.pk).update(parsed_model=result['model'])
+    return model_codec.loads(result['model'])
+
+
+def _entry_summary(entry):
+    return {
+        'id': entry.id,
+        'filename': entry.filename,
+        'version': entry.version,
+        'created_at': entry.created_at,
+    }
@@ -0,0 +1,101 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .models import DiagramHistory
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryWriter:
+    """Write-behind persistence for DiagramHistory entries.
+
+    :meth:`submit` only enqueues an unsaved entry; a background thread
+    collects up to ``batch_size`` entries (waiting at most ``max_delay``
+    seconds after the first one) and inserts them with
+    :meth:`DiagramHistory.bulk_insert`.  An entry's ``ref`` is known as soon
+    as it is built, so the request can return it immediately; the row and
+    its id show up at ``/history/ref/<ref>/`` once the batch is written.
+
+    Queued entries survive a graceful shutdown: :meth:`stop` drains the
+    queue and is called from an ``atexit`` hook and from gunicorn's
+    ``worker_exit``.  A killed process loses what was still queued.
+
+    The thread is started on the first submit, so a preloading gunicorn
+    master never forks with it running.
+    """
+
+    def __init__(self, batch_size, max_delay):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        conf = settings.HISTORY_WRITE_BEHIND
+        return cls(batch_size=conf['BATCH_SIZE'], max_delay=conf['MAX_DELAY'])
+
+    def submit(self, entry):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+        self._queue.put(entry)
+
+    def flush(self):
+        """Block until every entry submitted so far has been written."""
+        self._queue.join()
+
+    def stop(self):
+        """Write what is queued and stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            batch = []
+            if first is None:
+                stopping = True
+            else:
+                batch.append(first)
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.batch_size:
+                    try:
+                        entry = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if entry is None:
+                        stopping = True
+                        break
+                    batch.append(entry)
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
+        connection.close()
+
+    def _write(self, batch):
+        close_old_connections()
+        try:
+            DiagramHistory.bulk_insert(batch)
+        except Exception:
+            logger.exception('Bulk history write of %d entries failed; saving one by one', len(batch))
+            for entry in batch:
+                try:
+                    entry.save(force_insert=True)
+                except Exception:
+                    logger.exception('Dropping history entry %s', entry.ref)
@@ -0,0 +1,92 @@
+"""
+Gunicorn configuration.
+
+Every setting can be overridden through an environment variable.  By default
+the application is preloaded: Django, DRF, javalang and the shared
+``ConversionService`` are imported and warmed once in the master, so forked
+workers share those pages copy-on-write and start serving immediately.
+
+Usage::
+
+    gunicorn -c config/gunicorn.conf.py config.wsgi:application
+
+    # ASGI mode (async /convert/ view)
+    gunicorn -c config/gunicorn.conf.py -k uvicorn_worker.UvicornWorker config.asgi:application
+
+In ASGI mode each worker parses in its own process pool of
+``CONVERSION_EXECUTOR_WORKERS`` processes, which defaults to the cores
+divided by ``GUNICORN_WORKERS``, so the whole server runs about one parser
+per core.  One event loop can feed the whole machine, so
+``GUNICORN_WORKERS=1`` (with a pool of every core) is the leanest setup.
+"""
+
+import gc
+import os
+import time
+
+_started = time.perf_counter()
+
+
+def _env_int(name, default):
+    value = os.environ.get(name, '')
+    return int(value) if value.strip() else default
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+# Parsing is CPU-bound, so one worker per core is the sensible default.
+workers = _env_int('GUNICORN_WORKERS', os.cpu_count() or 1)
+# Each sync worker runs one request per thread. Admission lanes
+# (CONVERSION_ADMISSION) are shared by all workers, so their slot counts are
+# compared against workers * threads, not against one worker.
+threads = _env_int('GUNICORN_THREADS', 1)
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+accesslog = '-'
+errorlog = '-'
+
+
+def _warm_up(log):
+    """Load the URLconf (and with it every view) and warm the converter."""
+    from django.conf import settings
+    from django.urls import get_resolver
+
+    warm_started = time.perf_counter()
+    get_resolver().url_patterns
+
+    from apps.converter.views import service
+    service.warm_up()
+
+    loaded = 0
+    if settings.CONVERSION_CACHE_SNAPSHOT:
+        loaded = service.load_snapshot(settings.CONVERSION_CACHE_SNAPSHOT)
+
+    log.info(
+        'Converter warmed in %.0f ms (%d cached conversions loaded)',
+        (time.perf_counter() - warm_started) * 1000, loaded,
+    )
+
+
+def when_ready(server):
+    if preload_app:
+        _warm_up(server.log)
+        # Move everything allocated so far out of the collector's reach so
+        # that GC passes in the workers do not dirty the shared pages.
+        gc.freeze()
+    server.log.info('Cold start took %.0f ms', (time.perf_counter() - _started) * 1000)
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        _warm_up(worker.log)
+
+
+def worker_exit(server, worker):
+    from django.conf import settings
+
+    from apps.converter.views import history_writer, usage
+    history_writer.stop()
+    usage.stop()
+
+    if settings.CONVERSION_CACHE_SNAPSHOT:
+        from apps.converter.views import service
+        service.save_snapshot(settings.CONVERSION_CACHE_SNAPSHOT)
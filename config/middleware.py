@@ -0,0 +1,122 @@
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from services import tracing
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Negotiated response compression: Brotli when accepted, else gzip.
+
+    Converted diagrams are large and highly repetitive, so both shrink by
+    roughly an order of magnitude.  Streaming responses are left to the
+    gzip implementation.
+    """
+
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or len(response.content) < 200
+            or response.has_header("Content-Encoding")
+            or not re_accepts_brotli.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        compressed_content = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+
+        return response
+
+
+class TracingMiddleware:
+    """Records a sampled share of requests as traces (``settings.TRACING``).
+
+    Each request is the root span of its trace; the views, the conversion
+    service and ORM queries add child spans.  With a sample rate of 0 the
+    middleware and the instrumented code only check that tracing is off.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        conf = settings.TRACING
+        try:
+            tracing.configure(conf['SAMPLE_RATE'], conf['EXPORTER'], conf['PATH'])
+        except ValueError as exc:
+            raise ImproperlyConfigured(f'TRACING: {exc}') from exc
+        if tracing.tracer.enabled:
+            connection_created.connect(_trace_queries, dispatch_uid='tracing-queries')
+            for connection in connections.all(initialized_only=True):
+                _trace_queries(connection=connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with tracing.tracer.span(f'HTTP {request.method}') as span:
+            response = self.get_response(request)
+            if span.recording:
+                _set_http_attributes(span, request, response)
+            return response
+
+    async def __acall__(self, request):
+        with tracing.tracer.span(f'HTTP {request.method}') as span:
+            response = await self.get_response(request)
+            if span.recording:
+                _set_http_attributes(span, request, response)
+            return response
+
+
+def _set_http_attributes(span, request, response):
+    match = request.resolver_match
+    span.set_attributes({
+        'http.method': request.method,
+        'http.target': request.path,
+        'http.route': match.route if match else '',
+        'http.status_code': response.status_code,
+    })
+    content_length = request.META.get('CONTENT_LENGTH', '')
+    if content_length.isdigit():
+        span.set_attribute('http.request_content_length', int(content_length))
+    if not response.streaming:
+        span.set_attribute('http.response_content_length', len(response.content))
+
+
+def _trace_queries(sender=None, connection=None, **kwargs):
+    if _query_span not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_span)
+
+
+def _query_span(execute, sql, params, many, context):
+    span = tracing.tracer.current()
+    if not span.recording:
+        return execute(sql, params, many, context)
+    with tracing.tracer.span('db.query', {
+        'db.system': context['connection'].vendor,
+        'db.statement': sql[:1000],
+        'db.many': many,
+    }):
+        return execute(sql, params, many, context)
@@ -2,6 +2,8 @@ import os
 from pathlib import Path
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-dev-key-change-in-production'
@@ -23,7 +25,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.TracingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'config.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,19 +56,68 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Serve /convert/ with the async view; config/asgi.py turns this on.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '') == '1'
+
+# SQLite by default; DB_ENGINE=postgresql switches to PostgreSQL configured
+# from the DB_* variables. Connections are kept open for DB_CONN_MAX_AGE
+# seconds, except under ASGI, where Django opens one per request thread and
+# persistent connections would pile up (use DB_POOL=1 on PostgreSQL there).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 0 if ASYNC_VIEWS else 600))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'service_converter'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'pool': True} if os.environ.get('DB_POOL', '') == '1' else {},
+        }
     }
-}
+    if DATABASES['default']['OPTIONS']:
+        # Django's pool manages connection lifetime itself.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+elif DB_ENGINE == 'sqlite':
+    # WAL lets readers run alongside the single writer, synchronous=NORMAL
+    # only fsyncs at checkpoints (safe in WAL mode), and IMMEDIATE
+    # transactions take the write lock up front so concurrent writers wait
+    # out the busy timeout instead of failing with "database is locked".
+    # SQLITE_TUNING=0 restores SQLite's defaults.
+    _sqlite_options = {'timeout': int(os.environ.get('DB_BUSY_TIMEOUT', 20))}
+    if os.environ.get('SQLITE_TUNING', '1') != '0':
+        _sqlite_options.update({
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f'PRAGMA mmap_size={int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))};'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        })
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': _sqlite_options,
+        }
+    }
+else:
+    raise ImproperlyConfigured(f'Unsupported DB_ENGINE: {DB_ENGINE!r} (expected sqlite or postgresql)')
 
 AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -76,6 +129,18 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
 
+# Users resolved from JWTs are cached per worker for TTL seconds
+# (apps.accounts.authentication); 0 looks the user up on every request.
+# Saves, deletes and queryset updates of users drop the entry only in the
+# worker that made them: other workers, and any change made outside the
+# ORM or from another process (shell, management commands, raw SQL), can
+# keep serving the old row, e.g. a deactivated user, for up to TTL seconds.
+# Keep TTL short.
+AUTH_USER_CACHE = {
+    'TTL': float(os.environ.get('AUTH_USER_CACHE_TTL', 30)),
+    'MAX_ENTRIES': int(os.environ.get('AUTH_USER_CACHE_MAX_ENTRIES', 10000)),
+}
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 LANGUAGE_CODE = 'en-us'
@@ -91,3 +156,62 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 FILE_UPLOAD_MAX_MEMORY_SIZE = 16 * 1024 * 1024
+
+# Conversion cache persisted across restarts (loaded by the preloading
+# gunicorn master, written back by each worker on exit). Empty disables it.
+CONVERSION_CACHE_SNAPSHOT = os.environ.get('CONVERSION_CACHE_SNAPSHOT', '')
+
+# Key the conversion cache (and the ETags derived from it) on sources with
+# comments and formatting normalized away (services.normalize), so such
+# edits are served from the cache. ETags become weak.
+CONVERSION_SEMANTIC_CACHE_KEYS = os.environ.get('CONVERSION_SEMANTIC_CACHE_KEYS', '') == '1'
+
+# Size of the process pool the async convert view parses in, per worker;
+# 0 uses the event loop's default thread pool instead. Every gunicorn
+# worker has its own pool, so by default the cores are split between the
+# GUNICORN_WORKERS workers (one per core unless set) rather than each
+# worker starting a pool as large as the machine.
+_CPU_COUNT = os.cpu_count() or 1
+CONVERSION_EXECUTOR_WORKERS = int(
+    os.environ.get('CONVERSION_EXECUTOR_WORKERS', '').strip()
+    or max(1, _CPU_COUNT // int(os.environ.get('GUNICORN_WORKERS', '').strip() or _CPU_COUNT))
+)
+
+# Admission control for /convert/ (apps.converter.admission). Lane slots,
+# per-user counts and byte buckets are shared by all workers on the host
+# through the SQLite file at STATE_PATH. Requests of LARGE_REQUEST_BYTES or
+# more use the large lane; keep LARGE_LANE_SLOTS below the number of
+# workers (times threads) so that small requests always find one free.
+CONVERSION_ADMISSION = {
+    'STATE_PATH': os.environ.get('CONVERSION_ADMISSION_STATE', str(BASE_DIR / 'admission.sqlite3')),
+    'LEASE_SECONDS': int(os.environ.get('CONVERSION_ADMISSION_LEASE', 300)),
+    'LARGE_REQUEST_BYTES': int(os.environ.get('CONVERSION_LARGE_REQUEST_BYTES', 1024 * 1024)),
+    'SMALL_LANE_SLOTS': int(os.environ.get('CONVERSION_SMALL_LANE_SLOTS', 8)),
+    'LARGE_LANE_SLOTS': int(os.environ.get('CONVERSION_LARGE_LANE_SLOTS', 1)),
+    'USER_CONCURRENCY': int(os.environ.get('CONVERSION_USER_CONCURRENCY', 2)),
+    'USER_BYTES_PER_SECOND': int(os.environ.get('CONVERSION_USER_BYTES_PER_SECOND', 2 * 1024 * 1024)),
+    'USER_BURST_BYTES': int(os.environ.get('CONVERSION_USER_BURST_BYTES', 64 * 1024 * 1024)),
+    'FILE_COST_BYTES': int(os.environ.get('CONVERSION_FILE_COST_BYTES', 16 * 1024)),
+}
+
+# Save history entries from a background writer in batches instead of on
+# the request path (apps.history.writer). Responses then carry only the
+# entry's ref until the row is written.
+HISTORY_WRITE_BEHIND = {
+    'ENABLED': os.environ.get('HISTORY_WRITE_BEHIND', '') == '1',
+    'BATCH_SIZE': int(os.environ.get('HISTORY_WRITE_BATCH_SIZE', 100)),
+    'MAX_DELAY': float(os.environ.get('HISTORY_WRITE_MAX_DELAY', 0.2)),
+}
+
+# Seconds between folding buffered conversion counts into the usage rollup
+# tables (apps.history.usage); 0 writes them on every conversion.
+USAGE_ROLLUP_FLUSH_INTERVAL = float(os.environ.get('USAGE_ROLLUP_FLUSH_INTERVAL', 10))
+
+# Request tracing (services.tracing): this share (0-1) of requests is
+# recorded as spans and written by TRACING_EXPORTER (jsonl to TRACING_PATH,
+# stdout, or the dotted path of an exporter class). 0 disables tracing.
+TRACING = {
+    'SAMPLE_RATE': float(os.environ.get('TRACING_SAMPLE_RATE', 0)),
+    'EXPORTER': os.environ.get('TRACING_EXPORTER', 'jsonl'),
+    'PATH': os.environ.get('TRACING_PATH', str(BASE_DIR / 'traces.jsonl')),
+}
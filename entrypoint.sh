@@ -22,5 +22,9 @@ else:
     print('✓ Superuser already exists')
 EOF
 
-echo "Starting gunicorn on 0.0.0.0:8000..."
-exec gunicorn --bind 0.0.0.0:8000 --workers 2 --timeout 120 --access-logfile - --error-logfile - config.wsgi:application
+echo "Starting gunicorn on ${GUNICORN_BIND:-0.0.0.0:8000}..."
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    exec gunicorn -c config/gunicorn.conf.py -k uvicorn_worker.UvicornWorker config.asgi:application
+else
+    exec gunicorn -c config/gunicorn.conf.py config.wsgi:application
+fi
@@ -3,9 +3,13 @@ from .base_generator import DiagramGenerator
 from .class_diagram import ClassDiagramGenerator
 from .usecase_diagram import UseCaseDiagramGenerator
 from .flow_diagram import FlowDiagramGenerator
+from .sequence_diagram import SequenceDiagramGenerator
 from .generator_factory import DiagramGeneratorFactory
 
 # Register generators with the factory
 DiagramGeneratorFactory.register("class", ClassDiagramGenerator)
 DiagramGeneratorFactory.register("usecase", UseCaseDiagramGenerator)
 DiagramGeneratorFactory.register("flow", FlowDiagramGenerator)
+# Only on request: it needs every method of the model in memory at once
+# (see CallGraph), and most callers have no use for it.
+DiagramGeneratorFactory.register("sequence", SequenceDiagramGenerator, default=False)
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
 
 from .java_parser import ClassInfo
 
@@ -8,23 +9,43 @@ class DiagramGenerator(ABC):
 
     Implements the Strategy pattern (interchangeable generators) and the
     Template Method pattern (common generate flow with customisable steps).
+
+    ``classes`` may be any re-iterable collection, such as a list or a
+    ``services.model_store.ModelStore``.  Bodies make repeated passes over
+    it rather than copying it, so :meth:`iter_lines` over an on-disk store
+    renders without the whole model in memory.
     """
 
-    def generate(self, classes: list[ClassInfo]) -> str:
+    # Whether output depends on method bodies, not just on declarations.
+    # Lets incremental callers skip generators when only bodies changed.
+    uses_method_bodies = False
+
+    def generate(self, classes: Iterable[ClassInfo]) -> str:
         """Template method: header -> directives -> body -> footer."""
-        lines = ["@startuml"]
-        lines.extend(self._directives())
-        lines.append("")
-        lines.extend(self._body(classes))
-        lines.append("@enduml")
-        return "\n".join(lines)
+        return "\n".join(self.iter_lines(classes))
+
+    def iter_lines(self, classes: Iterable[ClassInfo]) -> Iterator[str]:
+        """:meth:`generate` one line at a time."""
+        yield "@startuml"
+        yield from self._directives()
+        yield ""
+        yield from self._body(classes)
+        yield "@enduml"
+
+    def generate_pages(self, classes: list[ClassInfo]) -> list[str]:
+        """Render the diagram as a list of self-contained pages.
+
+        Generators that can split large diagrams override this; by
+        default the whole diagram is a single page.
+        """
+        return [self.generate(classes)]
 
     def _directives(self) -> list[str]:
         """Optional PlantUML directives (skinparam, direction, etc.)."""
         return []
 
     @abstractmethod
-    def _body(self, classes: list[ClassInfo]) -> list[str]:
+    def _body(self, classes: Iterable[ClassInfo]) -> Iterable[str]:
         """Generate the main diagram content."""
         ...
 
@@ -0,0 +1,92 @@
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from .java_parser import ClassInfo, MethodInfo
+
+
+@dataclass(frozen=True)
+class CallEdge:
+    """A call from one method to a method of a class in the model."""
+
+    target: str
+    method: str
+    # Index of the called method's node, or None when the target class
+    # does not declare or inherit (within the model) a matching method.
+    callee: int | None
+
+
+class CallGraph:
+    """Index of the calls between the methods of a set of classes.
+
+    Built once from the ``calls`` the parser recorded for each method:
+    every method becomes a node and every call whose receiver type is a
+    class in the model becomes an edge to the matching method, looked up
+    by name and argument count and then through the ``extends`` chain.
+    A call made on another call's return value goes to the declared
+    return type of the method that call resolved to.
+    Walking the graph afterwards never touches method bodies.
+    """
+
+    def __init__(self, classes: Iterable[ClassInfo]) -> None:
+        self.nodes: list[tuple[str, MethodInfo]] = []
+        self._classes: dict[str, ClassInfo] = {}
+        self._by_name: dict[tuple[str, str], list[int]] = {}
+        for cls in classes:
+            if cls.name in self._classes:
+                continue  # Same simple name in two packages: first one wins.
+            self._classes[cls.name] = cls
+            for method in cls.methods:
+                self._by_name.setdefault((cls.name, method.name), []).append(len(self.nodes))
+                self.nodes.append((cls.name, method))
+
+        self._edges: list[list[CallEdge]] = [self._method_edges(method) for _, method in self.nodes]
+
+    def callees(self, node: int) -> list[CallEdge]:
+        return self._edges[node]
+
+    def find(self, entry: str) -> int | None:
+        """Node of ``Class.method`` (the first overload), or None."""
+        class_name, _, method_name = entry.rpartition(".")
+        nodes = self._by_name.get((class_name, method_name))
+        return nodes[0] if nodes else None
+
+    def busiest(self) -> int | None:
+        """Node with the most calls into the model (first on ties), or None."""
+        best, best_count = None, 0
+        for node, edges in enumerate(self._edges):
+            if len(edges) > best_count:
+                best, best_count = node, len(edges)
+        return best
+
+    def _method_edges(self, method: MethodInfo) -> list[CallEdge]:
+        edges = []
+        # Resolved callee of each call, for the calls chained on its result.
+        callees: list[int | None] = []
+        for call in method.calls:
+            target = call.target
+            if target is None and call.receiver is not None and callees[call.receiver] is not None:
+                target = _simple_name(self.nodes[callees[call.receiver]][1].return_type)
+            callee = None
+            if target in self._classes:
+                callee = self._resolve(target, call.method, call.arguments)
+                edges.append(CallEdge(target, call.method, callee))
+            callees.append(callee)
+        return edges
+
+    def _resolve(self, class_name: str, method_name: str, arguments: int) -> int | None:
+        seen = set()
+        while class_name in self._classes and class_name not in seen:
+            seen.add(class_name)
+            nodes = self._by_name.get((class_name, method_name))
+            if nodes:
+                for node in nodes:
+                    if len(self.nodes[node][1].parameters) == arguments:
+                        return node
+                return nodes[0]
+            class_name = self._classes[class_name].extends
+        return None
+
+
+def _simple_name(type_name: str) -> str:
+    """``java.util.Optional<Item>`` -> ``Optional``."""
+    return type_name.split("<", 1)[0].rsplit(".", 1)[-1]
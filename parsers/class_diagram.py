@@ -1,4 +1,7 @@
-from .java_parser import ClassInfo
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+
+from .java_parser import ClassInfo, FieldInfo, MethodInfo
 from .base_generator import DiagramGenerator
 
 
@@ -8,9 +11,24 @@ VISIBILITY_MAP = {
     "protected": "#",
 }
 
+PARTITIONS = ("package", "component")
+
 
 class ClassDiagramGenerator(DiagramGenerator):
-    """Generates PlantUML class diagram markup from parsed Java classes."""
+    """Generates PlantUML class diagram markup from parsed Java classes.
+
+    When a ``page_size`` is given, diagrams with more classes are split
+    into pages (see :meth:`generate_pages`), grouping classes by Java
+    package or by connected component of the inheritance/association
+    graph.  Classes referenced from another page appear as member-less
+    stubs stereotyped with the page they live on.
+    """
+
+    def __init__(self, page_size: int | None = None, partition: str = "package") -> None:
+        if partition not in PARTITIONS:
+            raise ValueError(f"Unknown partition: {partition}. Available: {list(PARTITIONS)}")
+        self.page_size = page_size
+        self.partition = partition
 
     @property
     def diagram_type(self) -> str:
@@ -19,69 +37,155 @@ class ClassDiagramGenerator(DiagramGenerator):
     def _directives(self) -> list[str]:
         return ["skinparam classAttributeIconSize 0"]
 
-    def _body(self, classes: list[ClassInfo]) -> list[str]:
-        lines: list[str] = []
+    def _body(self, classes: Iterable[ClassInfo]) -> Iterator[str]:
         for cls in classes:
+            yield from self._render_class(cls)
+            yield ""
+        yield from self._render_relationships(classes)
+
+    def generate_pages(self, classes: list[ClassInfo]) -> list[str]:
+        if not self.page_size or len(classes) <= self.page_size:
+            return [self.generate(classes)]
+
+        if self.partition == "component":
+            pages = self._partition_by_component(classes)
+        else:
+            pages = self._partition_by_package(classes)
+
+        by_name = {cls.name: cls for cls in classes}
+        page_of = {cls.name: number for number, page in enumerate(pages, 1) for cls in page}
+        return [
+            self._render_page(page, number, len(pages), by_name, page_of)
+            for number, page in enumerate(pages, 1)
+        ]
+
+    def _render_page(self, page, number, total, by_name, page_of) -> list[str]:
+        names = {cls.name for cls in page}
+        external = sorted({
+            target
+            for cls in page
+            for target, _ in self._relations(cls)
+            if target in by_name and target not in names
+        })
+
+        lines = ["@startuml"]
+        lines.extend(self._directives())
+        lines.append(f"title Page {number} of {total}")
+        lines.append("")
+        for cls in page:
             lines.extend(self._render_class(cls))
             lines.append("")
-        lines.extend(self._render_relationships(classes))
-        return lines
+        for name in external:
+            lines.append(f"{self._keyword(by_name[name])} {name} <<page {page_of[name]}>>")
+        if external:
+            lines.append("")
+        lines.extend(self._render_relationships(page, names.union(external)))
+        lines.append("@enduml")
+        return "\n".join(lines)
+
+    def _partition_by_package(self, classes: list[ClassInfo]) -> list[list[ClassInfo]]:
+        packages: dict[str, list[ClassInfo]] = defaultdict(list)
+        for cls in classes:
+            packages[cls.package].append(cls)
+        # Sorting by name keeps sibling packages on neighbouring pages.
+        return self._pack(packages[name] for name in sorted(packages))
+
+    def _partition_by_component(self, classes: list[ClassInfo]) -> list[list[ClassInfo]]:
+        parent = {cls.name: cls.name for cls in classes}
+
+        def find(name):
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        for cls in classes:
+            for target, _ in self._relations(cls):
+                if target in parent:
+                    parent[find(target)] = find(cls.name)
+
+        components: dict[str, list[ClassInfo]] = defaultdict(list)
+        for cls in classes:
+            components[find(cls.name)].append(cls)
+        return self._pack(sorted(components.values(), key=len, reverse=True))
+
+    def _pack(self, groups) -> list[list[ClassInfo]]:
+        """Fill pages of at most ``page_size`` classes, splitting big groups."""
+        pages: list[list[ClassInfo]] = []
+        for group in groups:
+            for start in range(0, len(group), self.page_size):
+                chunk = group[start:start + self.page_size]
+                if pages and len(pages[-1]) + len(chunk) <= self.page_size:
+                    pages[-1].extend(chunk)
+                else:
+                    pages.append(list(chunk))
+        return pages
+
+    def _keyword(self, cls: ClassInfo) -> str:
+        if cls.kind in ("interface", "enum"):
+            return cls.kind
+        if "abstract" in cls.modifiers:
+            return "abstract class"
+        return "class"
 
     def _render_class(self, cls: ClassInfo) -> list[str]:
-        lines = []
+        lines = [f"{self._keyword(cls)} {cls.name} {{"]
 
-        if cls.kind == "interface":
-            lines.append(f"interface {cls.name} {{")
-        elif cls.kind == "enum":
-            lines.append(f"enum {cls.name} {{")
+        if cls.kind == "enum":
             for const in cls.enum_constants:
                 lines.append(f"  {const}")
             if cls.enum_constants and (cls.fields or cls.methods):
                 lines.append("  --")
-        elif "abstract" in cls.modifiers:
-            lines.append(f"abstract class {cls.name} {{")
-        else:
-            lines.append(f"class {cls.name} {{")
 
         for field in cls.fields:
-            vis = self._get_visibility(field.modifiers)
-            static = " {static}" if "static" in field.modifiers else ""
-            lines.append(f"  {vis}{field.name} : {field.type}{static}")
+            lines.append(f"  {self._field_line(field)}")
 
         if cls.fields and cls.methods:
             lines.append("  --")
 
         for method in cls.methods:
-            vis = self._get_visibility(method.modifiers)
-            static = " {static}" if "static" in method.modifiers else ""
-            abstract = " {abstract}" if "abstract" in method.modifiers else ""
-            params = ", ".join(f"{p.name}: {p.type}" for p in method.parameters)
-            lines.append(f"  {vis}{method.name}({params}) : {method.return_type}{static}{abstract}")
+            lines.append(f"  {self._method_line(method)}")
 
         lines.append("}")
         return lines
 
+    def _field_line(self, field: FieldInfo) -> str:
+        vis = self._get_visibility(field.modifiers)
+        static = " {static}" if "static" in field.modifiers else ""
+        return f"{vis}{field.name} : {field.type}{static}"
+
+    def _method_line(self, method: MethodInfo) -> str:
+        vis = self._get_visibility(method.modifiers)
+        static = " {static}" if "static" in method.modifiers else ""
+        abstract = " {abstract}" if "abstract" in method.modifiers else ""
+        params = ", ".join(f"{p.name}: {p.type}" for p in method.parameters)
+        return f"{vis}{method.name}({params}) : {method.return_type}{static}{abstract}"
+
     def _get_visibility(self, modifiers: list[str]) -> str:
         for mod in modifiers:
             if mod in VISIBILITY_MAP:
                 return VISIBILITY_MAP[mod]
         return "~"
 
-    def _render_relationships(self, classes: list[ClassInfo]) -> list[str]:
-        lines = []
-        class_names = {cls.name for cls in classes}
-
-        for cls in classes:
-            if cls.extends and cls.extends in class_names:
-                lines.append(f"{cls.extends} <|-- {cls.name}")
-
-            for iface in cls.implements:
-                if iface in class_names:
-                    lines.append(f"{iface} <|.. {cls.name}")
+    def _relations(self, cls: ClassInfo):
+        """Yield (target class name, PlantUML line) for each outgoing relationship."""
+        if cls.extends:
+            yield cls.extends, f"{cls.extends} <|-- {cls.name}"
 
-            for field in cls.fields:
-                base_type = field.type.split("<")[0]
-                if base_type in class_names and base_type != cls.name:
-                    lines.append(f'{cls.name} --> {base_type} : {field.name}')
+        for iface in cls.implements:
+            yield iface, f"{iface} <|.. {cls.name}"
 
-        return lines
+        for field in cls.fields:
+            base_type = field.type.split("<")[0]
+            if base_type != cls.name:
+                yield base_type, f'{cls.name} --> {base_type} : {field.name}'
+
+    def _render_relationships(self, classes: Iterable[ClassInfo], class_names: set[str] | None = None) -> Iterator[str]:
+        if class_names is None:
+            class_names = {cls.name for cls in classes}
+        return (
+            line
+            for cls in classes
+            for target, line in self._relations(cls)
+            if target in class_names
+        )
@@ -1,17 +1,89 @@
+from collections.abc import Iterable, Iterator
+from fnmatch import fnmatchcase
+from itertools import islice
+
 from .java_parser import ClassInfo, MethodInfo
 from .base_generator import DiagramGenerator
 
 
+BRANCH_PREFIXES = ("IF:", "FOR:", "WHILE:", "CASE:", "CATCH:")
+
+
 class FlowDiagramGenerator(DiagramGenerator):
-    """Generates PlantUML activity diagrams from parsed Java method bodies."""
+    """Generates PlantUML activity diagrams from parsed Java method bodies.
+
+    Which methods are rendered can be narrowed by class name, method name
+    pattern (shell-style, e.g. ``get*``) and count, optionally ranking the
+    candidates by complexity first.  Output is bounded by a statement and
+    a line budget, both off by default; rendering stops at the first
+    method that would exceed either, and a final partition (after a
+    comment saying the same) shows how many methods were left out.
+    """
+
+    uses_method_bodies = True
+
+    def __init__(
+        self,
+        class_names: list[str] | None = None,
+        method_pattern: str | None = None,
+        rank_by_complexity: bool = False,
+        max_methods: int | None = None,
+        max_statements: int | None = None,
+        max_lines: int | None = None,
+    ) -> None:
+        self.class_names = set(class_names) if class_names else None
+        self.method_pattern = method_pattern
+        self.rank_by_complexity = rank_by_complexity
+        self.max_methods = max_methods
+        self.max_statements = max_statements
+        self.max_lines = max_lines
 
     @property
     def diagram_type(self) -> str:
         return "flow"
 
-    def _body(self, classes: list[ClassInfo]) -> list[str]:
-        lines: list[str] = []
+    def _body(self, classes: Iterable[ClassInfo]) -> Iterator[str]:
+        selected = self._select(classes)
+        written = 0
+        statements = 0
+
+        for class_name, method in selected:
+            statements += len(method.body_statements)
+            if self.max_statements is not None and statements > self.max_statements:
+                break
+            method_lines = self._render_method(class_name, method)
+            if self.max_lines is not None and written + len(method_lines) + 1 > self.max_lines:
+                break
+            yield from method_lines
+            yield ""
+            written += len(method_lines) + 1
+        else:
+            return
+
+        omitted = 1 + sum(1 for _ in selected)
+        yield f"' {omitted} more methods omitted: flow diagram budget reached"
+        yield f"partition \"{omitted} more methods omitted\" {{"
+        yield "  :flow diagram budget reached;"
+        yield "}"
+
+    def _select(self, classes: Iterable[ClassInfo]) -> Iterator[tuple[str, MethodInfo]]:
+        """Pick the (class name, method) pairs to render, in output order.
+
+        Candidates are streamed from ``classes`` unless they have to be
+        ranked by complexity, which needs all of them at once.
+        """
+        selected = self._candidates(classes)
+        if self.rank_by_complexity:
+            selected = iter(sorted(selected, key=lambda pair: self._complexity(pair[1]), reverse=True))
+        if self.max_methods is not None:
+            selected = islice(selected, self.max_methods)
+        return selected
+
+    def _candidates(self, classes: Iterable[ClassInfo]) -> Iterator[tuple[str, MethodInfo]]:
         for cls in classes:
+            if self.class_names is not None and cls.name not in self.class_names:
+                continue
+
             interesting_methods = [
                 m for m in cls.methods
                 if m.body_statements and len(m.body_statements) > 1
@@ -20,10 +92,15 @@ class FlowDiagramGenerator(DiagramGenerator):
                 interesting_methods = cls.methods[:3]
 
             for method in interesting_methods:
-                lines.extend(self._render_method(cls.name, method))
-                lines.append("")
-
-        return lines
+                if self.method_pattern and not fnmatchcase(method.name, self.method_pattern):
+                    continue
+                yield cls.name, method
+
+    @staticmethod
+    def _complexity(method: MethodInfo) -> tuple[int, int]:
+        """(decision points, statement count); higher sorts first."""
+        branches = sum(1 for stmt in method.body_statements if stmt.startswith(BRANCH_PREFIXES))
+        return branches, len(method.body_statements)
 
     def _render_method(self, class_name: str, method: MethodInfo) -> list[str]:
         params = ", ".join(f"{p.type} {p.name}" for p in method.parameters)
@@ -7,23 +7,36 @@ class DiagramGeneratorFactory:
     """Factory for creating diagram generators by name."""
 
     _registry: dict[str, type[DiagramGenerator]] = {}
+    _defaults: list[str] = []
 
     @classmethod
-    def register(cls, name: str, generator_cls: type[DiagramGenerator]) -> None:
-        """Register a generator class under the given name."""
+    def register(cls, name: str, generator_cls: type[DiagramGenerator], default: bool = True) -> None:
+        """Register a generator class under the given name.
+
+        Generators registered with ``default=False`` are left out of
+        :meth:`create_all` and :meth:`defaults`; they only run when asked
+        for by name.
+        """
         cls._registry[name] = generator_cls
+        if default and name not in cls._defaults:
+            cls._defaults.append(name)
 
     @classmethod
-    def create(cls, name: str) -> DiagramGenerator:
-        """Create a single generator by name."""
+    def create(cls, name: str, **options) -> DiagramGenerator:
+        """Create a single generator by name, passing options to its constructor."""
         if name not in cls._registry:
             raise ValueError(f"Unknown generator: {name}. Available: {cls.available()}")
-        return cls._registry[name]()
+        return cls._registry[name](**options)
 
     @classmethod
     def create_all(cls) -> dict[str, DiagramGenerator]:
-        """Create one instance of every registered generator."""
-        return {name: gen_cls() for name, gen_cls in cls._registry.items()}
+        """Create one instance of every default generator."""
+        return {name: cls._registry[name]() for name in cls._defaults}
+
+    @classmethod
+    def defaults(cls) -> list[str]:
+        """Return names of the generators run when none are asked for."""
+        return list(cls._defaults)
 
     @classmethod
     def available(cls) -> list[str]:
@@ -15,6 +15,19 @@ class ParameterInfo:
     type: str
 
 
+@dataclass
+class CallInfo:
+    method: str
+    # Simple name of the receiver's declared type; None when it could not
+    # be resolved (lambda parameters, unknown names, return values).
+    target: str | None = None
+    arguments: int = 0
+    # For a call made on another call's return value (``repo.find(1).touch()``),
+    # the index of that call in the method's ``calls``; its declared return
+    # type, once known, is this call's target (see ``CallGraph``).
+    receiver: int | None = None
+
+
 @dataclass
 class MethodInfo:
     name: str
@@ -22,6 +35,7 @@ class MethodInfo:
     parameters: list[ParameterInfo] = field(default_factory=list)
     modifiers: list[str] = field(default_factory=list)
     body_statements: list[str] = field(default_factory=list)
+    calls: list[CallInfo] = field(default_factory=list)
 
 
 @dataclass
@@ -34,6 +48,7 @@ class ClassInfo:
     fields: list[FieldInfo] = field(default_factory=list)
     methods: list[MethodInfo] = field(default_factory=list)
     enum_constants: list[str] = field(default_factory=list)
+    package: str = ""
 
 
 class JavaParser:
@@ -52,6 +67,10 @@ class JavaParser:
         for _, node in tree.filter(javalang.tree.EnumDeclaration):
             classes.append(self._parse_enum(node))
 
+        if tree.package:
+            for info in classes:
+                info.package = tree.package.name
+
         return classes
 
     def _parse_class(self, node: javalang.tree.ClassDeclaration) -> ClassInfo:
@@ -100,6 +119,11 @@ class JavaParser:
                 ))
 
     def _extract_methods(self, node, info: ClassInfo):
+        field_types = {
+            declarator.name: _simple_type(field_decl.type)
+            for field_decl in (getattr(node, "fields", None) or [])
+            for declarator in field_decl.declarators
+        }
         for method in (node.methods or []):
             params = []
             for param in (method.parameters or []):
@@ -114,8 +138,18 @@ class JavaParser:
                 parameters=params,
                 modifiers=list(method.modifiers) if method.modifiers else [],
                 body_statements=body_stmts,
+                calls=self._extract_calls(method, info, field_types) if method.body else [],
             ))
 
+    def _extract_calls(self, method, info: ClassInfo, field_types: dict[str, str]) -> list[CallInfo]:
+        """Method invocations in evaluation order (arguments before the
+        call they are passed to), with receivers resolved to the declared
+        type of the field, parameter or local they go through."""
+        collector = _CallCollector(info, field_types)
+        collector.declare_parameters(method.parameters)
+        collector.visit(method.body)
+        return collector.calls
+
     def _resolve_type(self, type_node) -> str:
         if type_node is None:
             return "void"
@@ -232,3 +266,144 @@ class JavaParser:
         if isinstance(expr, javalang.tree.ClassCreator):
             return f"new {expr.type.name}()"
         return type(expr).__name__
+
+
+def _simple_type(type_node) -> str:
+    """Unqualified name of a type node: ``java.util.List<Item>`` -> ``List``."""
+    while getattr(type_node, "sub_type", None) is not None:
+        type_node = type_node.sub_type
+    return type_node.name
+
+
+# Nodes that open a scope for the variables declared inside them.
+_SCOPES = (
+    javalang.tree.BlockStatement,
+    javalang.tree.ForStatement,
+    javalang.tree.TryStatement,
+    javalang.tree.CatchClause,
+    javalang.tree.SwitchStatement,
+    javalang.tree.LambdaExpression,
+    javalang.tree.MethodDeclaration,
+)
+
+
+class _CallCollector:
+    """Walks a method body in evaluation order, collecting ``CallInfo``.
+
+    Variables are tracked per block, so a local only shadows a field (or
+    an outer local) until its block ends; ``this.<name>`` always refers to
+    a field.  Variables whose type is not written out (lambda parameters,
+    ``var`` not initialized by ``new``) are known to exist but have no type.
+    """
+
+    def __init__(self, info: ClassInfo, field_types: dict[str, str]) -> None:
+        self.info = info
+        self.field_types = field_types
+        self.scopes: list[dict[str, str | None]] = [dict(field_types), {}]
+        self.calls: list[CallInfo] = []
+
+    def declare_parameters(self, parameters) -> None:
+        for param in parameters or []:
+            if isinstance(param, javalang.tree.FormalParameter):
+                self.scopes[-1][param.name] = _simple_type(param.type)
+            elif isinstance(param, javalang.tree.InferredFormalParameter):
+                self.scopes[-1][param.name] = None
+            elif isinstance(param, javalang.tree.MemberReference):
+                # A lone untyped lambda parameter: ``x -> ...``.
+                self.scopes[-1][param.member] = None
+
+    def visit(self, node) -> None:
+        if isinstance(node, (list, tuple)):
+            for item in node:
+                self.visit(item)
+            return
+        if not isinstance(node, javalang.ast.Node):
+            return
+
+        scoped = isinstance(node, _SCOPES)
+        if scoped:
+            self.scopes.append({})
+        if isinstance(node, javalang.tree.VariableDeclaration):
+            for declarator in node.declarators:
+                self.visit(declarator.initializer)
+                self.scopes[-1][declarator.name] = self._declared_type(node.type, declarator.initializer)
+        elif isinstance(node, javalang.tree.EnhancedForControl):
+            self.visit(node.iterable)
+            self.visit(node.var)
+        elif isinstance(node, javalang.tree.TryResource):
+            self.visit(node.value)
+            self.scopes[-1][node.name] = _simple_type(node.type)
+        elif isinstance(node, javalang.tree.CatchClauseParameter):
+            self.scopes[-1][node.name] = node.types[0].rsplit(".", 1)[-1]
+        elif isinstance(node, (javalang.tree.LambdaExpression, javalang.tree.MethodDeclaration)):
+            self.declare_parameters(node.parameters)
+            self.visit(node.body)
+        elif isinstance(node, javalang.tree.Primary):
+            self._visit_primary(node)
+        else:
+            for child in node.children:
+                self.visit(child)
+        if scoped:
+            self.scopes.pop()
+
+    def _visit_primary(self, node) -> None:
+        info = self.info
+        receiver = None
+        from_this = False
+        if isinstance(node, javalang.tree.MethodInvocation):
+            target = self._receiver_type(node.qualifier)
+            self.visit(node.arguments)
+            self.calls.append(CallInfo(node.member, target, len(node.arguments or [])))
+            target, receiver = None, len(self.calls) - 1
+        elif isinstance(node, javalang.tree.SuperMethodInvocation):
+            self.visit(node.arguments)
+            self.calls.append(CallInfo(node.member, info.extends, len(node.arguments or [])))
+            target, receiver = None, len(self.calls) - 1
+        elif isinstance(node, javalang.tree.This):
+            target, from_this = info.name, True
+        elif isinstance(node, javalang.tree.ClassCreator):
+            self.visit(node.arguments)
+            self.visit(node.body)
+            target = _simple_type(node.type)
+        else:
+            for attr, child in zip(node.attrs, node.children):
+                if attr != "selectors":
+                    self.visit(child)
+            target = None
+
+        # Follow selectors (this.repo.save(), new A().run(), find().touch()).
+        for selector in node.selectors or []:
+            if isinstance(selector, javalang.tree.MethodInvocation):
+                self.visit(selector.arguments)
+                self.calls.append(CallInfo(
+                    selector.member, target, len(selector.arguments or []),
+                    receiver if target is None else None,
+                ))
+                target, receiver = None, len(self.calls) - 1
+            else:
+                if isinstance(selector, javalang.tree.MemberReference) and from_this:
+                    target = self.field_types.get(selector.member)
+                else:
+                    self.visit(selector)
+                    target = None
+                receiver = None
+            from_this = False
+
+    def _receiver_type(self, qualifier: str | None) -> str | None:
+        if not qualifier:
+            return self.info.name
+        head = qualifier.split(".")[0]
+        for scope in reversed(self.scopes):
+            if head in scope:
+                return scope[head] if head == qualifier else None
+        # Not a variable: a static call through a (possibly qualified) type.
+        last = qualifier.rsplit(".", 1)[-1]
+        return last if last[:1].isupper() else None
+
+    @staticmethod
+    def _declared_type(type_node, initializer) -> str | None:
+        if type_node.name != "var":
+            return _simple_type(type_node)
+        if isinstance(initializer, javalang.tree.ClassCreator):
+            return _simple_type(initializer.type)
+        return None
@@ -0,0 +1,73 @@
+"""Compact, versioned JSON form of the parsed class model.
+
+Persisting this alongside a conversion lets diagrams be regenerated with
+any generator without running javalang again.  Empty fields are omitted
+to keep the payload small; :func:`loads` restores the dataclass defaults.
+"""
+
+import json
+from dataclasses import asdict
+
+from .java_parser import CallInfo, ClassInfo, FieldInfo, MethodInfo, ParameterInfo
+
+MODEL_VERSION = 3
+
+
+class ModelVersionError(ValueError):
+    """Raised when a serialized model was written by an unknown version."""
+
+
+def dumps(classes: list[ClassInfo]) -> str:
+    """Serialize parsed classes to a compact JSON string."""
+    data = {"v": MODEL_VERSION, "classes": [_prune(asdict(cls)) for cls in classes]}
+    return json.dumps(data, separators=(",", ":"))
+
+
+def loads(data: str) -> list[ClassInfo]:
+    """Inverse of :func:`dumps`."""
+    payload = json.loads(data)
+    if payload.get("v") != MODEL_VERSION:
+        raise ModelVersionError(f"Unsupported model version: {payload.get('v')}")
+    return [_class_from_dict(cls) for cls in payload["classes"]]
+
+
+def dumps_class(cls: ClassInfo) -> str:
+    """Serialize one class (no version envelope; for stores that track it)."""
+    return json.dumps(_prune(asdict(cls)), separators=(",", ":"))
+
+
+def loads_class(data: str) -> ClassInfo:
+    """Inverse of :func:`dumps_class`."""
+    return _class_from_dict(json.loads(data))
+
+
+def _prune(value):
+    if isinstance(value, dict):
+        return {k: _prune(v) for k, v in value.items() if v not in (None, "", [])}
+    if isinstance(value, list):
+        return [_prune(v) for v in value]
+    return value
+
+
+def _class_from_dict(data: dict) -> ClassInfo:
+    return ClassInfo(
+        name=data["name"],
+        kind=data["kind"],
+        modifiers=data.get("modifiers", []),
+        extends=data.get("extends"),
+        implements=data.get("implements", []),
+        fields=[FieldInfo(**f) for f in data.get("fields", [])],
+        methods=[
+            MethodInfo(
+                name=m["name"],
+                return_type=m["return_type"],
+                parameters=[ParameterInfo(**p) for p in m.get("parameters", [])],
+                modifiers=m.get("modifiers", []),
+                body_statements=m.get("body_statements", []),
+                calls=[CallInfo(**c) for c in m.get("calls", [])],
+            )
+            for m in data.get("methods", [])
+        ],
+        enum_constants=data.get("enum_constants", []),
+        package=data.get("package", ""),
+    )
@@ -0,0 +1,264 @@
+"""Structural diff between two parsed class models.
+
+Classes are matched by qualified name.  Every class is reduced to a hash
+of its declaration and one hash per member signature, so unchanged
+classes are recognised from a single comparison and changed ones from a
+comparison per member; method bodies are not compared.
+"""
+
+import hashlib
+from collections.abc import Iterable, Iterator
+
+from .class_diagram import ClassDiagramGenerator
+from .java_parser import ClassInfo, FieldInfo, MethodInfo
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def qualified_name(cls: ClassInfo) -> str:
+    return f"{cls.package}.{cls.name}" if cls.package else cls.name
+
+
+def field_signature(field: FieldInfo) -> str:
+    return " ".join([*field.modifiers, field.type, field.name])
+
+
+def method_signature(method: MethodInfo) -> str:
+    params = ", ".join(f"{p.type} {p.name}" for p in method.parameters)
+    return " ".join([*method.modifiers, method.return_type, f"{method.name}({params})"])
+
+
+def declaration_signature(cls: ClassInfo) -> str:
+    parts = [*cls.modifiers, cls.kind, cls.name]
+    if cls.extends:
+        parts += ["extends", cls.extends]
+    if cls.implements:
+        parts += ["implements", ", ".join(cls.implements)]
+    if cls.enum_constants:
+        parts.append("{" + ", ".join(cls.enum_constants) + "}")
+    return " ".join(parts)
+
+
+class ClassSignature:
+    """Hashed signatures of one class.
+
+    Members are keyed by what identifies them in Java: fields by name and
+    methods by name and parameter types, so a method whose return type or
+    modifiers change is reported as changed rather than replaced.
+    """
+
+    def __init__(self, cls: ClassInfo) -> None:
+        self.cls = cls
+        self.declaration = declaration_signature(cls)
+        self.fields = {f.name: field_signature(f) for f in cls.fields}
+        self.methods = {
+            f"{m.name}({', '.join(p.type for p in m.parameters)})": method_signature(m)
+            for m in cls.methods
+        }
+        self.member_hashes = {
+            key: _digest(signature)
+            for members in (self.fields, self.methods)
+            for key, signature in members.items()
+        }
+        self.hash = _digest("\0".join([
+            self.declaration,
+            *sorted(f"f:{key}={h}" for key, h in self.member_hashes.items() if key in self.fields),
+            *sorted(f"m:{key}={h}" for key, h in self.member_hashes.items() if key in self.methods),
+        ]))
+
+
+def relationships(classes: Iterable[ClassInfo]) -> set[tuple[str, str, str, str]]:
+    """(source, type, target, label) of the relationships the class diagram
+    draws between classes of the model."""
+    classes = list(classes)
+    names = {cls.name for cls in classes}
+    found = set()
+    for cls in classes:
+        if cls.extends in names:
+            found.add((cls.name, "extends", cls.extends, ""))
+        for iface in cls.implements:
+            if iface in names:
+                found.add((cls.name, "implements", iface, ""))
+        for field in cls.fields:
+            base_type = field.type.split("<")[0]
+            if base_type in names and base_type != cls.name:
+                found.add((cls.name, "association", base_type, field.name))
+    return found
+
+
+def diff_models(old: list[ClassInfo], new: list[ClassInfo]) -> dict:
+    """Describe how ``new`` differs from ``old``.
+
+    Returns a JSON-ready dict with ``summary``, ``classes`` (added,
+    removed and changed classes, with member-level changes for the
+    latter) and ``relationships`` (added and removed).
+    """
+    before = {qualified_name(cls): ClassSignature(cls) for cls in old}
+    after = {qualified_name(cls): ClassSignature(cls) for cls in new}
+
+    added = sorted(after.keys() - before.keys())
+    removed = sorted(before.keys() - after.keys())
+    changed = [
+        _class_changes(name, before[name], after[name])
+        for name in sorted(before.keys() & after.keys())
+        if before[name].hash != after[name].hash
+    ]
+
+    old_relations = relationships(old)
+    new_relations = relationships(new)
+    relations_added = sorted(new_relations - old_relations)
+    relations_removed = sorted(old_relations - new_relations)
+
+    return {
+        "summary": {
+            "classes_added": len(added),
+            "classes_removed": len(removed),
+            "classes_changed": len(changed),
+            "classes_unchanged": len(before.keys() & after.keys()) - len(changed),
+            "relationships_added": len(relations_added),
+            "relationships_removed": len(relations_removed),
+        },
+        "classes": {
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+        },
+        "relationships": {
+            "added": [_relation(r) for r in relations_added],
+            "removed": [_relation(r) for r in relations_removed],
+        },
+    }
+
+
+def _class_changes(name: str, before: ClassSignature, after: ClassSignature) -> dict:
+    changes = {"name": name}
+    if before.declaration != after.declaration:
+        changes["declaration"] = {"before": before.declaration, "after": after.declaration}
+    for kind in ("fields", "methods"):
+        members = _member_changes(
+            getattr(before, kind), getattr(after, kind), before.member_hashes, after.member_hashes,
+        )
+        if members:
+            changes[kind] = members
+    return changes
+
+
+def _member_changes(before: dict, after: dict, before_hashes: dict, after_hashes: dict) -> dict:
+    changes = {}
+    added = [after[key] for key in sorted(after.keys() - before.keys())]
+    removed = [before[key] for key in sorted(before.keys() - after.keys())]
+    changed = [
+        {"before": before[key], "after": after[key]}
+        for key in sorted(before.keys() & after.keys())
+        if before_hashes[key] != after_hashes[key]
+    ]
+    if added:
+        changes["added"] = added
+    if removed:
+        changes["removed"] = removed
+    if changed:
+        changes["changed"] = changed
+    return changes
+
+
+def _relation(relation: tuple[str, str, str, str]) -> dict:
+    source, kind, target, label = relation
+    data = {"source": source, "type": kind, "target": target}
+    if label:
+        data["label"] = label
+    return data
+
+
+class DiffClassDiagramGenerator(ClassDiagramGenerator):
+    """Class diagram of the newer model with the changes from ``old``
+    highlighted: added classes and members in green, removed ones in red
+    (drawn from the old model), changed classes in yellow.
+    """
+
+    ADDED = "#palegreen"
+    REMOVED = "#pink"
+    CHANGED = "#lightyellow"
+
+    def __init__(self, old: list[ClassInfo]) -> None:
+        super().__init__(page_size=None)
+        self.old = old
+
+    def _body(self, classes: Iterable[ClassInfo]) -> Iterator[str]:
+        classes = list(classes)
+        before = {qualified_name(cls): ClassSignature(cls) for cls in self.old}
+        after = {qualified_name(cls): ClassSignature(cls) for cls in classes}
+
+        for name, signature in after.items():
+            old_signature = before.get(name)
+            if old_signature is None:
+                yield from self._render_highlighted(signature.cls, self.ADDED)
+            elif old_signature.hash != signature.hash:
+                yield from self._render_changed(old_signature, signature)
+            else:
+                yield from self._render_class(signature.cls)
+            yield ""
+        for name, signature in before.items():
+            if name not in after:
+                yield from self._render_highlighted(signature.cls, self.REMOVED, removed=True)
+                yield ""
+
+        old_relations = relationships(self.old)
+        new_relations = relationships(classes)
+        for relation in sorted(new_relations | old_relations):
+            color = None
+            if relation not in old_relations:
+                color = "#green"
+            elif relation not in new_relations:
+                color = "#red,dashed"
+            yield self._relation_line(relation, color)
+
+    def _render_highlighted(self, cls: ClassInfo, color: str, removed: bool = False) -> list[str]:
+        lines = self._render_class(cls)
+        stereotype = " <<removed>>" if removed else ""
+        lines[0] = f"{self._keyword(cls)} {cls.name}{stereotype} {color} {{"
+        return lines
+
+    def _render_changed(self, before: ClassSignature, after: ClassSignature) -> list[str]:
+        """The new class with added members in green, changed ones in
+        orange and removed ones (from the old class) struck through in red."""
+        cls = after.cls
+        lines = [f"{self._keyword(cls)} {cls.name} {self.CHANGED} {{"]
+        if cls.kind == "enum":
+            lines.extend(f"  {const}" for const in cls.enum_constants)
+            if cls.enum_constants and (cls.fields or cls.methods):
+                lines.append("  --")
+
+        members = [
+            *((key, self._field_line(field)) for key, field in zip(after.fields, cls.fields)),
+            *((key, self._method_line(method)) for key, method in zip(after.methods, cls.methods)),
+        ]
+        for index, (key, line) in enumerate(members):
+            if index == len(cls.fields) and cls.fields and cls.methods:
+                lines.append("  --")
+            if key not in before.member_hashes:
+                line = f"<color:green>{line}</color>"
+            elif before.member_hashes[key] != after.member_hashes[key]:
+                line = f"<color:darkorange>{line}</color>"
+            lines.append(f"  {line}")
+
+        old_cls = before.cls
+        for key, field in zip(before.fields, old_cls.fields):
+            if key not in after.fields:
+                lines.append(f"  <color:red>--{self._field_line(field)}--</color>")
+        for key, method in zip(before.methods, old_cls.methods):
+            if key not in after.methods:
+                lines.append(f"  <color:red>--{self._method_line(method)}--</color>")
+        lines.append("}")
+        return lines
+
+    @staticmethod
+    def _relation_line(relation: tuple[str, str, str, str], color: str | None) -> str:
+        source, kind, target, label = relation
+        style = f"[{color}]" if color else ""
+        if kind == "extends":
+            return f"{target} <|-{style}- {source}"
+        if kind == "implements":
+            return f"{target} <|.{style}. {source}"
+        return f"{source} -{style}-> {target} : {label}"
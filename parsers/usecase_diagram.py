@@ -1,3 +1,5 @@
+from collections.abc import Iterable, Iterator
+
 from .java_parser import ClassInfo
 from .base_generator import DiagramGenerator
 
@@ -21,28 +23,33 @@ class UseCaseDiagramGenerator(DiagramGenerator):
     def _directives(self) -> list[str]:
         return ["left to right direction"]
 
-    def _body(self, classes: list[ClassInfo]) -> list[str]:
-        systems, actors = self._classify(classes)
-        lines: list[str] = []
+    def _body(self, classes: Iterable[ClassInfo]) -> Iterator[str]:
+        fallback = self._fallback_system(classes)
+
+        def systems():
+            for index, cls in enumerate(classes):
+                if self._is_system(index, cls, fallback):
+                    yield cls
 
         actor_names = set()
-        for cls in actors:
-            lines.append(f'actor "{cls.name}" as {cls.name}')
-            actor_names.add(cls.name)
+        for index, cls in enumerate(classes):
+            if not self._is_system(index, cls, fallback):
+                yield f'actor "{cls.name}" as {cls.name}'
+                actor_names.add(cls.name)
 
-        lines.append("")
+        yield ""
 
-        for sys_cls in systems:
-            lines.append(f'rectangle "{sys_cls.name}" {{')
+        for sys_cls in systems():
+            yield f'rectangle "{sys_cls.name}" {{'
             for method in sys_cls.methods:
                 if "public" in method.modifiers or not method.modifiers:
                     uc_id = f"{sys_cls.name}_{method.name}"
                     label = self._humanize(method.name)
-                    lines.append(f'  usecase "{label}" as {uc_id}')
-            lines.append("}")
-            lines.append("")
+                    yield f'  usecase "{label}" as {uc_id}'
+            yield "}"
+            yield ""
 
-        for sys_cls in systems:
+        for sys_cls in systems():
             for method in sys_cls.methods:
                 if "public" not in method.modifiers and method.modifiers:
                     continue
@@ -51,31 +58,28 @@ class UseCaseDiagramGenerator(DiagramGenerator):
                 for param in method.parameters:
                     base_type = param.type.split("<")[0]
                     if base_type in actor_names:
-                        lines.append(f"{base_type} --> {uc_id}")
+                        yield f"{base_type} --> {uc_id}"
                         linked = True
                 if not linked and actor_names:
                     first_actor = next(iter(actor_names))
-                    lines.append(f"{first_actor} --> {uc_id}")
-
-        return lines
-
-    def _classify(self, classes: list[ClassInfo]):
-        systems = []
-        actors = []
-        for cls in classes:
-            if any(cls.name.endswith(s) for s in self.SYSTEM_SUFFIXES):
-                systems.append(cls)
-            else:
-                actors.append(cls)
-
-        if not systems and classes:
-            best = max(classes, key=lambda c: sum(
-                1 for m in c.methods if "public" in m.modifiers or not m.modifiers
-            ))
-            systems = [best]
-            actors = [c for c in classes if c is not best]
-
-        return systems, actors
+                    yield f"{first_actor} --> {uc_id}"
+
+    def _is_system(self, index: int, cls: ClassInfo, fallback: int | None) -> bool:
+        if fallback is not None:
+            return index == fallback
+        return cls.name.endswith(self.SYSTEM_SUFFIXES)
+
+    def _fallback_system(self, classes: Iterable[ClassInfo]) -> int | None:
+        """Index of the class with most public methods if no class has a
+        system suffix, else None."""
+        best, best_count = None, -1
+        for index, cls in enumerate(classes):
+            if cls.name.endswith(self.SYSTEM_SUFFIXES):
+                return None
+            count = sum(1 for m in cls.methods if "public" in m.modifiers or not m.modifiers)
+            if count > best_count:
+                best, best_count = index, count
+        return best
 
     def _humanize(self, name: str) -> str:
         """Convert camelCase to human-readable string."""
@@ -1 +1,3 @@
 from .conversion_service import ConversionService
+from .model_store import ModelStore
+from .parse_cache import ParseCache
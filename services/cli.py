@@ -0,0 +1,274 @@
+"""Convert a local Java source tree into PlantUML files.
+
+Runs the same parser and generators as the web API but without Django,
+HTTP or the database::
+
+    python -m services.cli path/to/src -o uml/
+    python -m services.cli project.tar.gz -o uml/ --type class --jobs 8
+    python -m services.cli src/ --sequence-entry OrderService.place
+
+Files are parsed in a process pool and each parsed file is kept in an
+on-disk cache keyed by its content, so re-runs only parse what changed.
+One ``<type>.puml`` is written per diagram type, or ``<type>-<n>.puml``
+pages for diagrams split into pages.
+
+With ``--watch`` the command keeps polling a source directory and rewrites
+only the outputs affected by each saved file (see ``services.watch``).
+
+With ``--low-memory`` files are read and parsed a few at a time, parsed
+classes are spilled to an on-disk ``services.model_store.ModelStore`` and
+each diagram is streamed from it straight to its file, so peak memory
+does not grow with the size of the project.  Diagrams are not split into
+pages in this mode.  The sequence diagram (only written when asked for)
+is the exception: its call graph indexes every method of the project.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from parsers.class_diagram import PARTITIONS
+from parsers.generator_factory import DiagramGeneratorFactory
+from .conversion_service import ConversionService
+from .model_store import ModelStore
+from .output import write_diagrams, write_lines
+from .parse_cache import ParseCache
+from .sources import iter_path, read_path
+from .watch import SourceWatcher
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "service-converter",
+)
+
+_service: ConversionService | None = None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m services.cli",
+        description="Convert Java sources (directory, .java file, zip or tar archive) to PlantUML.",
+    )
+    parser.add_argument("source", help="Directory, .java file, or .zip/.tar/.tar.gz archive")
+    parser.add_argument("-o", "--output", default="uml", help="Output directory (default: uml)")
+    parser.add_argument(
+        "--type", action="append", dest="types",
+        help="Diagram type to write; repeat for several (default: all but sequence)",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Parser processes")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"Parse cache (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the parse cache")
+    parser.add_argument(
+        "--semantic-cache-keys", action="store_true",
+        help="Key the parse cache on sources with comments and formatting normalized away",
+    )
+    parser.add_argument(
+        "--class-page-size", type=int,
+        help="Split class diagrams into pages of this many classes (default: never split)",
+    )
+    parser.add_argument("--class-partition", choices=PARTITIONS, help="How class diagram pages are grouped")
+    parser.add_argument("--flow-classes", help="Comma-separated classes to draw flow diagrams for")
+    parser.add_argument("--flow-methods", help="Method name pattern of the flow diagram, e.g. get*")
+    parser.add_argument(
+        "--flow-rank", action="store_true", help="Draw the most complex methods first in the flow diagram",
+    )
+    parser.add_argument("--flow-max-methods", type=int, help="Most methods drawn in the flow diagram")
+    parser.add_argument("--flow-max-statements", type=int, help="Most statements drawn per flow method")
+    parser.add_argument("--flow-max-lines", type=int, help="Line budget of the flow diagram")
+    parser.add_argument("--sequence-entry", help="Entry method of the sequence diagram, as Class.method")
+    parser.add_argument("--sequence-depth", type=int, help="How many call levels the sequence diagram follows")
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Keep running and regenerate whenever a .java file in the source directory changes",
+    )
+    parser.add_argument("--interval", type=float, default=0.25, help="Watch poll interval in seconds")
+    parser.add_argument(
+        "--low-memory", action="store_true",
+        help=(
+            "Keep parsed classes on disk and stream diagrams to their files (no page splitting; "
+            "the sequence diagram still holds every method in memory)"
+        ),
+    )
+    parser.add_argument("--store", help="Model store file for --low-memory (default: a temporary file)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    # The sequence diagram is only drawn when asked for, by --type or
+    # one of its options.
+    types = args.types or DiagramGeneratorFactory.defaults()
+    if not args.types and (args.sequence_entry or args.sequence_depth):
+        types.append("sequence")
+    unknown = set(types) - set(DiagramGeneratorFactory.available())
+    if unknown:
+        print(f"Unknown diagram type(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    class_options = {}
+    if args.class_page_size is not None:
+        class_options["page_size"] = args.class_page_size
+    if args.class_partition:
+        class_options["partition"] = args.class_partition
+    flow_options = {}
+    if args.flow_classes:
+        flow_options["class_names"] = sorted(
+            name.strip() for name in args.flow_classes.split(",") if name.strip()
+        )
+    if args.flow_methods:
+        flow_options["method_pattern"] = args.flow_methods
+    if args.flow_rank:
+        flow_options["rank_by_complexity"] = True
+    for arg, option in (
+        (args.flow_max_methods, "max_methods"),
+        (args.flow_max_statements, "max_statements"),
+        (args.flow_max_lines, "max_lines"),
+    ):
+        if arg is not None:
+            flow_options[option] = arg
+    sequence_options = {}
+    if args.sequence_entry:
+        sequence_options["entry"] = args.sequence_entry
+    if args.sequence_depth:
+        sequence_options["max_depth"] = args.sequence_depth
+    generator_options = {}
+    if class_options:
+        generator_options["class"] = class_options
+    if flow_options:
+        generator_options["flow"] = flow_options
+    if sequence_options:
+        generator_options["sequence"] = sequence_options
+    generator_options = generator_options or None
+    parse_cache = None if args.no_cache else ParseCache(args.cache_dir, args.semantic_cache_keys)
+
+    if args.watch:
+        if not os.path.isdir(args.source):
+            print("--watch needs a source directory", file=sys.stderr)
+            return 2
+        service = ConversionService(parse_cache)
+        watcher = SourceWatcher(args.source, args.output, service, types, generator_options)
+        print(f"Watching {args.source} -> {args.output} (Ctrl+C to stop)")
+        try:
+            watcher.run(args.interval)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.low_memory:
+        if args.class_page_size:
+            print("--class-page-size cannot be used with --low-memory", file=sys.stderr)
+            return 2
+        return _convert_low_memory(args, types, generator_options, parse_cache)
+
+    started = time.perf_counter()
+    try:
+        sources = read_path(args.source)
+    except (OSError, ValueError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    if not sources:
+        print(f"No .java files found in {args.source}", file=sys.stderr)
+        return 1
+
+    classes, errors = parse_sources(sources, parse_cache, args.jobs)
+    for error in errors:
+        print(error, file=sys.stderr)
+
+    rendered = ConversionService().render(classes, generator_options, types)
+
+    written = write_diagrams(rendered, types, args.output)
+    print(
+        f"{len(classes)} classes from {len(sources)} files -> {len(written)} files "
+        f"in {args.output} ({time.perf_counter() - started:.2f}s, {len(errors)} errors)"
+    )
+    return 1 if errors and not classes else 0
+
+
+def _convert_low_memory(args, types, generator_options, parse_cache) -> int:
+    started = time.perf_counter()
+    try:
+        sources = iter_path(args.source)
+    except (OSError, ValueError) as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+    files = 0
+    errors = 0
+    with ModelStore(args.store) as store:
+        for filename, file_classes, error in parse_stream(sources, parse_cache, args.jobs):
+            files += 1
+            store.add(file_classes)
+            if error:
+                errors += 1
+                print(error, file=sys.stderr)
+        if not files:
+            print(f"No .java files found in {args.source}", file=sys.stderr)
+            return 1
+
+        written = []
+        if len(store):
+            for name, lines in ConversionService().iter_lines(store, generator_options, types):
+                written.append(write_lines(name, lines, args.output))
+        print(
+            f"{len(store)} classes from {files} files -> {len(written)} files "
+            f"in {args.output} ({time.perf_counter() - started:.2f}s, {errors} errors)"
+        )
+        return 1 if errors and not len(store) else 0
+
+
+def parse_stream(sources, parse_cache, jobs):
+    """Parse an iterable of (filename, code) pairs lazily, in input order.
+
+    Yields (filename, classes, error).  With ``jobs`` > 1 at most a few
+    files per process are read ahead, so memory stays bounded.
+    """
+    if jobs <= 1:
+        for filename, code in sources:
+            yield (filename, *_parse_one((filename, code, parse_cache)))
+        return
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for filename, code in sources:
+            pending.append((filename, pool.submit(_parse_one, (filename, code, parse_cache))))
+            if len(pending) >= jobs * 4:
+                filename, future = pending.popleft()
+                yield (filename, *future.result())
+        while pending:
+            filename, future = pending.popleft()
+            yield (filename, *future.result())
+
+
+def parse_sources(sources, parse_cache, jobs):
+    """Parse (filename, code) pairs, in a process pool when ``jobs`` > 1."""
+    tasks = [(filename, code, parse_cache) for filename, code in sources]
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_parse_one, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+    else:
+        results = [_parse_one(task) for task in tasks]
+
+    classes, errors = [], []
+    for file_classes, error in results:
+        classes.extend(file_classes)
+        if error:
+            errors.append(error)
+    return classes, errors
+
+
+def _parse_one(task):
+    global _service
+    filename, code, parse_cache = task
+    if _service is None:
+        _service = ConversionService(parse_cache)
+    try:
+        return _service.parse_file(code), None
+    except Exception as exc:
+        return [], f"{filename}: {exc}"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
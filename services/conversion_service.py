@@ -1,8 +1,42 @@
+import asyncio
 import hashlib
+import inspect
+import json
+import os
 from collections import OrderedDict
+from collections.abc import Iterable, Iterator
 
-from parsers.java_parser import JavaParser
+import parsers
+from parsers import model_codec
+from parsers.java_parser import ClassInfo, JavaParser
 from parsers.generator_factory import DiagramGeneratorFactory
+from .normalize import normalize
+from .parse_cache import ParseCache
+from .tracing import tracer
+
+
+def _generator_version() -> str:
+    """Digest of the code a conversion result depends on: the ``parsers``
+    package (parser, model codec and generators), source normalization
+    and this module.
+
+    Any deploy that can change conversion output changes it, without
+    anyone having to remember a version bump.
+    """
+    package = os.path.dirname(parsers.__file__)
+    paths = sorted(
+        os.path.join(package, name) for name in os.listdir(package) if name.endswith(".py")
+    )
+    digest = hashlib.sha256()
+    for path in [*paths, inspect.getfile(normalize), __file__]:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+# Part of every conversion key (and so of every /convert/ ETag) and of
+# cache snapshots.
+GENERATOR_VERSION = _generator_version()
 
 
 class ConversionService:
@@ -11,52 +45,372 @@ class ConversionService:
     Provides a single entry point for converting Java source code into
     multiple UML diagram formats.  Results are cached by content hash
     (LRU eviction, max 128 entries).
+
+    With ``semantic_keys`` the hash covers the normalized sources (see
+    ``services.normalize``) instead of the raw text, so edits to comments
+    or formatting are answered from the cache.  Such hits carry the
+    request's own ``sources``; parse error messages are those of the
+    cached conversion.
     """
 
     _MAX_CACHE = 128
+    _WARM_UP_SOURCE = """
+        public class WarmUp extends Base implements Runnable {
+            private java.util.List<String> items;
+            public void run() {
+                for (String item : items) {
+                    if (item == null) { throw new IllegalStateException(); }
+                }
+            }
+        }
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, parse_cache: ParseCache | None = None, semantic_keys: bool = False) -> None:
+        self.semantic_keys = semantic_keys
         self._parser = JavaParser()
         self._generators = DiagramGeneratorFactory.create_all()
         self._cache: OrderedDict[str, dict] = OrderedDict()
+        self._parse_cache = parse_cache
 
-    def convert(self, sources: list[tuple[str, str]]) -> dict:
+    def convert(
+        self,
+        sources: list[tuple[str, str]],
+        generator_options: dict[str, dict] | None = None,
+        cache_key: str | None = None,
+    ) -> dict:
         """Convert a list of (filename, java_code) pairs into UML diagrams.
 
-        Returns a dict with keys: diagrams, errors, sources.
+        Diagrams too large for a single page (see
+        ``DiagramGenerator.generate_pages``) are returned split into
+        self-contained pages under ``pages``, keyed by diagram type,
+        instead of under ``diagrams``.  The class diagram is only split
+        when a ``page_size`` is passed for it.
+
+        ``generator_options`` maps a diagram type to constructor options
+        for its generator (e.g. the flow diagram budgets); those diagrams
+        are rendered by a fresh generator configured accordingly.
+
+        ``cache_key`` is :meth:`key_for` of the same arguments, for callers
+        that already computed it (e.g. as an ETag).
+
+        Returns a dict with keys: diagrams, errors, sources, model (the
+        parsed classes serialized by ``parsers.model_codec``, for
+        :meth:`regenerate`) and, when a diagram was split, pages.
         """
-        cache_key = self._hash(sources)
-        if cache_key in self._cache:
-            self._cache.move_to_end(cache_key)
-            return self._cache[cache_key]
+        with tracer.span("conversion.convert") as span:
+            cache_key = cache_key or self._hash(sources, generator_options)
+            result = self._lookup_for(cache_key, sources)
+            if span.recording:
+                span.set_attributes(_source_attributes(sources, result))
+            if result is None:
+                result = self.build(sources, generator_options)
+                self._remember(cache_key, result)
+            return result
+
+    async def aconvert(
+        self,
+        sources: list[tuple[str, str]],
+        executor=None,
+        generator_options: dict[str, dict] | None = None,
+        cache_key: str | None = None,
+    ) -> dict:
+        """Async variant of :meth:`convert` for ASGI views.
+
+        Cache hits are answered on the event loop; misses are parsed and
+        rendered in ``executor`` (the loop's default executor if None) so
+        the CPU-bound work never blocks other requests.
+        """
+        with tracer.span("conversion.convert") as span:
+            cache_key = cache_key or self._hash(sources, generator_options)
+            result = self._lookup_for(cache_key, sources)
+            if span.recording:
+                span.set_attributes(_source_attributes(sources, result))
+            if result is None:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    executor, _build_in_worker, sources, generator_options, tracer.inject(),
+                )
+                self._remember(cache_key, result)
+            return result
 
+    def build(
+        self,
+        sources: list[tuple[str, str]],
+        generator_options: dict[str, dict] | None = None,
+    ) -> dict:
+        """Uncached :meth:`convert`, for batch jobs that should not fill the cache.
+
+        Files with identical contents (vendored or copied code) are parsed
+        once; every copy still contributes its classes and keeps its place
+        in ``sources``.
+        """
         all_classes = []
         errors: list[str] = []
+        # Contents -> (classes, error) of the first file that had them.
+        parsed: dict[str, tuple[list[ClassInfo], str | None]] = {}
 
         for filename, code in sources:
-            try:
-                classes = self._parser.parse(code)
+            with tracer.span("java_parser.parse") as span:
+                reused = code in parsed
+                if not reused:
+                    try:
+                        parsed[code] = (self.parse_file(code), None)
+                    except Exception as exc:
+                        parsed[code] = ([], str(exc))
+                classes, error = parsed[code]
                 all_classes.extend(classes)
-            except Exception as exc:
-                errors.append(f"{filename}: {exc}")
-
-        diagrams: dict[str, str] = {}
-        for name, gen in self._generators.items():
-            diagrams[name] = gen.generate(all_classes) if all_classes else ""
+                if error is not None:
+                    errors.append(f"{filename}: {error}")
+                    span.set_attribute("parse.error", error[:500])
+                if span.recording:
+                    span.set_attributes({
+                        "file.name": filename,
+                        "file.size": len(code.encode()),
+                        "class.count": len(classes),
+                        "parse.reused": reused,
+                    })
 
+        rendered = self.render(all_classes, generator_options)
+        with tracer.span("model_codec.dumps", {"class.count": len(all_classes)}):
+            model = model_codec.dumps(all_classes)
         result = {
-            "diagrams": diagrams,
+            "diagrams": rendered["diagrams"],
             "errors": errors,
             "sources": [{"filename": fn, "code": code} for fn, code in sources],
+            "model": model,
         }
+        if "pages" in rendered:
+            result["pages"] = rendered["pages"]
+        return result
+
+    def parse_file(self, code: str) -> list[ClassInfo]:
+        """Parse one Java file, going through the on-disk parse cache if set."""
+        if self._parse_cache is None:
+            return self._parser.parse(code)
+        with tracer.span("parse_cache.get") as span:
+            classes = self._parse_cache.get(code)
+            span.set_attribute("cache.hit", classes is not None)
+        if classes is None:
+            classes = self._parser.parse(code)
+            self._parse_cache.put(code, classes)
+        return classes
+
+    def regenerate(
+        self,
+        model: str,
+        generator_options: dict[str, dict] | None = None,
+    ) -> dict:
+        """Render diagrams from a model stored by a previous conversion.
+
+        ``model`` is the ``model`` string of a conversion result; no Java
+        source is parsed.  Returns a dict with keys: diagrams and, when a
+        diagram was split, pages.
+        """
+        return self.render(model_codec.loads(model), generator_options)
+
+    def render(
+        self,
+        all_classes: list[ClassInfo],
+        generator_options: dict[str, dict] | None = None,
+        types: list[str] | None = None,
+    ) -> dict:
+        """Run the default generators, plus any configured in
+        ``generator_options`` (or only those in ``types``), over already
+        parsed classes.
+
+        Returns a dict with keys: diagrams and, when a diagram was split,
+        pages.  A split diagram is only returned as its pages, not also
+        whole under diagrams (see :func:`diagram_documents`).
+        """
+        diagrams: dict[str, str] = {}
+        pages: dict[str, list[str]] = {}
+        for name, gen in self._generators_for(generator_options, types).items():
+            if types is not None and name not in types:
+                continue
+            if not all_classes:
+                diagrams[name] = ""
+                continue
+            with tracer.span("diagram_generator.generate") as span:
+                gen_pages = gen.generate_pages(all_classes)
+                if len(gen_pages) > 1:
+                    pages[name] = gen_pages
+                else:
+                    diagrams[name] = gen_pages[0]
+                if span.recording:
+                    span.set_attributes({
+                        "diagram.type": name,
+                        "class.count": len(all_classes),
+                        "diagram.pages": len(gen_pages),
+                        "diagram.size": sum(map(len, gen_pages)),
+                    })
+
+        result = {"diagrams": diagrams}
+        if pages:
+            result["pages"] = pages
+        return result
 
+    def iter_lines(
+        self,
+        classes: Iterable[ClassInfo],
+        generator_options: dict[str, dict] | None = None,
+        types: list[str] | None = None,
+    ) -> Iterator[tuple[str, Iterator[str]]]:
+        """Yield (diagram type, line iterator) for each generator :meth:`render`
+        would run.
+
+        For writing diagrams straight to files from a
+        ``services.model_store.ModelStore``: nothing is rendered until the
+        lines are consumed and no diagram is held whole.  Diagrams are not
+        split into pages.
+        """
+        for name, gen in self._generators_for(generator_options, types).items():
+            if types is None or name in types:
+                yield name, gen.iter_lines(classes)
+
+    def _generators_for(
+        self,
+        generator_options: dict[str, dict] | None,
+        types: list[str] | None = None,
+    ) -> dict:
+        """The default generators, with those in ``generator_options``
+        configured accordingly and any other of ``types`` added."""
+        extra = [name for name in types or () if name not in self._generators]
+        if not generator_options and not extra:
+            return self._generators
+        generators = dict(self._generators)
+        for name, options in (generator_options or {}).items():
+            generators[name] = DiagramGeneratorFactory.create(name, **options)
+        for name in extra:
+            generators.setdefault(name, DiagramGeneratorFactory.create(name))
+        return generators
+
+    def _remember(self, cache_key: str, result: dict) -> None:
         self._cache[cache_key] = result
+        self._cache.move_to_end(cache_key)
         if len(self._cache) > self._MAX_CACHE:
             self._cache.popitem(last=False)
 
+    def warm_up(self) -> None:
+        """Exercise the parser and every generator once without caching.
+
+        Intended to run in a preloading master process so that lazily
+        built module state is created before workers fork and is then
+        shared copy-on-write.
+        """
+        classes = self._parser.parse(self._WARM_UP_SOURCE)
+        for gen in self._generators.values():
+            gen.generate(classes)
+
+    def load_snapshot(self, path: str) -> int:
+        """Fill the cache from a file written by :meth:`save_snapshot`.
+
+        Returns the number of entries loaded; a missing or unreadable
+        snapshot, or one written by another :data:`GENERATOR_VERSION`,
+        loads nothing.
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get("version") != GENERATOR_VERSION:
+            return 0
+
+        for key, result in data.get("entries", [])[-self._MAX_CACHE:]:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+        while len(self._cache) > self._MAX_CACHE:
+            self._cache.popitem(last=False)
+        return len(self._cache)
+
+    def save_snapshot(self, path: str) -> None:
+        """Atomically write the cache (oldest first) to ``path`` as JSON."""
+        data = {
+            "version": GENERATOR_VERSION,
+            "entries": list(self._cache.items()),
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def lookup(self, cache_key: str) -> dict | None:
+        """Return the cached result for a key from :meth:`key_for`, or None."""
+        result = self._cache.get(cache_key)
+        if result is not None:
+            self._cache.move_to_end(cache_key)
+        return result
+
+    def _lookup_for(self, cache_key: str, sources: list[tuple[str, str]]) -> dict | None:
+        result = self.lookup(cache_key)
+        if result is not None and self.semantic_keys:
+            # The cached conversion may have been of differently formatted code.
+            result = {**result, "sources": [{"filename": fn, "code": code} for fn, code in sources]}
         return result
 
-    @staticmethod
-    def _hash(sources: list[tuple[str, str]]) -> str:
-        content = "".join(f"{n}:{c}" for n, c in sorted(sources))
+    def key_for(
+        self,
+        sources: list[tuple[str, str]],
+        generator_options: dict[str, dict] | None = None,
+    ) -> str:
+        """Content hash identifying a conversion; also used as its ETag.
+
+        Covers :data:`GENERATOR_VERSION`, so conversions (and ETags) of
+        an older build never match those of the current one.
+        """
+        return self._hash(sources, generator_options)
+
+    def _hash(
+        self,
+        sources: list[tuple[str, str]],
+        generator_options: dict[str, dict] | None = None,
+    ) -> str:
+        if self.semantic_keys:
+            sources = [(n, normalize(c)) for n, c in sources]
+        content = GENERATOR_VERSION + "".join(f"{n}:{c}" for n, c in sorted(sources))
+        if generator_options:
+            content += json.dumps(generator_options, sort_keys=True)
         return hashlib.sha256(content.encode()).hexdigest()
+
+
+def diagram_documents(rendered: dict) -> dict[str, str]:
+    """One PlantUML document per diagram type of a :meth:`ConversionService.render`
+    (or conversion) result: the diagram, or for a split diagram its pages
+    as one multi-diagram document, as stored with history entries."""
+    documents = dict(rendered["diagrams"])
+    for name, pages in rendered.get("pages", {}).items():
+        documents[name] = "\n\n".join(pages)
+    return documents
+
+
+_worker_service: ConversionService | None = None
+
+
+def _build_in_worker(
+    sources: list[tuple[str, str]],
+    generator_options: dict[str, dict] | None = None,
+    trace_parent: tuple[str, str] | None = None,
+) -> dict:
+    """Uncached conversion for executor workers (threads or processes).
+
+    ``trace_parent`` (from ``tracer.inject()``) continues the caller's
+    trace, which neither default-executor threads nor pool processes
+    inherit; without it nothing is traced here.
+    """
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = ConversionService()
+    if trace_parent is None:
+        # Keep the spans in build() from starting traces of their own.
+        with tracer.suppress():
+            return _worker_service.build(sources, generator_options)
+    with tracer.span("conversion.build", parent=trace_parent):
+        return _worker_service.build(sources, generator_options)
+
+
+def _source_attributes(sources: list[tuple[str, str]], result: dict | None) -> dict:
+    return {
+        "file.count": len(sources),
+        "file.size": sum(len(code.encode()) for _, code in sources),
+        "cache.hit": result is not None,
+    }
@@ -0,0 +1,65 @@
+"""On-disk store of parsed classes for bounded-memory conversions.
+
+Classes are appended as they are parsed and read back one at a time, in
+insertion order, each time the store is iterated.  Generators make
+repeated passes over their input instead of copying it (see
+``DiagramGenerator``), so rendering from a store keeps only one class
+plus the output being written in memory, however large the project.
+"""
+
+import os
+import sqlite3
+import tempfile
+from collections.abc import Iterator
+
+from parsers import model_codec
+from parsers.java_parser import ClassInfo
+
+
+class ModelStore:
+    """SQLite-backed, re-iterable collection of :class:`ClassInfo`.
+
+    ``path`` (a temporary file removed by :meth:`close` if omitted) is
+    scratch space: anything there is replaced, and journaling and fsync
+    are off.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self._temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="models-", suffix=".sqlite3")
+            os.close(fd)
+        self.path = path
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("DROP TABLE IF EXISTS classes")
+        self._db.execute("CREATE TABLE classes (id INTEGER PRIMARY KEY, data TEXT)")
+        self._count = 0
+
+    def add(self, classes: list[ClassInfo]) -> None:
+        self._db.execute("BEGIN")
+        self._db.executemany(
+            "INSERT INTO classes (data) VALUES (?)",
+            ((model_codec.dumps_class(cls),) for cls in classes),
+        )
+        self._db.execute("COMMIT")
+        self._count += len(classes)
+
+    def __iter__(self) -> Iterator[ClassInfo]:
+        for (data,) in self._db.execute("SELECT data FROM classes ORDER BY id"):
+            yield model_codec.loads_class(data)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        self._db.close()
+        if self._temporary:
+            os.unlink(self.path)
+
+    def __enter__(self) -> "ModelStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
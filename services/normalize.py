@@ -0,0 +1,85 @@
+"""Formatting-insensitive form of Java source, for cache keys.
+
+:func:`normalize` drops comments and collapses whitespace while keeping
+every token, so two sources normalize to the same text only if they lex
+to the same tokens and therefore parse to the same model.  Reformatting,
+Javadoc edits and line-ending changes leave the normalized text alone.
+
+Everything but a short loop over comments and literals runs inside the
+regular expression engine, so it costs a small fraction of a javalang
+parse.
+"""
+
+import re
+
+# Comments and literals, matched in one left-to-right scan so that comment
+# markers inside literals and quotes inside comments are not mistaken for
+# each other.  The group makes re.split keep them.
+_COMMENT_OR_LITERAL = re.compile(
+    r"""
+    ( //[^\n]*
+    | /\*.*?\*/
+    | \"\"\"(?:\\.|[^\\])*?\"\"\"
+    | "(?:\\.|[^"\\\n])*"
+    | '(?:\\.|[^'\\\n])*'
+    )
+    """,
+    re.S | re.X,
+)
+_WHITESPACE = re.compile(r"\s+")
+# Multi-character operators and comment markers.  A space is only needed
+# between two word characters (``int x``) or two characters that could be
+# read as part of one of these (``a - -b`` is not ``a--b``, ``a / *p``
+# is not a comment).  Every other space is dropped, so ``x = -1`` and
+# ``x=-1`` agree.  (Matching only the spaces to drop keeps the
+# substitution a plain deletion, several times faster than re-inserting
+# the kept ones.)
+_MULTI_CHAR_TOKENS = (
+    "->", "::", "...", "++", "--", "&&", "||", "==", "!=", "<=", ">=",
+    "<<=", ">>>=", "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=",
+    "//", "/*", "*/",
+)
+
+
+def _separators() -> dict[str, str]:
+    following: dict[str, set[str]] = {}
+    for token in _MULTI_CHAR_TOKENS:
+        for first, second in zip(token, token[1:]):
+            following.setdefault(first, set()).add(second)
+    return {first: "".join(sorted(chars)) for first, chars in following.items()}
+
+
+_REDUNDANT_SPACE = re.compile(
+    " (?!(?<=[\\w$] )[\\w$]"
+    + "".join(
+        f"|(?<={re.escape(first)} )[{re.escape(chars)}]"
+        for first, chars in sorted(_separators().items())
+    )
+    + ")"
+)
+
+
+def normalize(code: str) -> str:
+    """``code`` with comments removed and whitespace reduced to the single
+    spaces that separate tokens; literals are kept verbatim."""
+    parts = _COMMENT_OR_LITERAL.split(code)
+    normalized = []
+    # Code between literals, with comments turned into spaces.
+    chunk = [parts[0]]
+    for i in range(1, len(parts), 2):
+        token = parts[i]
+        if token[0] == "/":
+            chunk.append(" ")
+        else:
+            normalized.append(_squeeze("".join(chunk)))
+            normalized.append(token)
+            chunk = []
+        chunk.append(parts[i + 1])
+    normalized.append(_squeeze("".join(chunk)))
+    return "".join(normalized)
+
+
+def _squeeze(code: str) -> str:
+    # The ends of a chunk touch a literal or an end of the file, neither of
+    # which needs a separator.
+    return _REDUNDANT_SPACE.sub("", _WHITESPACE.sub(" ", code)).strip(" ")
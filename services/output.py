@@ -0,0 +1,63 @@
+import os
+
+
+def write_diagrams(
+    rendered: dict,
+    types,
+    output: str,
+    previous: dict[str, str] | None = None,
+) -> list[str]:
+    """Write ``<type>.puml`` (and ``<type>-<n>.puml`` pages) for each type.
+
+    ``rendered`` is a ``ConversionService.render`` result.  When
+    ``previous`` is given it maps paths to the text last written there;
+    unchanged files are skipped and the map is updated, and files written
+    before that are now empty or no longer produced (e.g. pages of a
+    diagram that shrank) are removed so no stale output is left behind.
+    Returns the paths written or removed.
+    """
+    os.makedirs(output, exist_ok=True)
+    written = []
+    for name in types:
+        files = {f"{name}.puml": rendered["diagrams"].get(name, "")}
+        for number, page in enumerate(rendered.get("pages", {}).get(name, []), 1):
+            files[f"{name}-{number}.puml"] = page
+        if previous is not None:
+            prefix = os.path.join(output, f"{name}-")
+            for path in [path for path in previous if path.startswith(prefix)]:
+                files.setdefault(os.path.basename(path), "")
+        for fname, text in files.items():
+            path = os.path.join(output, fname)
+            if previous is not None and previous.get(path) == text:
+                continue
+            if not text:
+                if previous is not None and path in previous:
+                    del previous[path]
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    written.append(path)
+                continue
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            if previous is not None:
+                previous[path] = text
+            written.append(path)
+    return written
+
+
+def write_lines(name: str, lines, output: str) -> str:
+    """Write one diagram given as an iterable of lines to ``<name>.puml``.
+
+    Lines are written as they are produced, so the diagram is never held
+    whole.  Returns the path written.
+    """
+    os.makedirs(output, exist_ok=True)
+    path = os.path.join(output, f"{name}.puml")
+    with open(path, "w", encoding="utf-8") as f:
+        for number, line in enumerate(lines):
+            if number:
+                f.write("\n")
+            f.write(line)
+    return path
@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+from parsers import model_codec
+from parsers.java_parser import ClassInfo
+from .normalize import normalize
+
+
+class ParseCache:
+    """Content-addressed on-disk cache of parsed Java files.
+
+    Each distinct source text maps to one small JSON file holding its
+    parsed model, so unchanged files are never handed to javalang twice,
+    across processes and runs.  Entries live under a model-version
+    directory and are written atomically, so concurrent writers are safe.
+
+    With ``semantic_keys`` entries are keyed by the normalized source (see
+    ``services.normalize``), so files that differ only in comments or
+    formatting share an entry.  Both kinds of key can live in the same
+    directory: a raw text that equals another file's normalized text
+    parses to the same model.
+    """
+
+    def __init__(self, directory: str, semantic_keys: bool = False) -> None:
+        self.directory = os.path.join(directory, f"v{model_codec.MODEL_VERSION}")
+        self.semantic_keys = semantic_keys
+
+    def get(self, code: str) -> list[ClassInfo] | None:
+        try:
+            with open(self._path(code), encoding="utf-8") as f:
+                return model_codec.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def put(self, code: str, classes: list[ClassInfo]) -> None:
+        path = self._path(code)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(model_codec.dumps(classes))
+        os.replace(tmp_path, path)
+
+    def _path(self, code: str) -> str:
+        if self.semantic_keys:
+            code = normalize(code)
+        key = hashlib.sha256(code.encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json")
@@ -0,0 +1,51 @@
+import base64
+import zlib
+
+# PlantUML's text encoding: raw deflate followed by base64 over its own
+# URL-safe alphabet.  Renderers accept the result directly, e.g.
+# https://www.plantuml.com/plantuml/svg/<encoded>.
+_STANDARD_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_PLANTUML_ALPHABET = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_"
+_TRANSLATION = bytes.maketrans(_STANDARD_ALPHABET, _PLANTUML_ALPHABET)
+
+ENCODINGS = ("plain", "deflate")
+
+
+def encode(text: str) -> str:
+    """Encode PlantUML markup in PlantUML's deflate+base64 text form."""
+    if not text:
+        return ""
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    # PlantUML pads the last group with zero bytes instead of "=".
+    data += b"\0" * (-len(data) % 3)
+    return base64.b64encode(data).translate(_TRANSLATION).decode("ascii")
+
+
+def decode(encoded: str) -> str:
+    """Inverse of :func:`encode`."""
+    if not encoded:
+        return ""
+    data = base64.b64decode(encoded.encode("ascii").translate(
+        bytes.maketrans(_PLANTUML_ALPHABET, _STANDARD_ALPHABET)
+    ))
+    return zlib.decompressobj(-zlib.MAX_WBITS).decompress(data).decode("utf-8")
+
+
+def encode_diagrams(diagrams: dict[str, str], encoding: str) -> dict[str, str]:
+    """Return ``diagrams`` in the requested encoding (one of ENCODINGS)."""
+    if encoding == "deflate":
+        return {name: encode(text) for name, text in diagrams.items()}
+    return diagrams
+
+
+def requested_encoding(request) -> str:
+    """Encoding asked for with ``?encoding=`` on a DRF request (one of
+    ENCODINGS, plain by default); anything else is a ValidationError."""
+    # Imported here so the codec stays usable without Django.
+    from rest_framework.exceptions import ValidationError
+
+    encoding = request.query_params.get("encoding", "plain")
+    if encoding not in ENCODINGS:
+        raise ValidationError({"encoding": [f"Expected one of: {', '.join(ENCODINGS)}."]})
+    return encoding
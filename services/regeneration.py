@@ -0,0 +1,49 @@
+"""Process-pool helpers for regenerating stored diagrams.
+
+Kept free of Django imports so pool workers can be spawned cheaply and
+never touch the database; the caller reads rows and writes results.
+"""
+
+import re
+
+from parsers.model_codec import ModelVersionError
+from .conversion_service import ConversionService, diagram_documents
+
+# DiagramHistory.source_code joins uploads as "// <filename>\n<code>"
+# separated by blank lines.
+_FILE_HEADER = re.compile(r"(?:\A|\n\n)// ([^\n/\\]+\.java)\n")
+
+_service: ConversionService | None = None
+
+
+def split_history_source(source_code: str) -> list[tuple[str, str]]:
+    """Recover the (filename, code) pairs a history entry was built from."""
+    matches = list(_FILE_HEADER.finditer(source_code))
+    if not matches:
+        return [("PastedCode.java", source_code)]
+    sources = []
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(source_code)
+        sources.append((match.group(1), source_code[match.end():end]))
+    return sources
+
+
+def regenerate_entry(row: tuple[int, str, str]) -> tuple[int, dict[str, str], str]:
+    """Regenerate one history row given as (pk, parsed_model, source_code).
+
+    Uses the stored model when there is a readable one and only parses the
+    source otherwise, returning (pk, diagrams, model) so the model can be
+    backfilled.
+    """
+    global _service
+    if _service is None:
+        _service = ConversionService()
+
+    pk, parsed_model, source_code = row
+    if parsed_model:
+        try:
+            return pk, diagram_documents(_service.regenerate(parsed_model)), parsed_model
+        except ModelVersionError:
+            pass  # Written by another model version; re-parse instead.
+    result = _service.build(split_history_source(source_code))
+    return pk, diagram_documents(result), result["model"]
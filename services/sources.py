@@ -0,0 +1,84 @@
+import os
+import tarfile
+import zipfile
+from collections.abc import Iterator
+
+import zstandard
+
+ZSTD_TAR_SUFFIXES = (".tar.zst", ".tzst")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz") + ZSTD_TAR_SUFFIXES
+
+
+def read_path(path: str) -> list[tuple[str, str]]:
+    """Collect (filename, java_code) pairs from a .java file, a directory
+    tree, or a zip/tar archive (compressed tars included).
+
+    Archives are read member by member without extracting to disk.
+    Directory entries are named by their path relative to ``path``.
+    """
+    return list(iter_path(path))
+
+
+def iter_path(path: str) -> Iterator[tuple[str, str]]:
+    """:func:`read_path` one file at a time, for bounded-memory callers.
+
+    The kind of ``path`` is checked before the first pair is produced.
+    """
+    if os.path.isdir(path):
+        return _read_directory(path)
+    if zipfile.is_zipfile(path):
+        return _read_zip(path)
+    if tarfile.is_tarfile(path) or path.endswith(ZSTD_TAR_SUFFIXES):
+        return _read_tar(path)
+    if path.endswith(".java"):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return iter([(os.path.basename(path), f.read())])
+    raise ValueError(f"Not a .java file, directory or archive: {path}")
+
+
+def _read_directory(path: str) -> Iterator[tuple[str, str]]:
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for fname in sorted(files):
+            if fname.endswith(".java"):
+                fpath = os.path.join(root, fname)
+                with open(fpath, encoding="utf-8", errors="replace") as f:
+                    yield os.path.relpath(fpath, path), f.read()
+
+
+def iter_zip(file) -> Iterator[tuple[str, str]]:
+    """The .java members of a zip archive (a path or a seekable file)."""
+    with zipfile.ZipFile(file) as zf:
+        for info in zf.infolist():
+            if not info.is_dir() and info.filename.endswith(".java"):
+                yield info.filename, zf.read(info).decode("utf-8", errors="replace")
+
+
+def iter_tar(fileobj, name: str = "") -> Iterator[tuple[str, str]]:
+    """The .java members of a tar archive, read sequentially from ``fileobj``.
+
+    gzip, bzip2 and xz compression are detected from the data; zstd is
+    chosen by ``name`` (``.tar.zst``/``.tzst``).  Nothing is extracted to
+    disk and ``fileobj`` need not be seekable.
+    """
+    if name.endswith(ZSTD_TAR_SUFFIXES):
+        fileobj = zstandard.ZstdDecompressor().stream_reader(fileobj)
+    # "r|*" streams sequentially with transparent decompression.
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+        for member in tf:
+            if member.isfile() and member.name.endswith(".java"):
+                data = tf.extractfile(member).read()
+                yield member.name, data.decode("utf-8", errors="replace")
+
+
+def is_tar_name(name: str) -> bool:
+    return name.endswith(TAR_SUFFIXES)
+
+
+def _read_zip(path: str) -> Iterator[tuple[str, str]]:
+    return iter_zip(path)
+
+
+def _read_tar(path: str) -> Iterator[tuple[str, str]]:
+    with open(path, "rb") as f:
+        yield from iter_tar(f, path)
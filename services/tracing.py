@@ -0,0 +1,251 @@
+"""Lightweight request tracing in the OpenTelemetry data model.
+
+Spans nest through a context variable, so they follow the request across
+threads started with ``contextvars`` (``sync_to_async``) and ``async``
+code; work sent to another process continues its trace from the pair
+returned by :meth:`Tracer.inject`.  Finished spans are buffered per trace
+and handed to the exporter in one batch when the outermost span of the
+process ends::
+
+    tracing.configure(sample_rate=0.1, exporter="jsonl", path="traces.jsonl")
+
+    with tracing.tracer.span("conversion.convert", {"files": 3}) as span:
+        ...
+        span.set_attribute("class.count", 12)
+
+Sampling is decided once per trace, at its root.  With a sample rate of 0
+(the default) :meth:`Tracer.span` returns a shared no-op span, so
+instrumented code costs one attribute check per span.
+"""
+
+import contextvars
+import importlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+
+class _NoopSpan:
+    """Stands in for a span that is not recorded."""
+
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+# The innermost open span, NOOP_SPAN inside a trace that was not sampled.
+_current = contextvars.ContextVar("tracing_current_span", default=None)
+
+
+class _Suppressed(_NoopSpan):
+    """Root of a trace that was not sampled: its children are not sampled either."""
+
+    def __enter__(self):
+        self._token = _current.set(NOOP_SPAN)
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        return False
+
+
+class Span:
+    recording = True
+
+    def __init__(self, tracer, name, trace_id, parent_id, finished=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = "OK"
+        # Finished spans of this trace in this process, shared with the
+        # children; the span that starts the list exports it.
+        self._local_root = finished is None
+        self._finished = [] if finished is None else finished
+        self._token = None
+        self._start = 0
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        self._start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.time_ns()
+        _current.reset(self._token)
+        if exc is not None:
+            self.status = "ERROR"
+            self.attributes["exception.type"] = exc_type.__name__
+            self.attributes["exception.message"] = str(exc)[:500]
+        self._finished.append({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self._start,
+            "end_time_unix_nano": end,
+            "duration_ms": round((end - self._start) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        })
+        if self._local_root:
+            self.tracer.export(self._finished)
+        return False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per span to ``path``.
+
+    Each batch is a single ``write`` to a file opened with ``O_APPEND``, so
+    gunicorn workers and pool processes can share one file.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        data = "".join(json.dumps(span, default=str) + "\n" for span in spans).encode()
+        with self._lock:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            os.write(self._fd, data)
+
+
+class StdoutExporter:
+    """Writes one JSON object per span to standard output."""
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        data = "".join(json.dumps(span, default=str) + "\n" for span in spans)
+        with self._lock:
+            sys.stdout.write(data)
+            sys.stdout.flush()
+
+
+EXPORTERS = {
+    "jsonl": JsonLinesExporter,
+    "stdout": StdoutExporter,
+}
+
+
+class Tracer:
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.exporter = None
+        self.service_name = None
+
+    def configure(self, sample_rate=0.0, exporter="jsonl", path=None, service_name="service-converter"):
+        """Set the share of traces recorded (0-1) and where they go.
+
+        ``exporter`` is a name from :data:`EXPORTERS`, the dotted path of
+        an exporter class (constructed with ``path``) or an object with an
+        ``export(spans)`` method.
+        """
+        if sample_rate <= 0:
+            exporter = None
+        elif exporter is None:
+            raise ValueError("Tracing needs an exporter")
+        elif isinstance(exporter, str):
+            if exporter in EXPORTERS:
+                exporter_cls = EXPORTERS[exporter]
+            else:
+                module_name, _, class_name = exporter.rpartition(".")
+                try:
+                    exporter_cls = getattr(importlib.import_module(module_name), class_name)
+                except (ImportError, AttributeError, ValueError) as exc:
+                    raise ValueError(f"Unknown trace exporter: {exporter}") from exc
+            if exporter_cls is JsonLinesExporter and not path:
+                raise ValueError("The jsonl trace exporter needs a path")
+            exporter = exporter_cls(path)
+        self.exporter = exporter
+        self.service_name = service_name
+        # Set last: spans are only created once everything above is in place.
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def span(self, name, attributes=None, parent=None):
+        """Context manager for a span named ``name``, child of the current one.
+
+        ``parent`` continues a trace from another process (see
+        :meth:`inject`).  Outside any span a new trace starts, recorded with
+        probability ``sample_rate``.
+        """
+        if self.sample_rate <= 0:
+            return NOOP_SPAN
+        if parent is not None:
+            trace_id, parent_id = parent
+            return Span(self, name, trace_id, parent_id, attributes=attributes)
+        current = _current.get()
+        if current is None:
+            if self.sample_rate < 1 and random.random() >= self.sample_rate:
+                return _Suppressed()
+            return Span(self, name, f"{random.getrandbits(128):032x}", None, attributes=attributes)
+        if current is NOOP_SPAN:
+            return NOOP_SPAN
+        return Span(self, name, current.trace_id, current.span_id, current._finished, attributes)
+
+    def suppress(self):
+        """Context manager under which no span is recorded or starts a trace."""
+        return _Suppressed()
+
+    def current(self):
+        """The innermost recording span, or :data:`NOOP_SPAN`."""
+        current = _current.get()
+        return NOOP_SPAN if current is None else current
+
+    def inject(self):
+        """(trace id, span id) of the current span for :meth:`span`'s
+        ``parent`` in another process, or None when nothing is recorded."""
+        current = _current.get()
+        if current is None or current is NOOP_SPAN:
+            return None
+        return current.trace_id, current.span_id
+
+    def export(self, spans):
+        # The pid is read here: tracing is configured before gunicorn forks.
+        resource = {"service.name": self.service_name, "process.pid": os.getpid()}
+        for span in spans:
+            span["resource"] = resource
+        try:
+            self.exporter.export(spans)
+        except Exception as exc:
+            # Losing a trace must never fail the traced work.
+            print(f"Trace export failed: {exc}", file=sys.stderr)
+
+
+tracer = Tracer()
+
+
+def configure(sample_rate=0.0, exporter="jsonl", path=None):
+    """Configure the process-wide :data:`tracer`; usable as a pool initializer."""
+    tracer.configure(sample_rate, exporter, path)
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+from dataclasses import replace
+
+from parsers.generator_factory import DiagramGeneratorFactory
+from parsers.java_parser import ClassInfo
+from .conversion_service import ConversionService
+from .output import write_diagrams
+
+
+class SourceWatcher:
+    """Keeps PlantUML output in sync with a Java source directory.
+
+    Each :meth:`poll` stats the tree and re-parses only the ``.java`` files
+    whose mtime or size changed.  If a change touched declarations every
+    generator runs again; if only method bodies changed, only generators
+    with ``uses_method_bodies`` do.  Output files are rewritten only when
+    their content changed, and removed once they would be empty.  A file
+    that fails to parse (e.g. half-saved) keeps its last good model until
+    it parses again.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        output: str,
+        service: ConversionService,
+        types: list[str],
+        generator_options: dict[str, dict] | None = None,
+    ) -> None:
+        self.root = root
+        self.output = output
+        self.service = service
+        self.types = types
+        self.generator_options = generator_options
+        self._body_types = {
+            name for name in types
+            if DiagramGeneratorFactory.create(name).uses_method_bodies
+        }
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._classes: dict[str, list[ClassInfo]] = {}
+        self._written: dict[str, str] = {}
+
+    def run(self, interval: float = 0.25) -> None:
+        """Poll forever, reporting each regeneration on stdout."""
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+    def poll(self) -> list[str]:
+        """Bring the output up to date; returns the paths rewritten."""
+        started = time.perf_counter()
+        current = self._scan()
+        changed = [path for path, stat in current.items() if self._stats.get(path) != stat]
+        removed = [path for path in self._stats if path not in current]
+        if not changed and not removed:
+            return []
+
+        dirty: set[str] = set(self.types) if removed else set()
+        for path in removed:
+            del self._stats[path]
+            self._classes.pop(path, None)
+        for path in changed:
+            self._stats[path] = current[path]
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    classes = self.service.parse_file(f.read())
+            except Exception as exc:
+                print(f"{os.path.relpath(path, self.root)}: {exc}", file=sys.stderr)
+                continue
+            previous = self._classes.get(path)
+            self._classes[path] = classes
+            if previous is None or _declarations(previous) != _declarations(classes):
+                dirty.update(self.types)
+            elif previous != classes:
+                dirty.update(self._body_types)
+
+        if not dirty:
+            return []
+
+        all_classes = [cls for path in sorted(self._classes) for cls in self._classes[path]]
+        rendered = self.service.render(all_classes, self.generator_options, types=sorted(dirty))
+        written = write_diagrams(rendered, sorted(dirty), self.output, self._written)
+        if written:
+            print(
+                f"Regenerated {', '.join(sorted(dirty))} in "
+                f"{(time.perf_counter() - started) * 1000:.0f} ms "
+                f"({len(changed) + len(removed)} files changed)"
+            )
+        return written
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        stats = {}
+        stack = [self.root]
+        while stack:
+            # Files and directories deleted mid-scan are simply not seen;
+            # the next poll reports them as removed.
+            try:
+                entries = os.scandir(stack.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".java"):
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        stats[entry.path] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+
+def _declarations(classes: list[ClassInfo]) -> list[ClassInfo]:
+    """The classes with method bodies stripped."""
+    return [
+        replace(cls, methods=[replace(m, body_statements=[], calls=[]) for m in cls.methods])
+        for cls in classes
+    ]
@@ -0,0 +1,107 @@
+from unittest import TestCase
+
+from parsers.call_graph import CallGraph
+from parsers.java_parser import JavaParser
+from parsers.sequence_diagram import SequenceDiagramGenerator
+
+SOURCE = """
+class Service {
+    private Repo repo;
+    private Item item;
+
+    void run(Repo other) {
+        repo.save(other.id());
+        repo.find(1).touch();
+        this.item.use();
+        {
+            Other item = new Other();
+            item.use();
+        }
+        item.use();
+        helper().use();
+        items.forEach(x -> x.use());
+        repo.close();
+    }
+
+    Item helper() { return item; }
+}
+
+class Repo extends Base {
+    Item find(int id) { return null; }
+    void save(int id) {}
+    void save(int id, boolean flush) {}
+    int id() { return 0; }
+}
+
+class Base { void close() {} }
+class Item { void touch() {} void use() {} }
+class Other { void use() {} }
+"""
+
+
+class CallExtractionTest(TestCase):
+    def setUp(self):
+        self.classes = JavaParser().parse(SOURCE)
+        self.calls = self.classes[0].methods[0].calls
+
+    def test_arguments_are_called_before_the_call_they_are_passed_to(self):
+        self.assertEqual([c.method for c in self.calls[:2]], ["id", "save"])
+        self.assertEqual(self.calls[0].target, "Repo")
+
+    def test_chained_call_points_at_its_receiver_call(self):
+        touch = self.calls[3]
+        self.assertEqual((touch.method, touch.target, touch.receiver), ("touch", None, 2))
+
+    def test_this_member_is_a_field_even_when_shadowed_by_a_local(self):
+        self.assertEqual(self.calls[4].target, "Item")
+
+    def test_locals_are_scoped_to_their_block(self):
+        self.assertEqual([c.target for c in self.calls[5:7]], ["Other", "Item"])
+
+    def test_lambda_parameters_have_no_type(self):
+        self.assertEqual((self.calls[9].method, self.calls[9].target), ("use", None))
+        self.assertEqual(self.calls[10].method, "forEach")
+
+
+class CallGraphTest(TestCase):
+    def setUp(self):
+        self.graph = CallGraph(JavaParser().parse(SOURCE))
+
+    def edges(self, entry):
+        return [(e.target, e.method) for e in self.graph.callees(self.graph.find(entry))]
+
+    def test_chained_calls_resolve_through_the_declared_return_type(self):
+        edges = self.edges("Service.run")
+        self.assertIn(("Item", "touch"), edges)
+        self.assertEqual(edges.count(("Item", "use")), 3)
+
+    def test_overloads_are_matched_by_argument_count(self):
+        node = self.graph.find("Service.run")
+        save = next(e for e in self.graph.callees(node) if e.method == "save")
+        self.assertEqual(self.graph.nodes[save.callee][1].parameters[0].name, "id")
+        self.assertEqual(len(self.graph.nodes[save.callee][1].parameters), 1)
+
+    def test_inherited_methods_resolve_through_extends(self):
+        self.assertIsNone(self.graph.find("Repo.close"))
+        self.assertEqual(self.edges("Service.run")[-1], ("Repo", "close"))
+        node = self.graph.find("Service.run")
+        self.assertEqual(self.graph.nodes[self.graph.callees(node)[-1].callee][0], "Base")
+
+    def test_busiest_method_is_the_default_entry(self):
+        self.assertEqual(self.graph.nodes[self.graph.busiest()][1].name, "run")
+
+
+class SequenceDiagramTest(TestCase):
+    def test_message_order_follows_evaluation_order(self):
+        diagram = SequenceDiagramGenerator("Service.run").generate(JavaParser().parse(SOURCE))
+        lines = [line for line in diagram.splitlines() if " -> " in line]
+        self.assertEqual(lines[:3], [
+            "Service -> Repo : id()",
+            "Service -> Repo : save()",
+            "Service -> Repo : find()",
+        ])
+        self.assertEqual(lines[3], "Service -> Item : touch()")
+
+    def test_missing_entry_is_reported(self):
+        diagram = SequenceDiagramGenerator("Nope.run").generate(JavaParser().parse(SOURCE))
+        self.assertIn("' entry method Nope.run not found", diagram)
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from services import cli
+
+SOURCE = """
+public class Sample {
+    private int count;
+    public int next() { if (count > 0) { return count; } return 1; }
+}
+"""
+
+
+class CliTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, "src")
+        self.output = os.path.join(directory.name, "uml")
+        os.mkdir(self.source)
+        with open(os.path.join(self.source, "Sample.java"), "w", encoding="utf-8") as f:
+            f.write(SOURCE)
+
+    def main(self, *args):
+        with mock.patch("sys.stdout"):
+            return cli.main([self.source, "-o", self.output, "--no-cache", "-j", "1", *args])
+
+    def test_only_requested_types_are_rendered(self):
+        with mock.patch.object(cli.ConversionService, "render", autospec=True,
+                               side_effect=cli.ConversionService.render) as render:
+            self.assertEqual(self.main("--type", "class"), 0)
+        self.assertEqual(render.call_args.args[3], ["class"])
+        self.assertEqual(os.listdir(self.output), ["class.puml"])
+
+    def test_flow_options(self):
+        with mock.patch.object(cli.ConversionService, "render", autospec=True,
+                               side_effect=cli.ConversionService.render) as render:
+            self.main("--type", "flow", "--flow-methods", "next", "--flow-rank", "--flow-max-lines", "50")
+        self.assertEqual(
+            render.call_args.args[2],
+            {"flow": {"method_pattern": "next", "rank_by_complexity": True, "max_lines": 50}},
+        )
+
+    def test_sequence_diagram_only_when_asked_for(self):
+        self.main()
+        self.assertEqual(sorted(os.listdir(self.output)), ["class.puml", "flow.puml", "usecase.puml"])
+        self.main("--sequence-entry", "Sample.next")
+        self.assertIn("sequence.puml", os.listdir(self.output))
+
+    def test_low_memory_defaults_leave_out_the_sequence_diagram(self):
+        self.main("--low-memory")
+        self.assertNotIn("sequence.puml", os.listdir(self.output))
+
+    def test_watch_does_not_fall_through_to_one_shot(self):
+        with mock.patch.object(cli.SourceWatcher, "run", return_value=None), \
+                mock.patch.object(cli, "read_path") as read_path:
+            self.assertEqual(self.main("--watch"), 0)
+        read_path.assert_not_called()
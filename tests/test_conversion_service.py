@@ -0,0 +1,101 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from services.conversion_service import ConversionService, diagram_documents
+
+SOURCES = [
+    ("a/A.java", "package a; public class A { private B b; }"),
+    ("a/B.java", "package a; public class B { }"),
+    ("c/C.java", "package c; public class C { public void run() { } }"),
+]
+
+
+class RenderPagesTest(TestCase):
+    def setUp(self):
+        self.service = ConversionService()
+
+    def test_split_diagram_is_only_returned_as_pages(self):
+        result = self.service.convert(SOURCES, {"class": {"page_size": 2}})
+        self.assertNotIn("class", result["diagrams"])
+        self.assertEqual(len(result["pages"]["class"]), 2)
+        self.assertIn("usecase", result["diagrams"])
+
+    def test_class_diagram_is_not_split_by_default(self):
+        sources = [(f"C{n}.java", f"class C{n} {{}}") for n in range(300)]
+        result = self.service.convert(sources)
+        self.assertNotIn("pages", result)
+        self.assertEqual(result["diagrams"]["class"].count("@startuml"), 1)
+
+    def test_page_size_zero_renders_the_whole_diagram(self):
+        result = self.service.convert(SOURCES, {"class": {"page_size": 0}})
+        self.assertNotIn("pages", result)
+        self.assertEqual(result["diagrams"]["class"].count("@startuml"), 1)
+
+    def test_documents_join_pages_into_one_multi_diagram_text(self):
+        result = self.service.convert(SOURCES, {"class": {"page_size": 2}})
+        document = diagram_documents(result)["class"]
+        self.assertEqual(document.count("@startuml"), 2)
+        self.assertEqual(document, "\n\n".join(result["pages"]["class"]))
+
+
+
+class DuplicateSourcesTest(TestCase):
+    def setUp(self):
+        self.service = ConversionService()
+
+    def test_identical_files_are_parsed_once_and_all_kept(self):
+        code = "public class Vendored { }"
+        sources = [("vendor/Vendored.java", code), ("lib/Vendored.java", code), ("a/B.java", "class B {}")]
+        with mock.patch.object(self.service._parser, "parse", wraps=self.service._parser.parse) as parse:
+            result = self.service.build(sources)
+        self.assertEqual(parse.call_count, 2)
+        self.assertEqual([s["filename"] for s in result["sources"]], [name for name, _ in sources])
+        self.assertEqual(result["diagrams"]["class"].count("class Vendored"), 2)
+
+    def test_each_copy_of_a_broken_file_is_reported(self):
+        sources = [("a/Broken.java", "class {"), ("b/Broken.java", "class {")]
+        errors = self.service.build(sources)["errors"]
+        self.assertEqual([error.split(":")[0] for error in errors], ["a/Broken.java", "b/Broken.java"])
+
+
+class ConversionKeyTest(TestCase):
+    def test_key_covers_sources_options_and_generator_version(self):
+        service = ConversionService()
+        key = service.key_for(SOURCES)
+        self.assertEqual(service.key_for(list(reversed(SOURCES))), key)
+        self.assertNotEqual(service.key_for(SOURCES, {"class": {"page_size": 2}}), key)
+        with mock.patch("services.conversion_service.GENERATOR_VERSION", "next-build"):
+            self.assertNotEqual(service.key_for(SOURCES), key)
+
+
+class SnapshotTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "snapshot.json")
+        service = ConversionService()
+        service.convert(SOURCES)
+        service.save_snapshot(self.path)
+
+    def test_snapshot_round_trip(self):
+        self.assertEqual(ConversionService().load_snapshot(self.path), 1)
+
+    def test_snapshot_of_another_build_is_ignored(self):
+        with mock.patch("services.conversion_service.GENERATOR_VERSION", "next-build"):
+            self.assertEqual(ConversionService().load_snapshot(self.path), 0)
+
+
+class SequenceOnRequestTest(TestCase):
+    def setUp(self):
+        self.service = ConversionService()
+
+    def test_sequence_diagram_is_not_drawn_by_default(self):
+        self.assertEqual(sorted(self.service.convert(SOURCES)["diagrams"]), ["class", "flow", "usecase"])
+
+    def test_sequence_diagram_is_drawn_when_configured_or_asked_for(self):
+        configured = self.service.convert(SOURCES, {"sequence": {"entry": "C.run"}})
+        self.assertIn("sequence", configured["diagrams"])
+        classes = [cls for _, code in SOURCES for cls in self.service.parse_file(code)]
+        self.assertEqual(list(self.service.render(classes, types=["sequence"])["diagrams"]), ["sequence"])
+        self.assertEqual([name for name, _ in self.service.iter_lines(classes, types=["sequence"])], ["sequence"])
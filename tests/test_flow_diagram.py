@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from parsers.flow_diagram import FlowDiagramGenerator
+from parsers.java_parser import ClassInfo, MethodInfo
+
+
+def _classes(count):
+    return [
+        ClassInfo(
+            name=f"C{number}",
+            kind="class",
+            methods=[MethodInfo(name="run", return_type="void", body_statements=["a()", "b()"])],
+        )
+        for number in range(count)
+    ]
+
+
+class FlowDiagramBudgetTest(TestCase):
+    def test_output_is_not_capped_by_default(self):
+        diagram = FlowDiagramGenerator().generate(_classes(2000))
+        self.assertEqual(diagram.count('partition "C'), 2000)
+        self.assertNotIn("omitted", diagram)
+
+    def test_line_budget_leaves_a_visible_marker(self):
+        diagram = FlowDiagramGenerator(max_lines=20).generate(_classes(5))
+        self.assertEqual(diagram.count('partition "C'), 2)
+        self.assertIn("' 3 more methods omitted: flow diagram budget reached", diagram)
+        self.assertIn('partition "3 more methods omitted" {\n  :flow diagram budget reached;\n}', diagram)
+        self.assertTrue(diagram.endswith("@enduml"))
+
+    def test_statement_budget(self):
+        diagram = FlowDiagramGenerator(max_statements=5).generate(_classes(5))
+        self.assertEqual(diagram.count('partition "C'), 2)
+        self.assertIn('partition "3 more methods omitted"', diagram)
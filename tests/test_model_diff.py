@@ -0,0 +1,86 @@
+from unittest import TestCase
+
+from parsers.java_parser import JavaParser
+from parsers.model_diff import DiffClassDiagramGenerator, diff_models
+
+OLD = """
+package shop;
+public class Order {
+    private Customer customer;
+    private int total;
+    public int total() { return total; }
+    public void cancel() {}
+}
+class Customer { private String name; }
+class Invoice {}
+"""
+
+NEW = """
+package shop;
+public class Order {
+    private Customer customer;
+    private long total;
+    public long total() { return total; }
+    public void ship(String address) {}
+}
+class Customer { private String name; public String name() { return name; } }
+class Payment { private Order order; }
+"""
+
+
+def _parse(code):
+    return JavaParser().parse(code)
+
+
+class DiffModelsTest(TestCase):
+    def setUp(self):
+        self.old, self.new = _parse(OLD), _parse(NEW)
+
+    def test_identical_models_have_no_changes(self):
+        diff = diff_models(self.old, _parse(OLD))
+        self.assertEqual(diff["summary"]["classes_unchanged"], 3)
+        self.assertEqual(diff["classes"], {"added": [], "removed": [], "changed": []})
+        self.assertEqual(diff["relationships"], {"added": [], "removed": []})
+
+    def test_method_bodies_are_ignored(self):
+        diff = diff_models(self.old, _parse(OLD.replace("return total;", "return total + 0;")))
+        self.assertEqual(diff["classes"]["changed"], [])
+
+    def test_classes_added_and_removed(self):
+        diff = diff_models(self.old, self.new)
+        self.assertEqual(diff["classes"]["added"], ["shop.Payment"])
+        self.assertEqual(diff["classes"]["removed"], ["shop.Invoice"])
+        self.assertEqual(diff["summary"]["classes_changed"], 2)
+        self.assertEqual(diff["summary"]["classes_unchanged"], 0)
+
+    def test_member_changes(self):
+        changed = {entry["name"]: entry for entry in diff_models(self.old, self.new)["classes"]["changed"]}
+        order = changed["shop.Order"]
+        self.assertNotIn("declaration", order)
+        self.assertEqual(order["fields"], {"changed": [{"before": "private int total", "after": "private long total"}]})
+        self.assertEqual(order["methods"], {
+            "added": ["public void ship(String address)"],
+            "removed": ["public void cancel()"],
+            "changed": [{"before": "public int total()", "after": "public long total()"}],
+        })
+        self.assertEqual(changed["shop.Customer"], {
+            "name": "shop.Customer", "methods": {"added": ["public String name()"]},
+        })
+
+    def test_relationships(self):
+        relationships = diff_models(self.old, self.new)["relationships"]
+        self.assertEqual(relationships["added"], [
+            {"source": "Payment", "type": "association", "target": "Order", "label": "order"},
+        ])
+        self.assertEqual(relationships["removed"], [])
+
+
+class DiffClassDiagramTest(TestCase):
+    def test_changes_are_highlighted(self):
+        diagram = DiffClassDiagramGenerator(_parse(OLD)).generate(_parse(NEW))
+        self.assertIn(f"class Payment {DiffClassDiagramGenerator.ADDED} {{", diagram)
+        self.assertIn(f"class Invoice <<removed>> {DiffClassDiagramGenerator.REMOVED} {{", diagram)
+        self.assertIn(f"class Order {DiffClassDiagramGenerator.CHANGED} {{", diagram)
+        self.assertIn("<color:red>--", diagram)
+        self.assertIn("Payment -[#green]-> Order : order", diagram)
+        self.assertTrue(diagram.startswith("@startuml") and diagram.endswith("@enduml"))
@@ -0,0 +1,66 @@
+import os
+from unittest import TestCase
+
+import javalang
+
+from services.normalize import normalize
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+
+class NormalizeTest(TestCase):
+    def assertSameKey(self, a, b):
+        self.assertEqual(normalize(a), normalize(b))
+
+    def assertDifferentKey(self, a, b):
+        self.assertNotEqual(normalize(a), normalize(b))
+
+    def test_spacing_around_operators_is_ignored(self):
+        for a, b in [
+            ("int x = -1;", "int x=-1;"),
+            ("if (a && !b) {}", "if(a&&!b){}"),
+            ("x = !y;", "x=!y;"),
+            ("y = a * -b + ~c;", "y=a*-b+~c;"),
+            ("i += 1;", "i+=1;"),
+            ("f = x -> x . y ();", "f=x->x.y();"),
+            ("Map<String, List<Integer>> m;", "Map<String,List<Integer>>m;"),
+            ("return a ? -1 : +2;", "return a?-1:+2;"),
+        ]:
+            with self.subTest(a=a):
+                self.assertSameKey(a, b)
+
+    def test_spaces_that_separate_tokens_are_kept(self):
+        for a, b in [
+            ("a - -b", "a--b"),
+            ("a + +b", "a++b"),
+            ("a < <b", "a<<b"),
+            ("a > >b", "a>>b"),
+            ("a & &b", "a&&b"),
+            ("a | |b", "a||b"),
+            ("a = =b", "a==b"),
+            ("a / *p", "a/*p"),
+            ("int x", "intx"),
+        ]:
+            with self.subTest(a=a):
+                self.assertDifferentKey(a, b)
+
+    def test_comments_and_line_endings_are_ignored(self):
+        self.assertSameKey(
+            "/** Docs. */\r\nclass A {\r\n    int x; // count\r\n}\r\n",
+            "class A { int x; }",
+        )
+
+    def test_literals_are_kept_verbatim(self):
+        self.assertDifferentKey('s = "a  b";', 's = "a b";')
+        self.assertSameKey('s = "// not a comment";', 's="// not a comment";')
+        self.assertEqual(normalize("c = '/' ; d = '*';"), "c='/';d='*';")
+
+    def test_normalized_source_lexes_to_the_same_tokens(self):
+        for name in sorted(os.listdir(EXAMPLES_DIR)):
+            with open(os.path.join(EXAMPLES_DIR, name), encoding="utf-8") as f:
+                code = f.read()
+            with self.subTest(name=name):
+                self.assertEqual(
+                    [t.value for t in javalang.tokenizer.tokenize(normalize(code))],
+                    [t.value for t in javalang.tokenizer.tokenize(code)],
+                )
@@ -0,0 +1,37 @@
+import base64
+import zlib
+from unittest import TestCase
+
+from services import plantuml
+
+DIAGRAM = "@startuml\nclass Café {\n  -name : String\n}\nA --> B : uses\n@enduml"
+
+
+class PlantUmlEncodingTest(TestCase):
+    def test_round_trip(self):
+        for text in (DIAGRAM, "a", "ab", "abc", DIAGRAM * 50):
+            with self.subTest(length=len(text)):
+                self.assertEqual(plantuml.decode(plantuml.encode(text)), text)
+
+    def test_uses_the_url_safe_plantuml_alphabet(self):
+        encoded = plantuml.encode(DIAGRAM * 20)
+        self.assertTrue(set(encoded) <= set(plantuml._PLANTUML_ALPHABET.decode()))
+        self.assertEqual(len(encoded) % 4, 0)
+
+    def test_payload_is_raw_deflate(self):
+        encoded = plantuml.encode(DIAGRAM)
+        raw = base64.b64decode(encoded.encode().translate(
+            bytes.maketrans(plantuml._PLANTUML_ALPHABET, plantuml._STANDARD_ALPHABET)
+        ))
+        self.assertEqual(zlib.decompressobj(-zlib.MAX_WBITS).decompress(raw).decode(), DIAGRAM)
+
+    def test_empty_text_encodes_to_empty(self):
+        self.assertEqual(plantuml.encode(""), "")
+        self.assertEqual(plantuml.decode(""), "")
+
+    def test_encode_diagrams(self):
+        diagrams = {"class": DIAGRAM, "flow": ""}
+        self.assertIs(plantuml.encode_diagrams(diagrams, "plain"), diagrams)
+        encoded = plantuml.encode_diagrams(diagrams, "deflate")
+        self.assertEqual(plantuml.decode(encoded["class"]), DIAGRAM)
+        self.assertEqual(encoded["flow"], "")
@@ -0,0 +1,71 @@
+import io
+import os
+import tarfile
+import tempfile
+from unittest import TestCase
+
+import zstandard
+
+from services.sources import iter_tar, read_path
+
+MEMBERS = [("src/a/A.java", "class A {}"), ("src/README.md", "docs"), ("src/b/B.java", "class B {}")]
+
+
+def _tar_bytes(mode="w"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as tf:
+        for name, text in MEMBERS:
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class _NonSeekable(io.RawIOBase):
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._stream.readinto(buffer)
+
+
+class ReadSourcesTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_tar_archives(self):
+        expected = [("src/a/A.java", "class A {}"), ("src/b/B.java", "class B {}")]
+        for name, data in (
+            ("code.tar", _tar_bytes()),
+            ("code.tgz", _tar_bytes("w:gz")),
+            ("code.tar.bz2", _tar_bytes("w:bz2")),
+            ("code.tar.zst", zstandard.ZstdCompressor().compress(_tar_bytes())),
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(read_path(self.write(name, data)), expected)
+
+    def test_tar_stream_need_not_be_seekable(self):
+        stream = _NonSeekable(zstandard.ZstdCompressor().compress(_tar_bytes()))
+        self.assertEqual([name for name, _ in iter_tar(stream, "upload.tzst")], ["src/a/A.java", "src/b/B.java"])
+
+    def test_directory_names_are_relative(self):
+        os.makedirs(os.path.join(self.root, "pkg"))
+        self.write(os.path.join("pkg", "A.java"), b"class A {}")
+        self.write("notes.txt", b"")
+        self.assertEqual(read_path(self.root), [(os.path.join("pkg", "A.java"), "class A {}")])
+
+    def test_other_files_are_rejected(self):
+        with self.assertRaises(ValueError):
+            read_path(self.write("notes.txt", b"text"))
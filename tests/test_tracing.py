@@ -0,0 +1,150 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from services import tracing
+from services.conversion_service import ConversionService, _build_in_worker
+from services.tracing import NOOP_SPAN, tracer
+
+SOURCES = [("A.java", "public class A { public void run() { } }")]
+
+
+class ListExporter:
+    def __init__(self, path=None):
+        self.batches = []
+
+    def export(self, spans):
+        self.batches.append(spans)
+
+
+class FailingExporter:
+    def export(self, spans):
+        raise OSError("disk full")
+
+
+class TracingTestCase(TestCase):
+    def setUp(self):
+        self.exporter = ListExporter()
+        self.addCleanup(tracer.configure, 0)
+
+    def configure(self, sample_rate=1.0, exporter=None):
+        tracer.configure(sample_rate, exporter or self.exporter)
+
+    def spans(self):
+        return [span for batch in self.exporter.batches for span in batch]
+
+
+class SamplingTest(TracingTestCase):
+    def test_nothing_is_recorded_when_disabled(self):
+        self.configure(0)
+        with tracer.span("root") as span:
+            self.assertIs(span, NOOP_SPAN)
+            self.assertIsNone(tracer.inject())
+        self.assertEqual(self.exporter.batches, [])
+
+    def test_a_trace_is_exported_once_with_its_children(self):
+        self.configure()
+        with tracer.span("root", {"a": 1}) as root:
+            with tracer.span("child") as child:
+                child.set_attribute("b", 2)
+        self.assertEqual(len(self.exporter.batches), 1)
+        child_span, root_span = self.exporter.batches[0]
+        self.assertEqual((root_span["name"], root_span["attributes"]), ("root", {"a": 1}))
+        self.assertIsNone(root_span["parent_span_id"])
+        self.assertEqual(child_span["parent_span_id"], root.span_id)
+        self.assertEqual(child_span["trace_id"], root.trace_id)
+        self.assertEqual(child_span["resource"]["process.pid"], os.getpid())
+
+    def test_sampling_is_decided_at_the_root(self):
+        self.configure(0.5)
+        with mock.patch("services.tracing.random.random", return_value=0.7):
+            with tracer.span("root") as root, tracer.span("child") as child:
+                self.assertFalse(root.recording)
+                self.assertIs(child, NOOP_SPAN)
+                self.assertIsNone(tracer.inject())
+        with mock.patch("services.tracing.random.random", return_value=0.3):
+            with tracer.span("root"), tracer.span("child") as child:
+                self.assertTrue(child.recording)
+        self.assertEqual([span["name"] for span in self.spans()], ["child", "root"])
+
+    def test_exceptions_mark_the_span_as_failed(self):
+        self.configure()
+        with self.assertRaises(KeyError):
+            with tracer.span("root"):
+                raise KeyError("missing")
+        (span,) = self.spans()
+        self.assertEqual(span["status"], "ERROR")
+        self.assertEqual(span["attributes"]["exception.type"], "KeyError")
+
+
+class PropagationTest(TracingTestCase):
+    def test_worker_continues_the_injected_trace(self):
+        self.configure()
+        with tracer.span("request") as request:
+            parent = tracer.inject()
+            # A plain pool thread inherits no context, like a pool process.
+            with ThreadPoolExecutor(1) as pool:
+                result = pool.submit(_build_in_worker, SOURCES, None, parent).result()
+        self.assertIn("class", result["diagrams"])
+        self.assertEqual(parent, (request.trace_id, request.span_id))
+
+        worker_batch, request_batch = self.exporter.batches
+        self.assertEqual([span["name"] for span in request_batch], ["request"])
+        build = next(span for span in worker_batch if span["name"] == "conversion.build")
+        self.assertEqual(build["parent_span_id"], request.span_id)
+        self.assertEqual({span["trace_id"] for span in worker_batch}, {request.trace_id})
+        parse = next(span for span in worker_batch if span["name"] == "java_parser.parse")
+        self.assertEqual(parse["parent_span_id"], build["span_id"])
+
+    def test_worker_without_a_parent_records_nothing(self):
+        self.configure()
+        _build_in_worker(SOURCES)
+        self.assertEqual(self.exporter.batches, [])
+
+    def test_aconvert_hands_the_trace_to_the_executor(self):
+        self.configure()
+
+        async def convert():
+            with tracer.span("request") as request:
+                await ConversionService().aconvert(SOURCES)
+            return request
+
+        request = asyncio.run(convert())
+        build = next(span for span in self.spans() if span["name"] == "conversion.build")
+        convert_span = next(span for span in self.spans() if span["name"] == "conversion.convert")
+        self.assertEqual(build["trace_id"], request.trace_id)
+        self.assertEqual(build["parent_span_id"], convert_span["span_id"])
+
+
+class ExporterTest(TracingTestCase):
+    def test_export_failure_does_not_fail_the_traced_work(self):
+        self.configure(exporter=FailingExporter())
+        with mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            with tracer.span("root"):
+                result = ConversionService().build(SOURCES)
+        self.assertIn("class", result["diagrams"])
+        self.assertIn("Trace export failed: disk full", stderr.getvalue())
+
+    def test_jsonl_exporter_appends_one_line_per_span(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            tracer.configure(1.0, "jsonl", path)
+            for _ in range(2):
+                with tracer.span("root"), tracer.span("child"):
+                    pass
+            with open(path, encoding="utf-8") as f:
+                names = [json.loads(line)["name"] for line in f]
+        self.assertEqual(names, ["child", "root"] * 2)
+
+    def test_exporter_by_dotted_path(self):
+        tracing.configure(1.0, f"{__name__}.ListExporter")
+        self.assertIsInstance(tracer.exporter, ListExporter)
+
+    def test_invalid_configuration(self):
+        for exporter, path in (("no.such.Exporter", None), ("jsonl", None), (None, None)):
+            with self.subTest(exporter=exporter), self.assertRaises(ValueError):
+                tracer.configure(1.0, exporter, path)
@@ -0,0 +1,97 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from services.conversion_service import ConversionService
+from services.output import write_diagrams
+from services.watch import SourceWatcher
+
+
+class SourceWatcherTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, "src")
+        self.output = os.path.join(directory.name, "uml")
+        os.mkdir(self.source)
+        self.watcher = SourceWatcher(self.source, self.output, ConversionService(), ["class"])
+
+    def write(self, name, code):
+        with open(os.path.join(self.source, name), "w", encoding="utf-8") as f:
+            f.write(code)
+
+    def poll(self):
+        with mock.patch("sys.stdout"):
+            return self.watcher.poll()
+
+    def test_output_follows_the_sources(self):
+        self.write("A.java", "public class A {}")
+        class_path = os.path.join(self.output, "class.puml")
+        self.assertEqual(self.poll(), [class_path])
+        self.assertEqual(self.poll(), [])
+
+        self.write("B.java", "public class B {}")
+        self.poll()
+        with open(class_path, encoding="utf-8") as f:
+            self.assertIn("class B", f.read())
+
+    def test_stale_output_is_removed_when_the_diagram_becomes_empty(self):
+        self.write("A.java", "public class A {}")
+        self.poll()
+        os.remove(os.path.join(self.source, "A.java"))
+        class_path = os.path.join(self.output, "class.puml")
+        self.assertEqual(self.poll(), [class_path])
+        self.assertFalse(os.path.exists(class_path))
+
+    def test_files_deleted_during_the_scan_are_skipped(self):
+        self.write("A.java", "public class A {}")
+        self.write("B.java", "public class B {}")
+        os.mkdir(os.path.join(self.source, "gone"))
+        scandir = os.scandir
+
+        def deleting_scandir(path):
+            # B.java and gone/ disappear after being listed.
+            if path == self.source:
+                entries = list(scandir(path))
+                os.remove(os.path.join(self.source, "B.java"))
+                os.rmdir(os.path.join(self.source, "gone"))
+                return _Entries(entries)
+            return scandir(path)
+
+        with mock.patch("services.watch.os.scandir", deleting_scandir):
+            self.poll()
+        with open(os.path.join(self.output, "class.puml"), encoding="utf-8") as f:
+            content = f.read()
+        self.assertIn("class A", content)
+        self.assertNotIn("class B", content)
+
+
+class _Entries(list):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class WriteDiagramsTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = directory.name
+
+    def test_pages_no_longer_produced_are_removed(self):
+        previous = {}
+        write_diagrams({"diagrams": {}, "pages": {"class": ["p1", "p2", "p3"]}}, ["class"], self.output, previous)
+        self.assertEqual(sorted(os.listdir(self.output)), ["class-1.puml", "class-2.puml", "class-3.puml"])
+
+        write_diagrams({"diagrams": {"class": "whole"}}, ["class"], self.output, previous)
+        self.assertEqual(os.listdir(self.output), ["class.puml"])
+        self.assertEqual(list(previous), [os.path.join(self.output, "class.puml")])
+
+    def test_one_shot_writes_never_remove_files(self):
+        path = os.path.join(self.output, "class.puml")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("kept")
+        self.assertEqual(write_diagrams({"diagrams": {"class": ""}}, ["class"], self.output), [])
+        self.assertTrue(os.path.exists(path))